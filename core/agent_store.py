@@ -0,0 +1,313 @@
+from collections.abc import MutableMapping
+from numbers import Real
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from game.entities.rpg import SKILLS
+from game.systems.relations import RelationGraph
+
+# Champs numériques stockés en colonnes (struct-of-arrays)
+SCALAR_FIELDS = ("energy", "mana", "busy_until", "xp", "level", "rolls")
+COLUMN_FIELDS = ("pos",) + SCALAR_FIELDS + ("stats",)
+_MISSING = object()  # Case vide d'une colonne objet (champ absent pour cet agent)
+
+
+class AgentView(MutableMapping):
+    """
+    Vue dict-like sur une ligne du store. Le code existant (v['pos'], v.get('energy'),
+    'stats' in v, v['rel'] = {}...) fonctionne sans modification.
+    Les valeurs colonnes sont renvoyées sous forme Python (int, list, dict) :
+    les modifier en place n'a pas d'effet, il faut réassigner la clé.
+    """
+    __slots__ = ("_store", "name")
+
+    def __init__(self, store, name):
+        self._store = store
+        self.name = name
+
+    @property
+    def relations(self):
+        """Graphe des relations du store (v['rel'] en est une vue)."""
+        return self._store.relations
+
+    @property
+    def _row(self):
+        return self._store._index[self.name]
+
+    def __getitem__(self, key):
+        return self._store._get(self._row, key)
+
+    def get(self, key, default=None):
+        try:
+            return self._store._get(self._row, key)
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        self._store._set(self._row, key, value)
+
+    def __delitem__(self, key):
+        self._store._del(self._row, key)
+
+    def __contains__(self, key):
+        return self._store._has_key(self._row, key)
+
+    def __iter__(self):
+        return iter(self._store._keys(self._row))
+
+    def __len__(self):
+        return len(self._store._keys(self._row))
+
+    def __repr__(self):
+        return f"AgentView({self.name!r}, {dict(self)!r})"
+
+
+class AgentStore(MutableMapping):
+    """
+    Stockage colonnaire des agents : colonnes NumPy pour les champs numériques
+    (pos, energy, mana, busy_until, xp, level, stats) + map nom <-> index.
+    Les relations ('rel') vivent dans une matrice creuse (RelationGraph).
+    Les champs texte/listes (role, description, inventory...) vont dans des
+    colonnes d'objets Python, une par champ, créées au premier agent qui l'a.
+    Aucun objet par agent : les vues AgentView sont créées à la demande.
+    Se comporte comme le dict {name: {...}} d'origine.
+    """
+    def __init__(self, capacity: int = 16):
+        self._names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._extras: Dict[str, list] = {}  # champ -> valeurs par ligne (_MISSING si absent)
+        self._n = 0
+        self._alloc(max(1, capacity))
+        self.relations = RelationGraph(capacity=max(16, capacity * 4))
+        self._rel_complete = True  # Tous les agents ont une entrée 'rel'
+
+    @classmethod
+    def from_dict(cls, characters: dict) -> "AgentStore":
+        store = cls(capacity=len(characters))
+        for name, data in characters.items():
+            store[name] = data
+        return store
+
+    def to_dict(self) -> dict:
+        """Export en dict de dicts (sauvegarde JSON)."""
+        return {name: dict(AgentView(self, name)) for name in self._names}
+
+    # --- Allocation ---
+    def _alloc(self, capacity):
+        self._cap = capacity
+        self._pos = np.zeros((capacity, 2), dtype=np.int32)
+        self._stats = np.zeros((capacity, len(SKILLS)), dtype=np.int32)
+        self._cols = {f: np.zeros(capacity, dtype=np.float64) for f in SCALAR_FIELDS}
+        self._has = {f: np.zeros(capacity, dtype=bool) for f in COLUMN_FIELDS}
+
+    def _grow(self):
+        n, cap = self._n, self._cap * 2
+        old_pos, old_stats, old_cols, old_has = self._pos, self._stats, self._cols, self._has
+        self._alloc(cap)
+        self._pos[:n] = old_pos[:n]
+        self._stats[:n] = old_stats[:n]
+        for f in SCALAR_FIELDS:
+            self._cols[f][:n] = old_cols[f][:n]
+        for f in COLUMN_FIELDS:
+            self._has[f][:n] = old_has[f][:n]
+
+    # --- Interface Mapping ---
+    def __getitem__(self, name) -> AgentView:
+        if name not in self._index:
+            raise KeyError(name)
+        return AgentView(self, name)
+
+    def get(self, name, default=None):
+        return AgentView(self, name) if name in self._index else default
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(list(self._names))
+
+    def __len__(self):
+        return self._n
+
+    def __setitem__(self, name, data):
+        if name in self._index:
+            row = self._index[name]
+            for col in self._extras.values():
+                col[row] = _MISSING
+            for f in COLUMN_FIELDS:
+                self._has[f][row] = False
+            self.relations.drop_row(name)
+        else:
+            if self._n == self._cap:
+                self._grow()
+            row = self._n
+            self._n += 1
+            self._names.append(name)
+            self._index[name] = row
+            for col in self._extras.values():
+                col.append(_MISSING)
+        for key, value in dict(data).items():
+            self._set(row, key, value)
+        if not self.relations.has_row(name):
+            self._rel_complete = False
+
+    def __delitem__(self, name):
+        row = self._index[name]
+        n = self._n
+        # Suppression en conservant l'ordre (rare : O(N))
+        self._pos[row:n - 1] = self._pos[row + 1:n]
+        self._stats[row:n - 1] = self._stats[row + 1:n]
+        for f in SCALAR_FIELDS:
+            self._cols[f][row:n - 1] = self._cols[f][row + 1:n]
+        for f in COLUMN_FIELDS:
+            self._has[f][row:n - 1] = self._has[f][row + 1:n]
+            self._has[f][n - 1] = False
+        del self._names[row]
+        for col in self._extras.values():
+            del col[row]
+        self.relations.drop_row(name)
+        self._n -= 1
+        self._index = {nm: i for i, nm in enumerate(self._names)}
+
+    # --- Accès ligne (utilisé par AgentView) ---
+    def _get(self, row, key):
+        if key == "pos":
+            if self._has["pos"][row]:
+                return [int(self._pos[row, 0]), int(self._pos[row, 1])]
+        elif key in self._cols:
+            if self._has[key][row]:
+                val = float(self._cols[key][row])
+                return int(val) if val.is_integer() else val
+        elif key == "stats":
+            if self._has["stats"][row]:
+                return {s: int(v) for s, v in zip(SKILLS, self._stats[row])}
+        elif key == "rel":
+            rel = self.relations.row(self._names[row])
+            if rel is not None:
+                return rel
+        col = self._extras.get(key)
+        if col is None or col[row] is _MISSING:
+            raise KeyError(key)
+        return col[row]
+
+    def _set(self, row, key, value):
+        if key == "rel" and isinstance(value, dict):
+            self.relations.set_row(self._names[row], value)
+            self._drop_extra(row, key)
+            return
+        if key == "pos" and isinstance(value, (list, tuple)) and len(value) == 2:
+            self._pos[row] = (int(value[0]), int(value[1]))
+        elif key in self._cols and isinstance(value, Real) and not isinstance(value, bool):
+            self._cols[key][row] = value
+        elif key == "stats" and isinstance(value, dict) and set(value) == set(SKILLS):
+            self._stats[row] = [int(value[s]) for s in SKILLS]
+        else:
+            # Valeur non colonnaire (ou forme inattendue) : stockage brut
+            if key in self._has:
+                self._has[key][row] = False
+            col = self._extras.get(key)
+            if col is None:
+                col = self._extras[key] = [_MISSING] * self._n
+            col[row] = value
+            return
+        self._has[key][row] = True
+        self._drop_extra(row, key)
+
+    def _drop_extra(self, row, key):
+        col = self._extras.get(key)
+        if col is not None:
+            col[row] = _MISSING
+
+    def _del(self, row, key):
+        if key in self._has and self._has[key][row]:
+            self._has[key][row] = False
+        elif key == "rel" and self.relations.has_row(self._names[row]):
+            self.relations.drop_row(self._names[row])
+            self._rel_complete = False
+        else:
+            col = self._extras.get(key)
+            if col is None or col[row] is _MISSING:
+                raise KeyError(key)
+            col[row] = _MISSING
+
+    def _has_key(self, row, key):
+        if key in self._has and self._has[key][row]:
+            return True
+        if key == "rel" and self.relations.has_row(self._names[row]):
+            return True
+        col = self._extras.get(key)
+        return col is not None and col[row] is not _MISSING
+
+    def _keys(self, row):
+        keys = [key for key, col in self._extras.items() if col[row] is not _MISSING]
+        keys += [f for f in COLUMN_FIELDS if self._has[f][row]]
+        if self.relations.has_row(self._names[row]):
+            keys.append("rel")
+        return keys
+
+    # --- Accès vectorisé (chemins chauds du moteur) ---
+    @property
+    def names(self) -> List[str]:
+        return self._names
+
+    def rows(self, names: Iterable[str]) -> np.ndarray:
+        index = self._index
+        return np.fromiter((index[n] for n in names), dtype=np.intp)
+
+    def column(self, field: str, default=0) -> np.ndarray:
+        """Copie de la colonne `field`, valeurs absentes remplacées par `default`."""
+        n = self._n
+        return np.where(self._has[field][:n], self._cols[field][:n], default)
+
+    def present(self, field: str) -> np.ndarray:
+        return self._has[field][:self._n]
+
+    def names_where(self, mask: np.ndarray) -> List[str]:
+        names = self._names
+        return [names[i] for i in np.flatnonzero(mask)]
+
+    def positions(self) -> np.ndarray:
+        return self._pos[:self._n]
+
+    def ensure_relations(self):
+        """Entrée 'rel' (vide) pour chaque agent : O(1) tant qu'aucun agent n'a été ajouté."""
+        if not self._rel_complete:
+            for name in self._names:
+                if not self.relations.has_row(name):
+                    self.relations.init_row(name)
+            self._rel_complete = True
+
+    def set_values(self, field: str, rows: np.ndarray, values):
+        """Affecte `values` au champ pour les lignes données (v[field] = value, vectorisé)."""
+        self._cols[field][rows] = values
+        self._has[field][rows] = True
+
+    def stat_values(self, rows: np.ndarray, skill_idx: np.ndarray) -> np.ndarray:
+        """Valeur de la compétence skill_idx[i] pour la ligne rows[i] (0 sans stats)."""
+        has = self._has["stats"][rows]
+        values = np.where(has, self._stats[rows, skill_idx], 0)
+        for i in np.flatnonzero(~has):
+            # Stats hors colonne (forme inattendue) : lecture du dict brut
+            col = self._extras.get("stats")
+            stats = col[rows[i]] if col is not None else None
+            if isinstance(stats, dict):
+                values[i] = stats.get(SKILLS[skill_idx[i]], 0)
+        return values
+
+    def add_clipped(self, field: str, rows: np.ndarray, delta, default=0, lo=None, hi=None, only_present=False):
+        """
+        Ajoute `delta` au champ pour les lignes données puis borne le résultat
+        (équivalent vectorisé de v[field] = min(hi, max(lo, v.get(field, default) + delta))).
+        """
+        if len(rows) == 0:
+            return
+        has = self._has[field]
+        if only_present:
+            rows = rows[has[rows]]
+        col = self._cols[field]
+        vals = np.where(has[rows], col[rows], default) + delta
+        if lo is not None or hi is not None:
+            vals = np.clip(vals, lo, hi)
+        col[rows] = vals
+        has[rows] = True
@@ -0,0 +1,131 @@
+import threading
+from typing import Dict, List, Tuple
+
+from game.entities import characters
+
+
+def is_failed_decision(decision) -> bool:
+    """Décision par défaut (batch en erreur, JSON tronqué ou agent oublié par l'IA)."""
+    return str(decision.get('action', 'RIEN')).strip().upper() == "RIEN"
+
+
+class AdaptiveBatcher:
+    """
+    Découpe les agents d'un tour en batches selon un budget de tokens
+    (prompt estimé depuis get_agent_prompt_data + sortie JSON attendue).
+    Le budget s'ajuste en AIMD sur la latence et le taux d'erreur observés :
+    +step tant que les appels restent sous la latence cible,
+    x backoff dès qu'un batch est trop lent ou que les décisions échouent.
+    """
+    def __init__(self, token_budget=3000, min_tokens=600, max_tokens=12000, max_agents=40,
+                 target_latency=15.0, max_error_rate=0.1, output_tokens=90,
+                 step=500, backoff=0.7, extras_group=(), adaptive=True):
+        self.budget = token_budget
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.max_agents = max(1, max_agents)
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.output_tokens = output_tokens
+        self.step = step
+        self.backoff = backoff
+        self.extras_group = list(extras_group)
+        self.adaptive = adaptive
+        self._lock = threading.Lock()
+        self._planned: Dict[Tuple[str, ...], int] = {}  # batch -> tokens estimés
+
+        # Compteurs
+        self.calls = 0
+        self.decisions = 0
+        self.errors = 0
+        self.call_seconds = 0.0
+        self.increases = 0
+        self.decreases = 0
+
+    def agent_tokens(self, name, characters_state, spatial_index=None):
+        """Tokens estimés (prompt + sortie) pour le slot d'un agent."""
+        prompt = characters.estimate_agent_tokens(name, characters_state[name], characters_state, spatial_index)
+        return prompt + self.output_tokens
+
+    def plan(self, agent_names, characters_state, spatial_index=None) -> List[List[str]]:
+        """
+        Regroupe les agents en batches sous le budget courant (ordre conservé).
+        Les extras (créatures, fantômes...) forment toujours leur propre groupe.
+        """
+        extras = set(self.extras_group)
+        found_extras = [n for n in agent_names if n in extras]
+        pool = [n for n in agent_names if n not in extras]
+
+        with self._lock:
+            budget = self.budget
+            self._planned.clear()
+
+        batches = []
+        if found_extras:
+            batches.append((found_extras, sum(self.agent_tokens(n, characters_state, spatial_index) for n in found_extras)))
+
+        current, used = [], 0
+        for name in pool:
+            cost = self.agent_tokens(name, characters_state, spatial_index)
+            # Un agent seul au-dessus du budget part quand même (batch de 1)
+            if current and (used + cost > budget or len(current) >= self.max_agents):
+                batches.append((current, used))
+                current, used = [], 0
+            current.append(name)
+            used += cost
+        if current:
+            batches.append((current, used))
+
+        with self._lock:
+            for batch, tokens in batches:
+                self._planned[tuple(batch)] = tokens
+        return [batch for batch, _ in batches]
+
+    def observe(self, agent_names, elapsed, decisions):
+        """Retour d'un appel : latence (s) et décisions obtenues (liste de dicts)."""
+        n = len(agent_names)
+        if not n:
+            return
+        failed = sum(1 for d in decisions if is_failed_decision(d)) + max(0, n - len(decisions))
+        with self._lock:
+            tokens = self._planned.pop(tuple(agent_names), None)
+            self.calls += 1
+            self.decisions += n - failed
+            self.errors += failed
+            self.call_seconds += elapsed
+            if not self.adaptive:
+                return
+
+            if failed / n > self.max_error_rate:
+                self._decrease()
+            elif tokens and tokens >= self.budget / 2:
+                # Latence ramenée au budget courant (les petits batches de fin ne comptent pas)
+                scaled = elapsed * self.budget / tokens
+                if scaled > self.target_latency:
+                    self._decrease()
+                elif self.budget < self.max_tokens:
+                    self.budget = min(self.max_tokens, self.budget + self.step)
+                    self.increases += 1
+
+    def freeze(self, budget):
+        """Budget fixe, plus d'ajustement (découpage reproductible d'un tour à l'autre)."""
+        with self._lock:
+            self.adaptive = False
+            self.budget = budget
+
+    def _decrease(self):
+        self.budget = max(self.min_tokens, int(self.budget * self.backoff))
+        self.decreases += 1
+
+    def stats(self):
+        slots = self.decisions + self.errors
+        return {
+            "budget": self.budget,
+            "calls": self.calls,
+            "decisions": self.decisions,
+            "error_rate": self.errors / slots if slots else 0.0,
+            "avg_latency": self.call_seconds / self.calls if self.calls else 0.0,
+            "decisions_per_call_second": self.decisions / self.call_seconds if self.call_seconds else 0.0,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
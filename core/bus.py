@@ -1,21 +1,290 @@
-from typing import Callable, Any, Dict, List
+import atexit
+import fnmatch
+import threading
+import time
+from collections import deque
+from typing import Callable, Any, Deque, Dict, List, Optional, Tuple
+
+from core.config import BUS_DEFAULT_MODE, BUS_QUEUE_SIZE, BUS_WORKERS, BUS_BLOCK_TIMEOUT
+
+# Modes de livraison d'un abonnement
+SYNC = "sync"       # Appel immédiat dans le thread de l'émetteur (comportement historique)
+QUEUED = "queued"   # File par type d'événement, vidée par lots à la fin des ticks (drain)
+WORKER = "worker"   # File par type d'événement, vidée par les threads du pool de workers
+MODES = (SYNC, QUEUED, WORKER)
+
+
+class Subscription:
+    """Un abonné (motif + fonction) et ses compteurs de latence."""
+    def __init__(self, pattern: str, listener: Callable, mode: str, batch: bool):
+        self.pattern = pattern
+        self.listener = listener
+        self.mode = mode
+        self.batch = batch  # True : reçoit la liste des événements du lot
+        self.wildcard = any(c in pattern for c in "*?[")
+        self.calls = 0
+        self.events = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def matches(self, event_type: str) -> bool:
+        return fnmatch.fnmatchcase(event_type, self.pattern) if self.wildcard else event_type == self.pattern
+
+    def deliver(self, items: List[Any]) -> Tuple[float, bool]:
+        """Appelle l'abonné sur un lot (erreurs isolées). Retourne (durée, erreur)."""
+        t0 = time.perf_counter()
+        try:
+            if self.batch:
+                self.listener(items)
+            else:
+                for data in items:
+                    self.listener(data)
+        except Exception as e:
+            print(f"Erreur abonné {getattr(self.listener, '__name__', self.listener)} ({self.pattern}) : {e}")
+            return time.perf_counter() - t0, True
+        return time.perf_counter() - t0, False
+
+    def record(self, n_events: int, elapsed: float, error: bool = False):
+        self.calls += 1
+        self.events += n_events
+        self.errors += error
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "calls": self.calls,
+            "events": self.events,
+            "errors": self.errors,
+            "avg_ms": round(self.total_time / self.calls * 1e3, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_time * 1e3, 3),
+        }
+
 
 class EventBus:
-    def __init__(self):
-        # Dictionnaire associant un nom d'événement à une liste de fonctions
-        self._listeners: Dict[str, List[Callable]] = {}
+    """
+    Bus d'événements entre systèmes.
+    - SYNC : publish() appelle l'abonné immédiatement (pour ceux qui en ont besoin).
+    - QUEUED / WORKER : publish() ne fait qu'empiler l'événement dans une file bornée
+      par type ; les files sont vidées par lots (drain() en fin de tick, ou pool de
+      workers). Un abonné lent ne bloque plus le tick du moteur.
+    Contre-pression quand une file est pleine : file QUEUED vidée sur place par
+    l'émetteur ; file WORKER, l'émetteur attend (BUS_BLOCK_TIMEOUT) puis l'événement
+    le plus ancien est abandonné.
+    Abonnements par motif ("WEATHER_*", "*"), compteurs de latence par abonné.
+    """
+    def __init__(self, queue_size: int = BUS_QUEUE_SIZE, workers: int = BUS_WORKERS,
+                 default_mode: str = BUS_DEFAULT_MODE, block_timeout: float = BUS_BLOCK_TIMEOUT):
+        # Dictionnaire associant un nom d'événement à une liste d'abonnements
+        self._listeners: Dict[str, List[Subscription]] = {}
+        self._wildcards: List[Subscription] = []
+        self._routes: Dict[str, Dict[str, List[Subscription]]] = {}  # Cache type -> mode -> abonnés
+        self.queue_size = queue_size
+        self.default_mode = default_mode
+        self.block_timeout = block_timeout
+        self.n_workers = workers
+        # Files : mode -> type -> deque[(t_publication, data)]
+        self._queues: Dict[str, Dict[str, Deque[Tuple[float, Any]]]] = {QUEUED: {}, WORKER: {}}
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._work = threading.Condition(self._lock)
+        self._space = threading.Condition(self._lock)
+        self._workers: List[threading.Thread] = []
+        self._busy = 0
+        self._inflight = set()  # Types en cours de livraison par un worker
+        self._closed = False
+
+        # Métriques
+        self.published = 0
+        self.dropped = 0
+        self.inline_drains = 0
+        self.max_wait = 0.0
+        self._total_wait = 0.0
+        self._delivered = 0
+
+    def subscribe(self, event_type: str, listener: Callable, mode: Optional[str] = None, batch: bool = False):
+        """
+        Un plugin s'abonne à un type d'événement (motifs fnmatch acceptés).
+        mode : SYNC, QUEUED ou WORKER (défaut : BUS_DEFAULT_MODE).
+        batch=True : l'abonné reçoit une liste d'événements par appel.
+        """
+        mode = mode or self.default_mode
+        if mode not in MODES:
+            raise ValueError(f"Mode de livraison inconnu : {mode}")
+        sub = Subscription(event_type, listener, mode, batch)
+        with self._lock:
+            if sub.wildcard:
+                self._wildcards.append(sub)
+            else:
+                self._listeners.setdefault(event_type, []).append(sub)
+            self._routes.clear()
+        if mode == WORKER:
+            self._start_workers()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub in self._wildcards:
+                self._wildcards.remove(sub)
+            elif sub in self._listeners.get(sub.pattern, []):
+                self._listeners[sub.pattern].remove(sub)
+            self._routes.clear()
 
-    def subscribe(self, event_type: str, listener: Callable):
-        """Un plugin s'abonne à un type d'événement."""
-        if event_type not in self._listeners:
-            self._listeners[event_type] = []
-        self._listeners[event_type].append(listener)
+    def _route(self, event_type: str) -> Dict[str, List[Subscription]]:
+        route = self._routes.get(event_type)
+        if route is None:
+            route = {mode: [] for mode in MODES}
+            for sub in self._listeners.get(event_type, []) + [s for s in self._wildcards if s.matches(event_type)]:
+                route[sub.mode].append(sub)
+            self._routes[event_type] = route
+        return route
 
     def publish(self, event_type: str, data: Any = None):
         """Un plugin diffuse une information à tout le monde."""
-        if event_type in self._listeners:
-            for listener in self._listeners[event_type]:
-                listener(data)
+        with self._lock:
+            self.published += 1
+            route = self._route(event_type)
+            sync = list(route[SYNC])
+            overflow = False
+            if route[QUEUED]:
+                q = self._queues[QUEUED].setdefault(event_type, deque())
+                q.append((time.perf_counter(), data))
+                overflow = len(q) >= self.queue_size
+            if route[WORKER]:
+                self._enqueue_worker(event_type, data)
+
+        for sub in sync:
+            t0 = time.perf_counter()
+            try:
+                sub.listener(data)
+            finally:
+                elapsed = time.perf_counter() - t0
+                with self._lock:
+                    sub.record(1, elapsed)
+        if overflow:
+            # Contre-pression : l'émetteur vide lui-même la file pleine
+            self.inline_drains += 1
+            self.drain(event_type)
+
+    def _enqueue_worker(self, event_type: str, data: Any):
+        """(Verrou tenu) Empile pour les workers, attend de la place si la file est pleine."""
+        q = self._queues[WORKER].setdefault(event_type, deque())
+        if len(q) >= self.queue_size and self._workers:
+            self._space.wait_for(lambda: len(q) < self.queue_size or self._closed, self.block_timeout)
+        if len(q) >= self.queue_size:
+            q.popleft()
+            self.dropped += 1
+        q.append((time.perf_counter(), data))
+        self._work.notify()
+
+    def _take(self, mode: str, event_type: Optional[str] = None) -> List[Tuple[str, List[Tuple[float, Any]]]]:
+        """(Verrou tenu) Retire les lots en attente : [(type, [(t, data)])]."""
+        queues = self._queues[mode]
+        types = [event_type] if event_type is not None else list(queues)
+        batches = []
+        for t in types:
+            q = queues.get(t)
+            if q:
+                batches.append((t, list(q)))
+                q.clear()
+        if mode == WORKER and batches:
+            self._space.notify_all()
+        return batches
+
+    def _dispatch(self, mode: str, batches):
+        now = time.perf_counter()
+        for event_type, items in batches:
+            data = [d for _, d in items]
+            with self._lock:
+                # Attente en file (publication -> livraison)
+                waits = [now - t for t, _ in items]
+                self._total_wait += sum(waits)
+                self._delivered += len(items)
+                self.max_wait = max(self.max_wait, max(waits))
+                subs = list(self._route(event_type)[mode])
+            for sub in subs:
+                elapsed, error = sub.deliver(data)
+                with self._lock:
+                    sub.record(len(data), elapsed, error)
+
+    def drain(self, event_type: Optional[str] = None) -> int:
+        """
+        Livre par lots les événements QUEUED en attente (appelé en fin de tick par le moteur).
+        Retourne le nombre d'événements livrés.
+        """
+        with self._drain_lock: # Un seul vidage à la fois : ordre des événements préservé
+            with self._lock:
+                batches = self._take(QUEUED, event_type)
+            self._dispatch(QUEUED, batches)
+        return sum(len(items) for _, items in batches)
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(q) for queues in self._queues.values() for q in queues.values())
+
+    # --- Pool de workers ---
+    def _start_workers(self):
+        with self._lock:
+            if self._workers or self._closed:
+                return
+            for i in range(max(1, self.n_workers)):
+                thread = threading.Thread(target=self._worker_loop, name=f"bus-worker-{i}", daemon=True)
+                self._workers.append(thread)
+                thread.start()
+
+    def _ready_type(self) -> Optional[str]:
+        # Un type n'est livré que par un worker à la fois : ses événements restent ordonnés
+        return next((t for t, q in self._queues[WORKER].items() if q and t not in self._inflight), None)
+
+    def _worker_loop(self):
+        while True:
+            with self._lock:
+                self._work.wait_for(lambda: self._closed or self._ready_type() is not None)
+                event_type = self._ready_type()
+                if event_type is None:
+                    return # Fermeture, plus rien à livrer
+                batches = self._take(WORKER, event_type)
+                self._inflight.add(event_type)
+                self._busy += 1
+            try:
+                self._dispatch(WORKER, batches)
+            finally:
+                with self._lock:
+                    self._inflight.discard(event_type)
+                    self._busy -= 1
+                    self._space.notify_all()
+                    self._work.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Vide les files QUEUED et attend que les workers aient tout livré."""
+        self.drain()
+        with self._lock:
+            return self._space.wait_for(lambda: not any(self._queues[WORKER].values()) and not self._busy, timeout)
+
+    def close(self):
+        self.flush(timeout=5)
+        with self._lock:
+            self._closed = True
+            self._work.notify_all()
+            self._space.notify_all()
+        for thread in self._workers:
+            thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subs = [s for subs in self._listeners.values() for s in subs] + self._wildcards
+            return {
+                "published": self.published,
+                "pending": sum(len(q) for queues in self._queues.values() for q in queues.values()),
+                "dropped": self.dropped,
+                "inline_drains": self.inline_drains,
+                "avg_wait_ms": round(self._total_wait / self._delivered * 1e3, 3) if self._delivered else 0.0,
+                "max_wait_ms": round(self.max_wait * 1e3, 3),
+                "listeners": {f"{s.pattern}:{getattr(s.listener, '__name__', repr(s.listener))}": s.stats() for s in subs},
+            }
 
 # Instance unique (Singleton) pour tout le projet
-bus = EventBus()
\ No newline at end of file
+bus = EventBus()
+atexit.register(bus.close)
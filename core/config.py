@@ -1,5 +1,100 @@
 # --- CONSTANTES GLOBALES ---
-GRID_SIZE = 32
+# La taille de la grille vient du seed du monde (seed['grid_size'])
+
+# --- LLM ---
+# Nombre max de requêtes LLM simultanées (chemin asyncio du moteur)
+LLM_MAX_CONCURRENCY = 32
+# Streaming des réponses : chaque décision est appliquée dès que son JSON est complet
+LLM_STREAMING = False
+# Cache de contexte du préfixe statique des prompts (côté fournisseur)
+PROMPT_CACHE_ENABLED = True
+PROMPT_CACHE_TTL = 3600             # Secondes (durée de vie du cache fournisseur)
+PROMPT_CACHE_MIN_TOKENS = 1024      # En dessous, pas de cache fournisseur (explicite ni implicite) ; préfixe du seed de base ~360
+# Endpoint de l'API (None : Google ; ex. http://127.0.0.1:8765 pour tools/fake_llm_server.py)
+LLM_BASE_URL = None
+
+# --- ROUTAGE DES MODELES ---
+# Une route par usage du LLM ; les usages à gros volume passent par un modèle rapide et bon marché
+ROUTE_DECISION = "decision"         # Décisions des agents (batches du moteur)
+ROUTE_EXTRAS = "extras"             # Batches des extras (BATCH_EXTRAS_GROUP)
+ROUTE_NARRATION = "narration"       # Récit (storybook)
+ROUTE_SUMMARY = "summary"           # Résumé des logs
+ROUTE_FACTS = "facts"               # Extraction des faits marquants
+ROUTE_SCAN = "scan"                 # Objets apparus dans le récit
+LLM_MODEL_DEFAULT = "models/gemini-3-flash-preview"   # Gemini 3 Flash Preview (Requis par User)
+LLM_MODEL_FAST = "models/gemini-2.5-flash-lite"
+LLM_ROUTES = {
+    ROUTE_DECISION: LLM_MODEL_DEFAULT,
+    ROUTE_EXTRAS: LLM_MODEL_FAST,
+    ROUTE_NARRATION: LLM_MODEL_DEFAULT,
+    ROUTE_SUMMARY: LLM_MODEL_FAST,
+    ROUTE_FACTS: LLM_MODEL_FAST,
+    ROUTE_SCAN: LLM_MODEL_FAST,
+}
+# Prix estimés (USD par million de tokens : entrée, sortie) pour le rapport de coût par route
+LLM_PRICES = {
+    LLM_MODEL_DEFAULT: (0.50, 3.00),
+    LLM_MODEL_FAST: (0.10, 0.40),
+}
+
+# --- LATENCE DE QUEUE LLM ---
+LLM_DEADLINE = 30.0                 # Délai max d'un appel, relances et backoff compris (s) ; aussi timeout HTTP du client
+LLM_HEDGE_ENABLED = True            # Requête couverte : doublon si pas de réponse après le p95
+LLM_HEDGE_QUANTILE = 0.95
+LLM_HEDGE_WARMUP = 20               # Appels observés avant d'envoyer des doublons
+LLM_HEDGE_MIN_DELAY = 0.5           # Bornes du délai avant doublon (s)
+LLM_HEDGE_MAX_DELAY = 15.0
+LLM_HEDGE_BUDGET = 0.05             # Doublons max ~5 % des appels
+LLM_RETRIES = 2                     # Relances max par appel (erreurs transitoires)
+LLM_RETRY_BASE = 0.5                # Backoff exponentiel à gigue complète (s)
+LLM_RETRY_MAX = 8.0
+LLM_RETRY_BUDGET = 0.1              # Relances max ~10 % des appels
+LLM_BREAKER_FAILURES = 5            # Échecs consécutifs avant ouverture du circuit
+LLM_BREAKER_COOLDOWN = 30.0         # Durée d'ouverture avant un appel d'essai (s)
+LLM_FAILED_RETRY_MINUTES = 5        # Agents sans décision (LLM en échec) : réveil différé (min simulées)
+LLM_FAILED_RETRY_MAX = 60           # Plafond du report, doublé à chaque tour en échec consécutif
+
+# --- BATCHING ADAPTATIF ---
+# Budget de tokens (prompt + sortie estimés) par appel, ajusté en AIMD
+BATCH_TOKEN_BUDGET = 3000           # Budget initial (~15 agents)
+BATCH_MIN_TOKENS = 600
+BATCH_MAX_TOKENS = 12000
+BATCH_MAX_AGENTS = 40               # Au-delà, le JSON de sortie devient fragile
+BATCH_OUTPUT_TOKENS = 90            # Sortie JSON estimée par agent
+BATCH_TARGET_LATENCY = 15.0         # Secondes par appel visées
+BATCH_MAX_ERROR_RATE = 0.1          # Part de décisions en échec tolérée par batch
+BATCH_ADAPTIVE = True               # False : budget fixe (rejeu strictement reproductible)
+# Groupe fixe : créatures / extras toujours traités ensemble
+BATCH_EXTRAS_GROUP = ["Peeves", "Baron", "Crocdur"]
+
+# --- CACHE DES DECISIONS ---
+DECISION_CACHE_ENABLED = False      # Opt-in : rejoue une décision passée sans appeler le LLM si l'état quantifié est identique
+DECISION_CACHE_SIZE = 4096          # Entrées en mémoire (LRU)
+DECISION_CACHE_TTL = 180            # Minutes de simulation
+DECISION_CACHE_ENERGY_BUCKET = 25   # Quantification de l'énergie
+DECISION_CACHE_DISK = False         # Second niveau SQLite
+DECISION_CACHE_DISK_PATH = "data/decision_cache.sqlite"
+
+# --- BUS D'EVENEMENTS ---
+BUS_DEFAULT_MODE = "sync"           # sync | queued (vidé en fin de tick) | worker (pool de threads) : opt-in via subscribe(mode=...)
+BUS_QUEUE_SIZE = 10000              # Événements en attente max par type
+BUS_WORKERS = 2
+BUS_BLOCK_TIMEOUT = 0.5             # Attente max de l'émetteur quand une file worker est pleine (s)
+
+# --- METRIQUES ---
+METRICS_PORT = 9464                 # Endpoint Prometheus /metrics (0 ou None : désactivé)
+METRICS_HOST = "127.0.0.1"
+METRICS_OVERLAY = False             # Overlay des latences par étape au démarrage (F3 pour basculer)
+
+# --- RELATIONS ---
+RELATION_DAILY_DECAY = 1.0          # Oubli des affinités, facteur appliqué chaque nouveau jour (opt-in, ex. 0.95 ; 1.0 : désactivé)
+
+# --- JOURNAL DES EVENEMENTS ---
+EVENT_LOG_CAPACITY = 5000           # Événements gardés en mémoire (tampon circulaire)
+EVENT_LOG_SPILL = True              # Segments sur disque (historique complet, indexé)
+EVENT_LOG_DIR = "data/events"
+EVENT_SEGMENT_EVENTS = 20000        # Événements par segment
+EVENT_MAX_SEGMENTS = 50             # Au-delà, les plus anciens segments sont supprimés
 
 # Dictionnaire Nom -> Coordonnées [x, y]
 # Doit correspondre à la map dans world_seed.json
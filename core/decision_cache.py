@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Champs mis en cache : le comportement seul. Pensée et réplique ne sont jamais rejouées mot pour mot.
+CACHED_FIELDS = ("action", "target", "target_skill", "duration", "dest_offset")
+HABIT_THOUGHT = "(Par habitude)"
+
+
+class DecisionCache:
+    """
+    Cache des décisions IA, devant batch_agent_turn.
+    Clé = tuple normalisé et quantifié de l'état d'un agent (lieu, météo, voisins,
+    tranche d'énergie). Seuls action / cible / durée / déplacement sont gardés.
+    Éviction LRU + TTL (en minutes de simulation),
+    second niveau optionnel sur disque (SQLite sous data/).
+    """
+    def __init__(self, max_entries=4096, ttl=180, energy_bucket=25, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.energy_bucket = max(1, energy_bucket)
+        self._mem = OrderedDict()  # key -> (stored_at, decision)
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS decisions (key TEXT PRIMARY KEY, stored_at INTEGER, decision TEXT)")
+            self._db.commit()
+
+        # Compteurs (réglage de la quantification)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self._agent_latency = 0.0  # Moyenne glissante (s) d'un slot agent dans un batch
+
+    def make_key(self, name, v, terrain, weather, neighbors):
+        """Tuple de features quantifiées pour un agent."""
+        energy = v.get('energy', 100)
+        return (
+            name,
+            terrain,
+            weather,
+            tuple(sorted(neighbors)),
+            int(energy) // self.energy_bucket,
+        )
+
+    def get(self, key, pos, now) -> Optional[dict]:
+        """Décision en cache (dest recalée sur la position actuelle) ou None."""
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                self._mem.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT stored_at, decision FROM decisions WHERE key = ?",
+                                       (json.dumps(key, ensure_ascii=False),)).fetchone()
+                if row:
+                    entry = (row[0], json.loads(row[1]))
+                    self._remember(key, entry)
+                    self.disk_hits += 1
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, decision = entry
+            # Âge absolu : l'horloge peut reculer (reset, chargement d'une sauvegarde)
+            if abs(now - stored_at) > self.ttl:
+                self._mem.pop(key, None)
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.saved_seconds += self._agent_latency
+
+        decision = {k: decision[k] for k in CACHED_FIELDS if k in decision}
+        decision['pensee'], decision['reaction'] = HABIT_THOUGHT, None
+        dx, dy = decision.pop('dest_offset', (0, 0))
+        decision['dest'] = [pos[0] + dx, pos[1] + dy]
+        return decision
+
+    def put(self, key, decision, pos, now):
+        """Stocke une décision, avec la destination relative à la position de départ."""
+        stored = {k: decision[k] for k in CACHED_FIELDS if k in decision}
+        dest = decision.get('dest', pos)
+        stored['dest_offset'] = [dest[0] - pos[0], dest[1] - pos[1]]
+        with self._lock:
+            self._remember(key, (now, stored))
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO decisions VALUES (?, ?, ?)",
+                                 (json.dumps(key, ensure_ascii=False), now, json.dumps(stored, ensure_ascii=False)))
+                self._db.commit()
+
+    def clear(self):
+        """Vide le cache (mémoire et disque), ex. au reset de la partie."""
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM decisions")
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def observe_latency(self, seconds_per_agent):
+        """Latence observée d'un slot agent (sert à estimer le temps économisé par hit)."""
+        with self._lock:
+            if self._agent_latency == 0.0:
+                self._agent_latency = seconds_per_agent
+            else:
+                self._agent_latency = 0.9 * self._agent_latency + 0.1 * seconds_per_agent
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._mem),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
@@ -1,11 +1,81 @@
+import asyncio
+import concurrent.futures
+import copy
+import queue
+import random
+import time
+
 from game.entities import characters
+from game.entities import rpg as rpg_system
 from game.systems import relations, weather
 from core import storage
+from core import metrics
+from core.bus import bus
+from core.spatial import SpatialGrid
+from core.agent_store import AgentStore
+from core.scheduler import EventScheduler, MINUTES_PER_DAY, absolute_time
+from core.config import (
+    LLM_MAX_CONCURRENCY, LLM_STREAMING, DECISION_CACHE_ENABLED, DECISION_CACHE_SIZE, DECISION_CACHE_TTL,
+    DECISION_CACHE_ENERGY_BUCKET, DECISION_CACHE_DISK, DECISION_CACHE_DISK_PATH,
+    BATCH_TOKEN_BUDGET, BATCH_MIN_TOKENS, BATCH_MAX_TOKENS, BATCH_MAX_AGENTS, BATCH_OUTPUT_TOKENS,
+    BATCH_TARGET_LATENCY, BATCH_MAX_ERROR_RATE, BATCH_ADAPTIVE, BATCH_EXTRAS_GROUP, RELATION_DAILY_DECAY,
+    ROUTE_EXTRAS, LLM_FAILED_RETRY_MINUTES, LLM_FAILED_RETRY_MAX
+)
+from core.decision_cache import DecisionCache
+from core.batching import AdaptiveBatcher
+from core.snapshot import SnapshotPublisher
+from core.event_log import EventLog, EventRecord, event_to_json
+
+WEATHER_PERIOD = 10 # Minutes entre deux tirages météo
 
 class SimulationEngine:
-    def __init__(self, seed):
+    def __init__(self, seed, sim_seed=None):
         self.seed = seed
         self.grid_size = seed['grid_size']
+        # Index spatial des positions (perception des voisins en ~O(1))
+        self.spatial = SpatialGrid()
+        # Réveils des agents (tas indexé en minutes absolues)
+        self.scheduler = EventScheduler()
+        # Appels LLM simultanés max (chemin asyncio)
+        self.max_concurrency = LLM_MAX_CONCURRENCY
+        self._semaphore = None
+        self._semaphore_loop = None
+        # Décisions appliquées au fil du streaming de la réponse IA
+        self.streaming = LLM_STREAMING
+        # Agents modifiés hors décisions (init des stats) depuis la dernière sauvegarde
+        self._dirty = set()
+        # Vues immuables publiées pour l'UI (échange atomique de référence)
+        self.snapshots = SnapshotPublisher()
+        # Agents déplacés depuis le dernier snapshot (synchro incrémentale des sprites)
+        self._moved = set()
+        # Sauvegarde continue (désactivable en mode headless / benchmark)
+        self.autosave = True
+        # Hasard reproductible (graine de partie) : dés par agent, météo à part
+        self.seed_rngs(sim_seed)
+        # Compteurs de tours (runner headless, benchmarks)
+        self.turns = 0
+        self.decisions = 0
+        self._turn_started = time.perf_counter()
+        # Tours consécutifs avec des agents sans décision (LLM en échec) -> report croissant
+        self._failed_turns = 0
+        # Cache des décisions IA (état quantifié -> décision)
+        self.decision_cache = None
+        if DECISION_CACHE_ENABLED:
+            self.decision_cache = DecisionCache(
+                DECISION_CACHE_SIZE, DECISION_CACHE_TTL, DECISION_CACHE_ENERGY_BUCKET,
+                DECISION_CACHE_DISK_PATH if DECISION_CACHE_DISK else None
+            )
+        # Découpage en batches sous budget de tokens (ajusté sur latence / erreurs)
+        self.batcher = AdaptiveBatcher(
+            BATCH_TOKEN_BUDGET, BATCH_MIN_TOKENS, BATCH_MAX_TOKENS, BATCH_MAX_AGENTS,
+            BATCH_TARGET_LATENCY, BATCH_MAX_ERROR_RATE, BATCH_OUTPUT_TOKENS,
+            extras_group=BATCH_EXTRAS_GROUP, adaptive=BATCH_ADAPTIVE
+        )
+
+    def seed_rngs(self, sim_seed=None):
+        """Graines des dés (un flux par agent) et de la météo. None : non reproductible."""
+        self.dice = rpg_system.DiceRoller(sim_seed)
+        self.weather_rng = random.Random(None if sim_seed is None else f"weather:{sim_seed}")
 
     def get_terrain_at(self, x, y):
         if 0 <= y < self.grid_size and 0 <= x < self.grid_size:
@@ -13,33 +83,68 @@ class SimulationEngine:
             return self.seed['map_legend'].get(char, "Inconnu")
         return "Océan"
 
+    def ensure_store(self, state):
+        """
+        Garantit que state.characters est un AgentStore (colonnes NumPy).
+        Convertit un dict de dicts (nouvelle partie, chargement, reset UI).
+        """
+        if not isinstance(state.characters, AgentStore):
+            state.characters = AgentStore.from_dict(state.characters)
+        return state.characters
+
+    def publish(self, state):
+        """Publie un snapshot immuable de l'état (lu par l'UI sans verrou)."""
+        snap = self.snapshots.publish(state, self._moved)
+        self._moved.clear()
+        return snap
+
+    def reset(self, state):
+        """Remet la partie à l'état du seed (thread moteur, entre deux tours)."""
+        if state.events is not None:
+            state.events.clear()
+        state.world_time = 1200
+        state.day = 0
+        state.weather = "Chaud"
+        state.characters = AgentStore.from_dict(copy.deepcopy(self.seed['characters']))
+        self._dirty.clear()
+        if self.decision_cache is not None:
+            self.decision_cache.clear() # Horloge remise à 1200 : les entrées datées ne valent plus
+        print("✅ Game State Reset to Seed.")
+
+    def _handle_requests(self, state):
+        """Demandes de l'UI (posées dans state), traitées au début d'un tick."""
+        if state.reset_requested:
+            state.reset_requested = False
+            self.reset(state)
+
     def tick(self, state, minutes=1):
         """
         Avance le temps. Retourne la liste des agents PRETS A JOUER.
-        Requires state object with: world_time, weather, characters.
+        Requires state object with: world_time, day, weather, characters.
+        world_time reste la minute du jour (affichage), day compte les jours écoulés.
         """
-        state.world_time = (state.world_time + minutes) % 1440
-        current_time = state.world_time
+        self._handle_requests(state)
+        previous_day = state.day or 0
+        before = absolute_time(state)
+        now = before + minutes
+        state.day, state.world_time = divmod(now, MINUTES_PER_DAY)
         
-        # Weather chance
-        if current_time % 10 == 0:
-             state.weather = weather.update_weather(state.weather)
+        # Nouveau jour : les relations s'estompent (vectorisé sur tout le graphe)
+        if state.day != previous_day and RELATION_DAILY_DECAY < 1.0:
+            factor = RELATION_DAILY_DECAY ** (state.day - previous_day)
+            self._dirty.update(relations.decay_relations(self.ensure_store(state), factor))
+        
+        # Weather chance : un tirage par frontière de 10 minutes franchie (les sauts
+        # du planificateur ne tombent pas forcément sur un multiple de 10)
+        for _ in range(now // WEATHER_PERIOD - before // WEATHER_PERIOD):
+             state.weather = weather.update_weather(state.weather, self.weather_rng)
              
-        # Find Free Agents
-        ready_agents = []
-        for name, v in state.characters.items():
-            busy_until = v.get('busy_until', 0)
-            # If busy_until < current_time (accounting for day wrap? Simplified: just linear check)
-            # Simplification: Reset busy_until on new day? 
-            # For now, let's assume linear time or handle midnight wrap carefully.
-            # To avoid wrap issues, we might want to store 'busy_remaining' instead?
-            # Or just ignore wrap for a prototype logic if we reset manually.
-            # Robust: busy_until is absolute minute of day. If we wrap 1440->0, we must reset busy_until too?
-            # Hack: If busy_until > 1440, it means next day.
-            
-            # Simple Logic: Action finishes.
-            if  current_time >= busy_until:
-                 ready_agents.append(name)
+        # Find Free Agents (seuls les réveils échus sortent du tas)
+        self.scheduler.ensure(self.ensure_store(state))
+        ready_agents = self.scheduler.pop_due(now)
+        # Frontière de tick : livraison groupée des événements en file (météo...)
+        bus.drain()
+        self.publish(state)
         
         return ready_agents
 
@@ -47,38 +152,40 @@ class SimulationEngine:
         """
         Avance jusqu'à la fin de la prochaine action en cours.
         """
-        current = state.world_time
-        min_busy = 9999
+        self._handle_requests(state)
+        current = absolute_time(state)
+        self.scheduler.ensure(self.ensure_store(state))
         
-        for v in state.characters.values():
-            b = v.get('busy_until', current)
-            if b > current:
-                if b < min_busy: min_busy = b
+        next_wake = self.scheduler.next_wake()
         
-        if min_busy == 9999: 
+        if next_wake is None: 
             return self.tick(state, 1) # No one busy? +1
             
-        delta = min_busy - current
+        delta = next_wake - current
         if delta <= 0: delta = 1
         
         return self.tick(state, delta)
 
-    def run_agents_turn(self, state, current_chapter_text="", target_agents=None):
+    def _prepare_turn(self, state, target_agents):
         """
-        Exécute la décision pour les agents spécifiés.
+        Prépare un tour : init des stats, choix des agents, cache et découpage en batches.
+        Retourne (target_agents, batches, time_str, cached_results, cache_keys)
+        ou None si personne ne joue.
         """
+        self._turn_started = time.perf_counter()
         # Update Time Display
         current_time_min = state.world_time
         time_str = f"{current_time_min // 60}h{current_time_min % 60:02d}"
 
         # Initialize Stats if needed
-        from game.entities import rpg as rpg_system
-        for name, v in state.characters.items():
-            if 'stats' not in v:
-                v['stats'] = rpg_system.init_stats(v['role'])
-                v['xp'] = 0; v['level'] = 1
+        chars = self.ensure_store(state)
+        for name in chars.names_where(~chars.present('stats')):
+            v = chars[name]
+            v['stats'] = rpg_system.init_stats(v['role'])
+            v['xp'] = 0; v['level'] = 1
+            self._dirty.add(name)
         
-        step_logs = []
+        self.spatial.ensure(state.characters)
         
         # Determine who plays
         if target_agents is None:
@@ -86,76 +193,295 @@ class SimulationEngine:
             target_agents = list(state.characters.keys())
             
         if not target_agents:
+            return None
+
+        # Decision Cache: a hit skips the agent's slot in the batch prompt
+        cached_results, cache_keys = self._lookup_cache(state, target_agents)
+        llm_agents = [n for n in target_agents if n in cache_keys] if self.decision_cache is not None else target_agents
+
+        # Record / replay: same batches as the tape, so the token budget stays at its initial value
+        if self.batcher.adaptive and getattr(state.llm, "FIXED_BATCHES", False):
+            self.batcher.freeze(BATCH_TOKEN_BUDGET)
+
+        # Create ad-hoc batches for just these agents (Extras grouped, others packed to the token budget)
+        batches = self.batcher.plan(llm_agents, state.characters, self.spatial)
+
+        return target_agents, batches, time_str, cached_results, cache_keys
+
+    def _lookup_cache(self, state, target_agents):
+        """
+        Cherche chaque agent dans le cache de décisions.
+        Retourne (cached_results, cache_keys) : les hits prêts à appliquer,
+        et pour les misses la clé + position de départ (mise en cache après l'appel IA).
+        """
+        if self.decision_cache is None:
+            return [], {}
+        chars = state.characters
+        now = absolute_time(state)
+        cached_results, cache_keys = [], {}
+        for name in target_agents:
+            v = chars[name]
+            pos = v['pos']
+            neighbors = self.spatial.query_radius(pos, exclude=name)
+            key = self.decision_cache.make_key(name, v, self.get_terrain_at(pos[0], pos[1]), state.weather, neighbors)
+            decision = self.decision_cache.get(key, pos, now)
+            if decision is not None:
+                cached_results.append((name, decision, v))
+            else:
+                cache_keys[name] = (key, pos)
+        return cached_results, cache_keys
+
+    def _store_in_cache(self, state, results, cache_keys):
+        """Met en cache les nouvelles décisions IA (hors RIEN / erreurs)."""
+        if self.decision_cache is None:
+            return
+        now = absolute_time(state)
+        for name, decision, v in results:
+            if name in cache_keys and str(decision.get('action', 'RIEN')).strip().upper() != "RIEN":
+                key, pos = cache_keys[name]
+                self.decision_cache.put(key, decision, pos, now)
+
+    def _observe_batch(self, agent_names, elapsed, decisions):
+        """Latence et décisions d'un appel : réglage du batcher et estimation du cache."""
+        self.batcher.observe(agent_names, elapsed, decisions)
+        if self.decision_cache is not None and agent_names:
+            self.decision_cache.observe_latency(elapsed / len(agent_names))
+
+    def _batch_llm(self, llm_obj, agent_names):
+        """Backend d'un batch : les extras passent par leur route (modèle rapide, LLM_ROUTES)."""
+        extras = self.batcher.extras_group
+        for_purpose = getattr(llm_obj, 'for_purpose', None)
+        if for_purpose is not None and agent_names and all(name in extras for name in agent_names):
+            return for_purpose(ROUTE_EXTRAS)
+        return llm_obj
+
+    def _batch_terrains(self, agent_names, chars_data):
+        terrains = {}
+        for name in agent_names:
+            v = chars_data[name]
+            terrains[name] = self.get_terrain_at(v['pos'][0], v['pos'][1])
+        return terrains
+
+    def _batch_results(self, decisions_map, chars_data):
+        batch_results = []
+        for name, decis in decisions_map.items():
+            if name in chars_data:
+                batch_results.append((name, decis, chars_data[name]))
+        return batch_results
+
+    def _process_batch(self, agent_names, chars_data, current_weather, llm_obj, t_str, context):
+        """Worker (thread) : un appel LLM bloquant pour un batch."""
+        try:
+            t0 = time.perf_counter()
+            decisions_map = characters.batch_agent_turn(
+                self._batch_llm(llm_obj, agent_names), agent_names, chars_data, 
+                t_str, current_weather, self.seed, self._batch_terrains(agent_names, chars_data), 
+                context=context,
+                spatial_index=self.spatial
+            )
+            self._observe_batch(agent_names, time.perf_counter() - t0, list(decisions_map.values()))
+            return self._batch_results(decisions_map, chars_data)
+        except Exception as e:
+            print(f"Error Batch {agent_names}: {e}")
+            self._observe_batch(agent_names, time.perf_counter() - t0, [])
             return []
 
-        # PROCESSING (Tiered Logic reused but filtered)
-        import concurrent.futures
-        
-        # Filter Batches for only target_agents
-        characters_snapshot = state.characters
-        weather_snapshot = state.weather
-        llm_instance = state.llm
-        
-        # Create ad-hoc batches for just these agents
-        batches = []
-        
-        # User defined Group: Creatures/Extras
-        extras_group = ["Peeves", "Baron", "Crocdur"]
-        found_extras = [n for n in target_agents if n in extras_group]
-        
-        # Remove them from the pool to batch
-        remaining_pool = [n for n in target_agents if n not in extras_group]
-        
-        # 1. Batch Extras together
-        if found_extras:
-            batches.append(found_extras)
-            
-        # 2. Batch others in MASSIVE groups (Gemini Flash Context is huge)
-        BATCH_SIZE = 15
-        for i in range(0, len(remaining_pool), BATCH_SIZE):
-            batches.append(remaining_pool[i:i+BATCH_SIZE])
-            
-        # Worker (Same as before)
-        def process_batch_task(agent_names, chars_data, current_weather, llm_obj, t_str):
-            try:
-                terrains = {}
-                for name in agent_names:
-                    v = chars_data[name]
-                    terrains[name] = self.get_terrain_at(v['pos'][0], v['pos'][1])
-                
-                decisions_map = characters.batch_agent_turn(
-                    llm_obj, agent_names, chars_data, 
-                    t_str, current_weather, self.seed, terrains, 
-                    context=current_chapter_text
-                )
-                
-                batch_results = []
-                for name, decis in decisions_map.items():
-                    if name in chars_data:
-                        batch_results.append((name, decis, chars_data[name]))
-                return batch_results
-            except Exception as e:
-                print(f"Error Batch {agent_names}: {e}")
-                return []
+    async def _process_batch_async(self, agent_names, chars_data, current_weather, llm_obj, t_str, context):
+        """Worker (coroutine) : un appel LLM asynchrone pour un batch."""
+        try:
+            t0 = time.perf_counter()
+            decisions_map = await characters.abatch_agent_turn(
+                self._batch_llm(llm_obj, agent_names), agent_names, chars_data, 
+                t_str, current_weather, self.seed, self._batch_terrains(agent_names, chars_data), 
+                context=context,
+                spatial_index=self.spatial
+            )
+            self._observe_batch(agent_names, time.perf_counter() - t0, list(decisions_map.values()))
+            return self._batch_results(decisions_map, chars_data)
+        except Exception as e:
+            print(f"Error Batch {agent_names}: {e}")
+            self._observe_batch(agent_names, time.perf_counter() - t0, [])
+            return []
+
+    def _get_semaphore(self):
+        """Sémaphore des appels LLM en vol, lié à la boucle d'événements courante."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def run_agents_turn(self, state, current_chapter_text="", target_agents=None):
+        """
+        Exécute la décision pour les agents spécifiés.
+        """
+        turn = self._prepare_turn(state, target_agents)
+        if turn is None:
+            return []
+        target_agents, batches, time_str, cached_results, cache_keys = turn
+
+        if self.streaming:
+            return self._run_streaming_turn(state, current_chapter_text, target_agents, batches, time_str, cached_results, cache_keys)
 
         # Execute
         results = []
         with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_batch = {
-                executor.submit(process_batch_task, batch, characters_snapshot, weather_snapshot, llm_instance, time_str): batch 
+            futures = [
+                executor.submit(self._process_batch, batch, state.characters, state.weather, state.llm, time_str, current_chapter_text)
                 for batch in batches
-            }
-            for future in concurrent.futures.as_completed(future_to_batch):
+            ]
+            # Results in batch order: the apply phase (dice rolls, logs) stays deterministic
+            for future in futures:
                  results.extend(future.result())
 
+        self._store_in_cache(state, results, cache_keys)
+        return self._apply_results(state, cached_results + results, target_agents, time_str)
+
+    async def run_agents_turn_async(self, state, current_chapter_text="", target_agents=None):
+        """
+        Variante asyncio de run_agents_turn (boucle d'événements du thread moteur).
+        Tous les batches sont lancés en même temps, le sémaphore borne les appels en vol.
+        """
+        turn = self._prepare_turn(state, target_agents)
+        if turn is None:
+            return []
+        target_agents, batches, time_str, cached_results, cache_keys = turn
+
+        semaphore = self._get_semaphore()
+        chars_data, current_weather, llm_obj = state.characters, state.weather, state.llm
+
+        if self.streaming:
+            return await self._run_streaming_turn_async(state, current_chapter_text, target_agents, batches, time_str, cached_results, cache_keys)
+
+        async def run_batch(batch):
+            async with semaphore:
+                return await self._process_batch_async(batch, chars_data, current_weather, llm_obj, time_str, current_chapter_text)
+
+        batch_results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        results = [r for batch in batch_results for r in batch]
+
+        self._store_in_cache(state, results, cache_keys)
+        return self._apply_results(state, cached_results + results, target_agents, time_str)
+
+    def _run_streaming_turn(self, state, context, target_agents, batches, time_str, cached_results, cache_keys):
+        """
+        Tour en streaming (threads) : les workers poussent chaque décision dès que
+        son objet JSON est complet, le thread moteur l'applique aussitôt.
+        """
+        step_logs, decided = self._apply_decisions(state, cached_results, time_str)
+        chars_data, current_weather, llm_obj = state.characters, state.weather, state.llm
+        decisions = queue.Queue()
+
+        def stream_batch(agent_names):
+            received = []
+            t0 = time.perf_counter()
+            try:
+                for name, decision in characters.stream_batch_agent_turn(
+                    self._batch_llm(llm_obj, agent_names), agent_names, chars_data, 
+                    time_str, current_weather, self.seed, self._batch_terrains(agent_names, chars_data), 
+                    context=context,
+                    spatial_index=self.spatial
+                ):
+                    received.append(decision)
+                    decisions.put((name, decision))
+            except Exception as e:
+                print(f"Error Batch {agent_names}: {e}")
+            finally:
+                self._observe_batch(agent_names, time.perf_counter() - t0, received)
+                decisions.put(None) # Fin du batch
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+            for batch in batches:
+                executor.submit(stream_batch, batch)
+            pending = len(batches)
+            while pending:
+                item = decisions.get()
+                if item is None:
+                    pending -= 1
+                    continue
+                self._apply_streamed(state, item, time_str, cache_keys, step_logs, decided)
+
+        return self._finish_turn(state, target_agents, step_logs, decided)
+
+    async def _run_streaming_turn_async(self, state, context, target_agents, batches, time_str, cached_results, cache_keys):
+        """
+        Tour en streaming (asyncio) : chaque décision est appliquée dès la fermeture
+        de son objet JSON, sans attendre la fin du batch.
+        """
+        step_logs, decided = self._apply_decisions(state, cached_results, time_str)
+        semaphore = self._get_semaphore()
+        chars_data, current_weather, llm_obj = state.characters, state.weather, state.llm
+
+        async def stream_batch(agent_names):
+            async with semaphore:
+                received = []
+                t0 = time.perf_counter()
+                try:
+                    async for item in characters.astream_batch_agent_turn(
+                        self._batch_llm(llm_obj, agent_names), agent_names, chars_data, 
+                        time_str, current_weather, self.seed, self._batch_terrains(agent_names, chars_data), 
+                        context=context,
+                        spatial_index=self.spatial
+                    ):
+                        received.append(item[1])
+                        self._apply_streamed(state, item, time_str, cache_keys, step_logs, decided)
+                except Exception as e:
+                    print(f"Error Batch {agent_names}: {e}")
+                self._observe_batch(agent_names, time.perf_counter() - t0, received)
+
+        await asyncio.gather(*(stream_batch(batch) for batch in batches))
+        return self._finish_turn(state, target_agents, step_logs, decided)
+
+    def _apply_streamed(self, state, item, time_str, cache_keys, step_logs, decided):
+        """Applique une décision reçue en streaming."""
+        name, decision = item
+        if name not in state.characters or name in decided:
+            return
+        result = [(name, decision, state.characters[name])]
+        self._store_in_cache(state, result, cache_keys)
+        logs, names = self._apply_decisions(state, result, time_str)
+        step_logs.extend(logs)
+        decided.update(names)
+
+    def _apply_results(self, state, results, target_agents, time_str):
+        """
+        Applique les décisions (déplacement, stats, jets, relations), journalise et sauvegarde.
+        """
+        step_logs, decided = self._apply_decisions(state, results, time_str)
+        return self._finish_turn(state, target_agents, step_logs, decided)
+
+    def _apply_decisions(self, state, results, time_str):
+        """
+        Applique une liste de décisions [(name, decision, v)].
+        Retourne (événements du lot, noms des agents traités).
+        """
+        chars = state.characters
+        t0 = time.perf_counter()
+        step_logs = []
+        now = absolute_time(state)
+
+        # Energie / Mana (vectorisé sur les colonnes)
+        resting = [name for name, decision, v in results if str(decision.get('action', 'RIEN')).strip().upper() == "REPOS"]
+        active = [name for name, decision, v in results if str(decision.get('action', 'RIEN')).strip().upper() != "REPOS"]
+        rows_rest, rows_active = chars.rows(resting), chars.rows(active)
+        chars.add_clipped('energy', rows_rest, 10, default=0, hi=100)
+        chars.add_clipped('mana', rows_rest, 10, default=0, hi=200, only_present=True)
+        chars.add_clipped('energy', rows_active, -2, default=100, lo=0)
+
+        # Jets de compétence du lot (dés par agent, XP / level up / fatigue en une passe)
+        checks = self._resolve_skill_checks(chars, results)
+
         # Apply Updates
+        decided = set()
+        rel_updates = [] # (indice du log, source, cible, delta) : appliqués en un lot
         for name, decision, v in results:
+            decided.add(name)
             
             # --- DURATION LOGIC ---
             duration = int(decision.get('duration', 15))
             if duration < 5: duration = 5 # Minimum 5 mins
-            v['busy_until'] = (state.world_time + duration) % 1440
-            # Handle midnight wrap logic carefully later. For now sim is 1 day.
+            v['busy_until'] = absolute_time(state) + duration # Minute absolue (multi-jours)
+            self.scheduler.schedule(name, v['busy_until'])
             
             # ACTIONS ...
             action = str(decision.get('action', 'RIEN')).strip().upper()
@@ -164,33 +490,15 @@ class SimulationEngine:
             dest_x, dest_y = decision.get('dest', v['pos'])
             new_x = max(0, min(self.grid_size-1, dest_x))
             new_y = max(0, min(self.grid_size-1, dest_y))
+            if v['pos'] != [new_x, new_y]:
+                self._moved.add(name)
             v['pos'] = [new_x, new_y]
-            
-            # Stats (Generic Fantasy) & RPG Recovery
-            if action == "REPOS":
-                v['energy'] = min(100, v.get('energy', 0) + 10)
-                if 'mana' in v: v['mana'] = min(200, v.get('mana', 0) + 10)
-            else:
-                v['energy'] = max(0, v.get('energy', 100) - 2)
+            self.spatial.move(name, v['pos'])
             
             # --- RPG MECHANIC: SKILL CHECK ---
             target_skill = decision.get('target_skill')
-            rpg_log = ""
-            skill_success = False
-            
-            if target_skill and target_skill in rpg_system.SKILLS:
-                # Roll
-                check = rpg_system.check_skill(v, target_skill)
-                status = "SUCCÈS" if check['success'] else "ÉCHEC"
-                skill_success = check['success']
-                rpg_log = f"\n> 🎲 **{target_skill}**: {check['roll']} + {check['bonus']} = {check['total']} (Diff {check['difficulty']}) -> **{status}**"
-                
-                if check['success']:
-                    xp_logs = rpg_system.gain_xp(v, 20) 
-                    if xp_logs: rpg_log += f" | {' '.join(xp_logs)}"
-                else:
-                    rpg_log += " | (Fatigue +2)"
-                    v['energy'] = max(0, v.get('energy', 0) - 2)
+            skill, xp_logs = checks.get(name, (None, ()))
+            skill_success = bool(skill and skill[5])
 
             # --- SOCIAL MECHANIC ---
             target_name = decision.get('target')
@@ -200,28 +508,87 @@ class SimulationEngine:
                 elif action == "DISCUTER" or action == "DRAGUER": delta = 2 
                 
                 if delta != 0:
-                    new_val, status = relations.update_affinity(v, target_name, delta)
-                    rpg_log += f"\n> ❤️ **Relation {target_name}**: {delta:+d} ({status}: {new_val})"
-
-            # Effects
-            action_msg = ""
-            if action == "BOIRE": action_msg = "🍺"
-            if action == "MAGIE": action_msg = "✨"
-            if action == "ETUDIER": action_msg = "📖"
-            if action == "DISCUTER": action_msg = "💬"
-            
-            if decision['reaction']: action_msg += f" \"{decision['reaction']}\""
-            
-            # Log
-            terrain_display = self.get_terrain_at(new_x, new_y)
-            stats_display = f"Lvl {v.get('level', 1)}"
-            # Show Duration in Log
-            log_entry = f"**{time_str} - {name}** ({terrain_display}) [{stats_display}]\n*{decision['pensee']}*\n> {action} {action_msg} (⏳ {duration} min){rpg_log}"
-            step_logs.append(log_entry)
-
-        # 3. Save State (Continuous)
-        state.logs = step_logs + state.logs
-        if len(state.logs) > 500: state.logs = state.logs[:500]
-        storage.save_world(state.characters, state.world_time, state.logs, state.weather)
+                    rel_updates.append((len(step_logs), name, target_name, delta))
+
+            # Log (structuré : le markdown est rendu à l'affichage, cf. event_log.render_markdown)
+            step_logs.append(EventRecord(
+                None, now, time_str, name, self.get_terrain_at(new_x, new_y), v.get('level', 1),
+                decision['pensee'], action, decision['reaction'], duration, skill, xp_logs, None,
+            ))
+
+        # Relations du lot (matrice creuse, mise à jour groupée)
+        if rel_updates:
+            applied = relations.update_affinities(chars, [(source, target, delta) for _, source, target, delta in rel_updates])
+            for (i, _, target, delta), (new_val, status) in zip(rel_updates, applied):
+                step_logs[i] = step_logs[i]._replace(relation=(target, delta, status, new_val))
+
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - t0, stage="decision_apply")
+        return step_logs, decided
+
+    def _resolve_skill_checks(self, chars, results):
+        """
+        Jets des agents qui tentent une compétence : succès -> +20 XP, échec -> fatigue.
+        Retourne {name: ((compétence, jet, bonus, total, difficulté, succès), logs XP)}.
+        """
+        attempts = [(name, decision['target_skill']) for name, decision, v in results
+                    if decision.get('target_skill') in rpg_system.SKILL_INDEX]
+        if not attempts:
+            return {}
+        names = [name for name, _ in attempts]
+        check = rpg_system.check_skills(chars, names, [skill for _, skill in attempts], dice=self.dice)
+        success = check.success.tolist()
+
+        winners = [name for name, ok in zip(names, success) if ok]
+        xp_logs = dict(zip(winners, rpg_system.gain_xp_batch(chars, winners, 20)))
+        chars.add_clipped('energy', chars.rows([name for name, ok in zip(names, success) if not ok]), -2, default=0, lo=0)
+
+        return {
+            name: ((skill, int(roll), int(bonus), int(total), int(difficulty), ok), tuple(xp_logs.get(name, ())))
+            for (name, skill), roll, bonus, total, difficulty, ok
+            in zip(attempts, check.roll, check.bonus, check.total, check.difficulty, success)
+        }
+
+    def failed_retry_delay(self):
+        """Report (minutes simulées) des agents sans décision après `_failed_turns` tours en échec."""
+        return min(LLM_FAILED_RETRY_MAX, LLM_FAILED_RETRY_MINUTES * 2 ** max(0, self._failed_turns - 1))
+
+    def llm_pause(self, state):
+        """Secondes (réelles) à attendre avant le prochain tour : circuit LLM ouvert -> horloge figée."""
+        policy = getattr(getattr(state.llm, "inner", state.llm), "policy", None)
+        return policy.breaker.retry_in() if policy is not None else 0.0
+
+    def _finish_turn(self, state, target_agents, step_logs, decided):
+        """Fin de tour : reprogrammation des agents sans décision, logs, sauvegarde."""
+        chars = state.characters
+
+        # Agents sans décision (batch en erreur) : réveil différé, doublé à chaque tour en échec
+        undecided = [name for name in target_agents if name in chars and name not in decided]
+        if undecided:
+            self._failed_turns += 1
+            retry_at = absolute_time(state) + self.failed_retry_delay()
+            for name in undecided:
+                self.scheduler.schedule(name, retry_at)
+        else:
+            self._failed_turns = 0
+
+        # 3. Save State (Continuous): journal des deltas, snapshot périodique
+        with metrics.stage("log"):
+            if state.events is None:
+                state.events = EventLog()
+            step_logs = state.events.extend(step_logs) # O(lot), sans recopie de l'historique
+            new_logs = [event_to_json(rec) for rec in step_logs] if self.autosave else None
+        if self.autosave:
+            storage.writer.submit(
+                state.characters, decided | self._dirty, new_logs, state.events,
+                state.world_time, state.weather, day=state.day or 0
+            )
+            self._dirty.clear()
+
+        self.turns += 1
+        self.decisions += len(decided)
+        metrics.TURNS.inc()
+        metrics.DECISIONS.inc(len(decided))
+        self.publish(state)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - self._turn_started, stage="turn")
         
         return step_logs
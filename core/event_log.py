@@ -0,0 +1,375 @@
+import atexit
+import glob
+import json
+import os
+from collections import deque, namedtuple
+
+from core.config import EVENT_LOG_CAPACITY, EVENT_SEGMENT_EVENTS, EVENT_MAX_SEGMENTS
+
+# Événement d'un tour d'agent (structuré : le markdown n'est produit qu'à l'affichage)
+EventRecord = namedtuple("EventRecord", [
+    "seq",        # Numéro croissant (attribué par EventLog.append)
+    "t",          # Minute absolue de simulation
+    "time",       # Heure affichée ("20h00")
+    "agent",
+    "terrain",
+    "level",
+    "thought",
+    "action",
+    "reaction",
+    "duration",
+    "skill",      # (compétence, jet, bonus, total, difficulté, succès) ou None
+    "xp",         # Messages d'XP / level up (tuple)
+    "relation",   # (cible, delta, statut, valeur) ou None
+    "text",       # Markdown déjà formaté (anciennes sauvegardes uniquement)
+], defaults=(None,))
+
+ACTION_EMOJI = {"BOIRE": "🍺", "MAGIE": "✨", "ETUDIER": "📖", "DISCUTER": "💬"}
+SEGMENT_PATTERN = "events_*.jsonl"
+MARK_EVERY = 256  # Repère (t, offset) tous les N événements d'un segment
+
+
+def event_to_json(rec):
+    return rec._asdict()
+
+
+def event_from_json(item):
+    """dict JSON (ou ancien log markdown) -> EventRecord."""
+    if isinstance(item, str):
+        return EventRecord(None, 0, "", None, "", 1, "", "", "", 0, None, (), None, item)
+    rec = EventRecord(**{k: item.get(k) for k in EventRecord._fields})
+    return rec._replace(
+        skill=tuple(rec.skill) if rec.skill else None,
+        xp=tuple(rec.xp or ()),
+        relation=tuple(rec.relation) if rec.relation else None,
+    )
+
+
+def render_markdown(rec):
+    """Markdown d'un événement (format historique du journal de partie)."""
+    if rec.text is not None:
+        return rec.text
+    rpg_log = ""
+    if rec.skill:
+        skill, roll, bonus, total, difficulty, success = rec.skill
+        status = "SUCCÈS" if success else "ÉCHEC"
+        rpg_log = f"\n> 🎲 **{skill}**: {roll} + {bonus} = {total} (Diff {difficulty}) -> **{status}**"
+        if success:
+            if rec.xp: rpg_log += f" | {' '.join(rec.xp)}"
+        else:
+            rpg_log += " | (Fatigue +2)"
+    if rec.relation:
+        target, delta, status, value = rec.relation
+        rpg_log += f"\n> ❤️ **Relation {target}**: {delta:+d} ({status}: {value})"
+
+    action_msg = ACTION_EMOJI.get(rec.action, "")
+    if rec.reaction: action_msg += f" \"{rec.reaction}\""
+    return (f"**{rec.time} - {rec.agent}** ({rec.terrain}) [Lvl {rec.level}]\n*{rec.thought}*\n"
+            f"> {rec.action} {action_msg} (⏳ {rec.duration} min){rpg_log}")
+
+
+def export_markdown(events, path, agent=None, t0=None, t1=None):
+    """Écrit le journal (un agent ou tous, de t0 à t1 exclu) en markdown. Retourne le nb d'événements."""
+    records = events.for_agent(agent, t0, t1) if agent else events.between(t0, t1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(render_markdown(rec) for rec in records) + "\n")
+    return len(records)
+
+
+class EventLog:
+    """
+    Journal des événements de la partie.
+    - En mémoire : tampon circulaire borné (capacity), indexé par agent (seq par agent)
+      et par temps (recherche dichotomique, les événements arrivent dans l'ordre du temps).
+      Ajout en O(1), sans copie de l'historique.
+    - Sur disque (attach) : segments JSONL tournants, chacun avec un index
+      (offsets par agent, repères temporels), pour les requêtes au-delà du tampon.
+    """
+    def __init__(self, capacity=EVENT_LOG_CAPACITY, segment_events=EVENT_SEGMENT_EVENTS, max_segments=EVENT_MAX_SEGMENTS):
+        self.capacity = capacity
+        self.segment_events = segment_events
+        self.max_segments = max_segments
+        self._ring = [None] * capacity
+        self._first = 0   # seq du plus ancien événement en mémoire
+        self._next = 0    # seq du prochain événement
+        self._by_agent = {}  # agent -> deque des seq en mémoire
+        self._latest = (None, ())
+        self.spill_dir = None
+        self._segments = []  # Segments fermés : {path, first, last, t0, t1} (plus ancien d'abord)
+        self._open = None    # Segment en cours d'écriture
+
+    @classmethod
+    def restore(cls, items, **kwargs):
+        """Journal reconstruit depuis une sauvegarde ('logs' : plus récents d'abord)."""
+        log = cls(**kwargs)
+        records = [event_from_json(item) for item in items or []]
+        legacy = [rec for rec in records if rec.seq is None]
+        structured = sorted((rec for rec in records if rec.seq is not None), key=lambda rec: rec.seq)
+        for rec in legacy[::-1] + structured:
+            if rec.seq is not None and rec.seq != log._next:
+                if rec.seq < log._next:
+                    continue # Doublon
+                log._drop_memory()
+                log._first = log._next = rec.seq
+            log._insert(rec._replace(seq=log._next))
+        return log
+
+    def __len__(self):
+        return self._next - self._first
+
+    def _get(self, seq):
+        return self._ring[seq % self.capacity]
+
+    def _drop_memory(self):
+        self._ring = [None] * self.capacity
+        self._by_agent = {}
+        self._first = self._next
+
+    def _insert(self, rec):
+        seq = rec.seq
+        if seq - self._first >= self.capacity:
+            # Tampon plein : le plus ancien sort (c'est aussi le plus ancien de son agent)
+            old = self._get(self._first)
+            seqs = self._by_agent.get(old.agent)
+            if seqs:
+                seqs.popleft()
+                if not seqs:
+                    del self._by_agent[old.agent]
+            self._first += 1
+        self._ring[seq % self.capacity] = rec
+        self._next = seq + 1
+        if rec.agent is not None:
+            self._by_agent.setdefault(rec.agent, deque()).append(seq)
+
+    def append(self, rec):
+        """Ajoute un événement (seq attribué ici). Retourne l'événement numéroté."""
+        rec = rec._replace(seq=self._next)
+        self._insert(rec)
+        if self.spill_dir is not None:
+            self._spill(rec)
+        return rec
+
+    def extend(self, records):
+        return [self.append(rec) for rec in records]
+
+    def latest(self, n):
+        """Les n derniers événements, plus récents d'abord (tuple, mis en cache)."""
+        key, cached = self._latest
+        if key != (self._next, n):
+            stop = max(self._first, self._next - n)
+            cached = tuple(self._get(seq) for seq in range(self._next - 1, stop - 1, -1))
+            self._latest = ((self._next, n), cached)
+        return cached
+
+    def export(self, limit):
+        """Derniers événements en JSON, plus récents d'abord (format 'logs' des sauvegardes)."""
+        return [event_to_json(rec) for rec in self.latest(limit)]
+
+    def clear(self):
+        """Vide le journal (mémoire et segments sur disque) : nouvelle partie."""
+        self._drop_memory()
+        self._first = self._next = 0
+        self._latest = (None, ())
+        if self.spill_dir is not None:
+            self._close_segment()
+            for seg in self._segments:
+                self._remove_segment(seg)
+            self._segments = []
+
+    # --- Requêtes ---
+
+    def _seq_at(self, t):
+        """Premier seq en mémoire dont le temps est >= t."""
+        lo, hi = self._first, self._next
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._get(mid).t < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _needs_disk(self, t0):
+        # Des événements sortis du tampon peuvent tomber dans l'intervalle
+        if self.spill_dir is None or not (self._segments or self._open):
+            return False
+        return t0 is None or self._first == self._next or self._get(self._first).t >= t0
+
+    def between(self, t0=None, t1=None):
+        """Événements de t0 (inclus) à t1 (exclu), dans l'ordre chronologique."""
+        lo = self._first if t0 is None else self._seq_at(t0)
+        hi = self._next if t1 is None else self._seq_at(t1)
+        found = [self._get(seq) for seq in range(lo, hi)]
+        if self._needs_disk(t0):
+            found = self._read_disk(None, t0, t1) + found
+        return found
+
+    def for_agent(self, agent, t0=None, t1=None):
+        """Événements d'un agent de t0 (inclus) à t1 (exclu), ordre chronologique."""
+        found = []
+        for seq in self._by_agent.get(agent, ()):
+            rec = self._get(seq)
+            if (t0 is None or rec.t >= t0) and (t1 is None or rec.t < t1):
+                found.append(rec)
+        if self._needs_disk(t0):
+            found = self._read_disk(agent, t0, t1) + found
+        return found
+
+    # --- Segments sur disque ---
+
+    def attach(self, directory):
+        """
+        Active le déversement sur disque. Les segments existants au-delà de
+        l'historique restauré (autre partie, tours perdus) sont supprimés.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.spill_dir = directory
+        self._segments = []
+        for path in sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN))):
+            seg = self._load_segment(path, self._next)
+            if seg is None:
+                self._remove_segment({"path": path})
+                continue
+            self._segments.append(seg)
+        self._prune()
+        atexit.register(self.close)
+
+    def _index_path(self, path):
+        return path[:-len(".jsonl")] + ".idx.json"
+
+    def _load_segment(self, path, limit):
+        """
+        Entrée du catalogue d'un segment (None s'il est vide). Sans index (arrêt brutal)
+        ou s'il dépasse `limit` (seq non couverts par la sauvegarde), le segment est
+        tronqué à la dernière ligne valide < limit et son index reconstruit.
+        """
+        try:
+            with open(self._index_path(path), "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index["last"] < limit:
+                return {"path": path, **{k: index[k] for k in ("first", "last", "t0", "t1")}}
+        except (OSError, ValueError, KeyError):
+            pass
+        seg = self._new_index(path)
+        offset = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    rec = event_from_json(json.loads(line))
+                except ValueError:
+                    break # Ligne tronquée
+                if rec.seq >= limit:
+                    break
+                self._index_record(seg, rec, offset)
+                offset += len(line)
+        if seg["first"] is None:
+            return None
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+        self._write_index(seg)
+        return {k: seg[k] for k in ("path", "first", "last", "t0", "t1")}
+
+    def _new_index(self, path):
+        return {"path": path, "first": None, "last": None, "t0": None, "t1": None,
+                "count": 0, "size": 0, "agents": {}, "marks": []}
+
+    def _index_record(self, seg, rec, offset):
+        if seg["first"] is None:
+            seg["first"], seg["t0"] = rec.seq, rec.t
+        if seg["count"] % MARK_EVERY == 0:
+            seg["marks"].append([rec.t, offset])
+        seg["last"], seg["t1"] = rec.seq, rec.t
+        seg["count"] += 1
+        if rec.agent is not None:
+            seg["agents"].setdefault(rec.agent, []).append(offset)
+
+    def _write_index(self, seg):
+        index = {k: seg[k] for k in ("first", "last", "t0", "t1", "count", "agents", "marks")}
+        path = self._index_path(seg["path"])
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    def _spill(self, rec):
+        seg = self._open
+        if seg is None:
+            path = os.path.join(self.spill_dir, f"events_{rec.seq:010d}.jsonl")
+            seg = self._open = self._new_index(path)
+            seg["file"] = open(path, "ab")
+        line = (json.dumps(event_to_json(rec), ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        self._index_record(seg, rec, seg["size"])
+        seg["file"].write(line)
+        seg["size"] += len(line)
+        if seg["count"] >= self.segment_events:
+            self._close_segment()
+            self._prune()
+
+    def _close_segment(self):
+        seg, self._open = self._open, None
+        if seg is None:
+            return
+        seg["file"].close()
+        self._write_index(seg)
+        self._segments.append({k: seg[k] for k in ("path", "first", "last", "t0", "t1")})
+
+    def _remove_segment(self, seg):
+        for path in (seg["path"], self._index_path(seg["path"])):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _prune(self):
+        while len(self._segments) > self.max_segments:
+            self._remove_segment(self._segments.pop(0))
+
+    def _read_disk(self, agent, t0, t1):
+        """Événements des segments sortis du tampon mémoire (seq < premier seq en mémoire)."""
+        if self._open is not None:
+            self._open["file"].flush()
+        found = []
+        for seg in self._segments + ([self._open] if self._open else []):
+            if seg["first"] >= self._first:
+                break
+            if (t1 is not None and seg["t0"] >= t1) or (t0 is not None and seg["t1"] < t0):
+                continue
+            index = seg if "agents" in seg else self._read_index(seg)
+            if agent is not None:
+                offsets = index["agents"].get(agent)
+                if not offsets:
+                    continue
+                lines = self._read_lines(seg["path"], offsets)
+            else:
+                start = 0
+                for mark_t, offset in index["marks"]:
+                    if t0 is not None and mark_t < t0:
+                        start = offset
+                lines = self._read_from(seg["path"], start)
+            for line in lines:
+                try:
+                    rec = event_from_json(json.loads(line))
+                except ValueError:
+                    break
+                if rec.seq >= self._first or (t1 is not None and rec.t >= t1):
+                    break
+                if t0 is None or rec.t >= t0:
+                    found.append(rec)
+        return found
+
+    def _read_index(self, seg):
+        with open(self._index_path(seg["path"]), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_lines(self, path, offsets):
+        with open(path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                yield f.readline()
+
+    def _read_from(self, path, offset):
+        with open(path, "rb") as f:
+            f.seek(offset)
+            yield from f
+
+    def close(self):
+        if self._open is not None:
+            self._open["file"].flush()
+            self._write_index(self._open)
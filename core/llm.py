@@ -1,68 +1,678 @@
 import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import zlib
+import gzip
+import atexit
+import hashlib
+import threading
+from collections import deque
+from copy import copy
 from google import genai
+from google.genai import types
 from dotenv import load_dotenv
+from core.config import (
+    PROMPT_CACHE_ENABLED, PROMPT_CACHE_TTL, PROMPT_CACHE_MIN_TOKENS, LLM_BASE_URL,
+    ROUTE_DECISION, LLM_MODEL_DEFAULT, LLM_ROUTES, LLM_PRICES,
+)
+from core import metrics
+from core.resilience import CallPolicy, LLMError, LLMTimeout, LatencyTracker
 
 # Load Env (API Key)
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not API_KEY:
-    print("FATAL: Clé API Google manquante dans le fichier .env !")
+def estimate_tokens(text):
+    """Estimation grossière (~4 caractères par token) quand le fournisseur ne renvoie pas l'usage."""
+    return (len(text) + 3) // 4 if text else 0
+
+class PromptStats:
+    """
+    Comptage des tokens préfixe / suffixe par appel LLM.
+    cached = tokens servis depuis le cache de contexte du fournisseur (0 si inconnu).
+    """
+    def __init__(self, history=256):
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=history)  # Derniers appels
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.prefix_tokens = 0
+            self.suffix_tokens = 0
+            self.cached_tokens = 0
+            self.explicit_calls = 0
+            self.recent.clear()
+
+    def record(self, prefix, suffix, usage=None, explicit=False):
+        """`explicit` : appel servi par un cache de contexte créé (suffixe seul envoyé)."""
+        prefix_tokens = estimate_tokens(prefix)
+        suffix_tokens = estimate_tokens(suffix)
+        cached = 0
+        if usage is not None:
+            cached = getattr(usage, 'cached_content_token_count', None) or 0
+            total = getattr(usage, 'prompt_token_count', None)
+            if total:
+                # Répartition réelle : le suffixe est ce qui dépasse le préfixe
+                if prefix:
+                    prefix_tokens = min(total, max(cached, prefix_tokens))
+                suffix_tokens = total - prefix_tokens if prefix else total
+        with self._lock:
+            self.calls += 1
+            self.prefix_tokens += prefix_tokens
+            self.suffix_tokens += suffix_tokens
+            self.cached_tokens += cached
+            self.explicit_calls += bool(explicit)
+            self.recent.append({"prefix": prefix_tokens, "suffix": suffix_tokens, "cached": cached})
+        metrics.LLM_CALLS.inc()
+        metrics.LLM_TOKENS.inc(prefix_tokens, part="prefix")
+        metrics.LLM_TOKENS.inc(suffix_tokens, part="suffix")
+        metrics.LLM_TOKENS.inc(cached, part="cached")
+
+    def summary(self):
+        with self._lock:
+            calls = self.calls
+            sent = self.prefix_tokens + self.suffix_tokens
+            avg_prefix = self.prefix_tokens / calls if calls else 0.0
+            return {
+                "calls": calls,
+                "prefix_tokens": self.prefix_tokens,
+                "suffix_tokens": self.suffix_tokens,
+                "cached_tokens": self.cached_tokens,
+                "avg_prefix": avg_prefix,
+                "avg_suffix": self.suffix_tokens / calls if calls else 0.0,
+                "cached_ratio": self.cached_tokens / sent if sent else 0.0,
+                "explicit_cache_calls": self.explicit_calls,
+                # Préfixe sous le minimum du fournisseur : aucun cache possible, cached_tokens reste à 0
+                "cache_min_tokens": PROMPT_CACHE_MIN_TOKENS,
+                "prefix_cacheable": avg_prefix >= PROMPT_CACHE_MIN_TOKENS,
+            }
+
+prompt_stats = PromptStats()
+
+def route_model(purpose):
+    """Modèle configuré pour une route (LLM_ROUTES), modèle par défaut sinon."""
+    return LLM_ROUTES.get(purpose, LLM_MODEL_DEFAULT)
+
+class RouteStats:
+    """
+    Latence, tokens et coût estimé (LLM_PRICES) par route : décisions, extras, récit...
+    Tokens réels si le fournisseur renvoie l'usage, estimés sinon.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+    def record(self, purpose, model, elapsed, prompt, text, usage=None, error=False):
+        input_tokens = (getattr(usage, 'prompt_token_count', None) if usage is not None else None) or estimate_tokens(prompt)
+        output_tokens = (getattr(usage, 'candidates_token_count', None) if usage is not None else None) or estimate_tokens(text)
+        price_in, price_out = LLM_PRICES.get(model, (0.0, 0.0))
+        with self._lock:
+            route = self._routes.get(purpose)
+            if route is None or route["model"] != model:
+                route = self._routes[purpose] = {"model": model, "calls": 0, "errors": 0, "seconds": 0.0,
+                                                 "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+                                                 "latency": LatencyTracker()}
+            route["calls"] += 1
+            route["errors"] += bool(error)
+            route["seconds"] += elapsed
+            route["latency"].observe(elapsed)
+            if not error:
+                route["input_tokens"] += input_tokens
+                route["output_tokens"] += output_tokens
+                route["cost_usd"] += (input_tokens * price_in + output_tokens * price_out) / 1e6
+        metrics.LLM_ROUTE_SECONDS.observe(elapsed, route=purpose, model=model)
+
+    def summary(self):
+        with self._lock:
+            return {
+                purpose: {
+                    "model": r["model"],
+                    "calls": r["calls"],
+                    "errors": r["errors"],
+                    "avg_s": round(r["seconds"] / r["calls"], 3) if r["calls"] else 0.0,
+                    "p95_s": round(r["latency"].quantile(0.95), 3),
+                    "input_tokens": r["input_tokens"],
+                    "output_tokens": r["output_tokens"],
+                    "cost_usd": round(r["cost_usd"], 6),
+                }
+                for purpose, r in self._routes.items()
+            }
+
+route_stats = RouteStats()
+
+class ClientPool:
+    """
+    genai.Client partagés par tout le processus, un par (clé, endpoint, timeout) :
+    chaque client garde ses connexions HTTP ouvertes (keep-alive), au lieu d'un
+    nouveau client (et d'une nouvelle connexion TLS) par appel.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self.created = 0
+        self.reused = 0
+
+    def get(self, api_key, base_url=None, timeout_ms=None):
+        key = (api_key, base_url, timeout_ms)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = genai.Client(api_key=api_key, http_options=types.HttpOptions(base_url=base_url, timeout=timeout_ms))
+                self._clients[key] = client
+                self.created += 1
+            else:
+                self.reused += 1
+            return client
+
+    def stats(self):
+        with self._lock:
+            return {"clients": len(self._clients), "created": self.created, "reused": self.reused}
+
+client_pool = ClientPool()
+
+def _join(prompt, prefix):
+    return prefix + prompt if prefix else prompt
 
 class GeminiWrapper:
-    def __init__(self, model_name="models/gemini-2.0-flash-exp"):
+    """
+    Client Gemini. Les appels passent par une CallPolicy (délai, requête couverte,
+    relances, coupe-circuit) : un appel sans réponse lève LLMError au lieu de
+    renvoyer un texte d'erreur.
+    """
+    _warned = False
+
+    def __init__(self, model_name=LLM_MODEL_DEFAULT, base_url=None, policy=None, purpose=ROUTE_DECISION):
         self.model_name = model_name
+        self.purpose = purpose
+        self.base_url = base_url or os.getenv("LLM_BASE_URL") or LLM_BASE_URL
+        self.policy = policy or CallPolicy()
         self.client = None
-        if API_KEY:
+        # Serveur local (tools/fake_llm_server.py) : pas besoin de vraie clé
+        api_key = API_KEY or ("local" if self.base_url else None)
+        if api_key:
             try:
-                self.client = genai.Client(api_key=API_KEY)
+                self.client = client_pool.get(api_key, self.base_url, int(self.policy.deadline * 1000))
             except Exception as e:
-                print(f"Erreur Client GenAI: {e}")
+                print(f"Erreur Client GenAI: {e}", file=sys.stderr)
+        elif not GeminiWrapper._warned:
+            # Sur stderr, une seule fois : stdout reste propre (headless --json, backends fake / replay)
+            GeminiWrapper._warned = True
+            print("FATAL: Clé API Google manquante dans le fichier .env !", file=sys.stderr)
         
         # Compatibility layer for storybook.py (client.models.generate_content)
         self.models = self 
 
-    def invoke(self, prompt):
+        # Cache de contexte : hash du préfixe -> (nom du cache, expiration)
+        self._prefix_caches = {}
+        self._uncacheable = set()
+        self._cache_lock = threading.Lock()
+
+    # --- Cache de contexte (préfixe statique) ---
+    def _cache_lookup(self, prefix):
+        """(hash, nom du cache valide ou None, création à tenter ?)"""
+        if not prefix or not PROMPT_CACHE_ENABLED:
+            return None, None, False
+        h = prompt_hash(prefix)
+        with self._cache_lock:
+            if h in self._uncacheable:
+                return h, None, False
+            entry = self._prefix_caches.get(h)
+            if entry and entry[1] > time.time() + 60:
+                return h, entry[0], False
+        return h, None, estimate_tokens(prefix) >= PROMPT_CACHE_MIN_TOKENS
+
+    def _cache_config(self, prefix):
+        return types.CreateCachedContentConfig(contents=[prefix], ttl=f"{PROMPT_CACHE_TTL}s")
+
+    def _cache_created(self, h, cache):
+        with self._cache_lock:
+            if cache is None:
+                # Modèle / compte sans cache explicite : on n'insiste pas
+                self._uncacheable.add(h)
+                return None
+            self._prefix_caches[h] = (cache.name, time.time() + PROMPT_CACHE_TTL)
+            return cache.name
+
+    def _cached_prefix(self, prefix):
+        h, name, create = self._cache_lookup(prefix)
+        if create:
+            try:
+                cache = self.client.caches.create(model=self.model_name, config=self._cache_config(prefix))
+            except Exception as e:
+                print(f"Cache de contexte indisponible: {e}")
+                cache = None
+            name = self._cache_created(h, cache)
+        return name
+
+    async def _acached_prefix(self, prefix):
+        h, name, create = self._cache_lookup(prefix)
+        if create:
+            try:
+                cache = await self.client.aio.caches.create(model=self.model_name, config=self._cache_config(prefix))
+            except Exception as e:
+                print(f"Cache de contexte indisponible: {e}")
+                cache = None
+            name = self._cache_created(h, cache)
+        return name
+
+    def _request(self, prompt, prefix, cache_name):
+        """Arguments d'appel : suffixe seul sur le cache, sinon prompt complet (préfixe en tête)."""
+        if cache_name:
+            return {"contents": prompt, "config": types.GenerateContentConfig(cached_content=cache_name)}
+        return {"contents": _join(prompt, prefix)}
+
+    def for_purpose(self, purpose):
+        """Client de la route `purpose` (même endpoint, modèle de LLM_ROUTES)."""
+        return gemini_for(purpose, self.base_url)
+
+    def _observe(self, elapsed, model, prompt, text="", usage=None, error=False):
+        route_stats.record(self.purpose, model, elapsed, prompt, text, usage, error)
+
+    def invoke(self, prompt, prefix=None):
         """Interface simple Synchrone (pour characters.py)"""
         if not self.client: return "No Client"
+        cache_name = self._cached_prefix(prefix)
+        request = self._request(prompt, prefix, cache_name)
+        t0 = time.perf_counter()
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name, 
-                contents=prompt
-            )
-            return response.text
-        except Exception as e:
-            return f"[Erreur GenAI: {e}]"
+            response = self.policy.call(lambda: self.client.models.generate_content(model=self.model_name, **request))
+        except LLMError:
+            self._observe(time.perf_counter() - t0, self.model_name, _join(prompt, prefix), error=True)
+            raise
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_stats.record(prefix, prompt, usage, explicit=bool(cache_name))
+        self._observe(time.perf_counter() - t0, self.model_name, _join(prompt, prefix), response.text, usage)
+        return response.text
+
+    async def ainvoke(self, prompt, prefix=None):
+        """Interface Asynchrone (asyncio natif via client.aio)"""
+        if not self.client: return "No Client"
+        cache_name = await self._acached_prefix(prefix)
+        request = self._request(prompt, prefix, cache_name)
+        t0 = time.perf_counter()
+        try:
+            response = await self.policy.acall(lambda: self.client.aio.models.generate_content(model=self.model_name, **request))
+        except LLMError:
+            self._observe(time.perf_counter() - t0, self.model_name, _join(prompt, prefix), error=True)
+            raise
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_stats.record(prefix, prompt, usage, explicit=bool(cache_name))
+        self._observe(time.perf_counter() - t0, self.model_name, _join(prompt, prefix), response.text, usage)
+        return response.text
 
     def generate_content(self, model, contents):
         """Compatibilité avec storybook.py"""
         if not self.client: return type('Response', (), {'text': "No Client"})
         
         target = model if model else self.model_name
+        t0 = time.perf_counter()
         try:
-            return self.client.models.generate_content(
-                model=target,
-                contents=contents
-            )
-        except Exception as e:
+            response = self.policy.call(lambda: self.client.models.generate_content(model=target, contents=contents))
+        except LLMError as e:
+            self._observe(time.perf_counter() - t0, target, contents, error=True)
             return type('Response', (), {'text': f"[Erreur: {e}]"})
+        self._observe(time.perf_counter() - t0, target, contents, response.text or "", getattr(response, 'usage_metadata', None))
+        return response
 
-    def generate_content_stream(self, model, contents):
+    def generate_content_stream(self, model, contents, prefix=None):
         """Streaming"""
         if not self.client: 
             yield type('Chunk', (), {'text': "No Client"})
             return
 
         target = model if model else self.model_name
+        # Le cache de contexte est lié au modèle par défaut
+        cache_name = self._cached_prefix(prefix) if target == self.model_name else None
+        self.policy.admit_stream()
+        usage = None
+        # Délai appliqué à l'attente des morceaux (pas au temps passé chez le consommateur)
+        waited, mark = 0.0, time.perf_counter()
+        parts = []
         try:
             # New SDK might return an iterator directly
-            for chunk in self.client.models.generate_content_stream(model=target, contents=contents):
+            for chunk in self.client.models.generate_content_stream(model=target, **self._request(contents, prefix, cache_name)):
+                waited += time.perf_counter() - mark
+                if waited > self.policy.deadline:
+                    raise LLMTimeout(f"Flux LLM trop lent ({waited:.0f}s)")
+                usage = getattr(chunk, 'usage_metadata', None) or usage
+                if chunk.text: parts.append(chunk.text)
+                yield chunk
+                mark = time.perf_counter()
+        except Exception as e:
+            self.policy.stream_done(waited, e)
+            self._observe(waited, target, _join(contents, prefix), error=True)
+            raise e if isinstance(e, LLMError) else LLMError(str(e)) from e
+        self.policy.stream_done(waited)
+        prompt_stats.record(prefix, contents, usage, explicit=bool(cache_name))
+        self._observe(waited, target, _join(contents, prefix), "".join(parts), usage)
+
+    async def agenerate_content_stream(self, model, contents, prefix=None):
+        """Streaming asynchrone (client.aio)"""
+        if not self.client: 
+            yield type('Chunk', (), {'text': "No Client"})
+            return
+
+        target = model if model else self.model_name
+        cache_name = await self._acached_prefix(prefix) if target == self.model_name else None
+        self.policy.admit_stream()
+        usage = None
+        waited, mark = 0.0, time.perf_counter()
+        parts = []
+        try:
+            stream = await asyncio.wait_for(
+                self.client.aio.models.generate_content_stream(model=target, **self._request(contents, prefix, cache_name)),
+                self.policy.deadline)
+            chunks = stream.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, self.policy.deadline - waited - (time.perf_counter() - mark)))
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise LLMTimeout(f"Flux LLM trop lent ({self.policy.deadline:.0f}s)")
+                waited += time.perf_counter() - mark
+                usage = getattr(chunk, 'usage_metadata', None) or usage
+                if chunk.text: parts.append(chunk.text)
                 yield chunk
+                mark = time.perf_counter()
         except Exception as e:
-            yield type('Chunk', (), {'text': f"[Erreur Stream: {e}]"})
+            self.policy.stream_done(waited, e)
+            self._observe(waited, target, _join(contents, prefix), error=True)
+            raise e if isinstance(e, LLMError) else LLMError(str(e)) from e
+        self.policy.stream_done(waited)
+        prompt_stats.record(prefix, contents, usage, explicit=bool(cache_name))
+        self._observe(waited, target, _join(contents, prefix), "".join(parts), usage)
+
+STREAM_CHUNKS = 8 # Découpage des réponses simulées en streaming
+
+def _split_chunks(text, n=STREAM_CHUNKS):
+    size = max(1, -(-len(text) // n))
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+class FakeLLM:
+    """
+    Backend local sans réseau (benchmarks, tests de charge).
+    Répond des décisions JSON valides pour chaque agent du prompt après une latence artificielle.
+    Réponse déterministe pour un prompt donné.
+    """
+    AGENT_RE = re.compile(r"--- PERSONNAGE: (.+?) ---.*?\(Coord \[(-?\d+), (-?\d+)\]\)", re.S)
+    ACTIONS = [("ETUDIER", "SAVOIR"), ("DISCUTER", "SOCIAL"), ("EXPLORER", "PHYSIQUE"),
+               ("MAGIE", "MAGIE"), ("REPOS", None), ("SE DEPLACER", None)]
+    MODEL = "fake"
+
+    def __init__(self, latency=0.0, seed=0, purpose=ROUTE_DECISION):
+        self.latency = latency
+        self.seed = seed
+        self.purpose = purpose
+        self.calls = 0
+        self.models = self
+
+    def _respond(self, prompt):
+        self.calls += 1
+        rng = random.Random(zlib.crc32(prompt.encode("utf-8")) ^ self.seed)
+        agents = self.AGENT_RE.findall(prompt)
+        names = [a[0] for a in agents]
+        decisions = {}
+        for name, x, y in agents:
+            action, skill = rng.choice(self.ACTIONS)
+            decisions[name] = {
+                "pensee": f"{name} réfléchit...",
+                "action": action,
+                "duration": rng.choice([5, 15, 30, 60, 120]),
+                "target": rng.choice(names),
+                "target_skill": skill,
+                "dest": [int(x) + rng.randint(-1, 1), int(y) + rng.randint(-1, 1)],
+                "reaction": None
+            }
+        return json.dumps(decisions, ensure_ascii=False)
+
+    def for_purpose(self, purpose):
+        routed = copy(self)
+        routed.purpose = purpose
+        return routed
+
+    def invoke(self, prompt, prefix=None):
+        t0 = time.perf_counter()
+        if self.latency: time.sleep(self.latency)
+        prompt_stats.record(prefix, prompt)
+        text = self._respond(_join(prompt, prefix))
+        route_stats.record(self.purpose, self.MODEL, time.perf_counter() - t0, _join(prompt, prefix), text)
+        return text
+
+    async def ainvoke(self, prompt, prefix=None):
+        t0 = time.perf_counter()
+        if self.latency: await asyncio.sleep(self.latency)
+        prompt_stats.record(prefix, prompt)
+        text = self._respond(_join(prompt, prefix))
+        route_stats.record(self.purpose, self.MODEL, time.perf_counter() - t0, _join(prompt, prefix), text)
+        return text
+
+    def generate_content(self, model, contents):
+        return type('Response', (), {'text': self.invoke(contents)})
+
+    def generate_content_stream(self, model, contents, prefix=None):
+        t0 = time.perf_counter()
+        prompt_stats.record(prefix, contents)
+        text = self._respond(_join(contents, prefix))
+        # La latence est répartie sur les morceaux (premier token plus tôt)
+        for part in _split_chunks(text):
+            if self.latency: time.sleep(self.latency / STREAM_CHUNKS)
+            yield type('Chunk', (), {'text': part})
+        route_stats.record(self.purpose, self.MODEL, time.perf_counter() - t0, _join(contents, prefix), text)
+
+    async def agenerate_content_stream(self, model, contents, prefix=None):
+        t0 = time.perf_counter()
+        prompt_stats.record(prefix, contents)
+        text = self._respond(_join(contents, prefix))
+        for part in _split_chunks(text):
+            if self.latency: await asyncio.sleep(self.latency / STREAM_CHUNKS)
+            yield type('Chunk', (), {'text': part})
+        route_stats.record(self.purpose, self.MODEL, time.perf_counter() - t0, _join(contents, prefix), text)
+
+def prompt_hash(prompt):
+    """Empreinte compacte d'un prompt (clé d'enregistrement / rejeu)."""
+    return hashlib.blake2b(str(prompt).encode("utf-8"), digest_size=16).hexdigest()
+
+class RecordingLLM:
+    """
+    Enregistre chaque paire prompt -> réponse d'un backend (live en général)
+    dans une bande compacte : JSONL gzip de {"h": hash du prompt, "r": réponse}.
+    """
+    # Découpage en batches figé : le budget adaptatif suit la latence réelle et la bande divergerait au rejeu
+    FIXED_BATCHES = True
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self.records = 0
+        self.models = self
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        atexit.register(self.close)
+
+    def _record(self, prompt, response):
+        line = json.dumps({"h": prompt_hash(prompt), "r": response}, ensure_ascii=False)
+        with self._lock:
+            if self._file is None or self._file.closed: return
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def for_purpose(self, purpose):
+        """Même bande, backend interne routé (copie partageant le fichier et son verrou)."""
+        routed = copy(self)
+        routed.inner = self.inner.for_purpose(purpose)
+        return routed
+
+    def invoke(self, prompt, prefix=None):
+        res = self.inner.invoke(prompt, prefix=prefix)
+        self._record(_join(prompt, prefix), res)
+        return res
+
+    async def ainvoke(self, prompt, prefix=None):
+        res = await self.inner.ainvoke(prompt, prefix=prefix)
+        self._record(_join(prompt, prefix), res)
+        return res
+
+    def generate_content(self, model, contents):
+        text = self.inner.generate_content(model, contents).text
+        self._record(contents, text)
+        return type('Response', (), {'text': text})
+
+    def generate_content_stream(self, model, contents, prefix=None):
+        parts = []
+        for chunk in self.inner.generate_content_stream(model, contents, prefix=prefix):
+            if chunk.text: parts.append(chunk.text)
+            yield chunk
+        self._record(_join(contents, prefix), "".join(parts))
+
+    async def agenerate_content_stream(self, model, contents, prefix=None):
+        parts = []
+        async for chunk in self.inner.agenerate_content_stream(model, contents, prefix=prefix):
+            if chunk.text: parts.append(chunk.text)
+            yield chunk
+        self._record(_join(contents, prefix), "".join(parts))
+
+class ReplayLLM:
+    """
+    Rejoue une bande enregistrée par RecordingLLM, par hash du contenu du prompt.
+    Un même prompt enregistré plusieurs fois est rejoué dans l'ordre d'enregistrement.
+    Latence synthétique configurable, aucun accès réseau.
+    """
+    MODEL = "replay"
+    FIXED_BATCHES = True
+
+    def __init__(self, path, latency=0.0, purpose=ROUTE_DECISION):
+        self.path = path
+        self.latency = latency
+        self.purpose = purpose
+        self.calls = 0
+        self.misses = 0
+        self.models = self
+        self._lock = threading.Lock()
+        self._tape = {}
+        self._cursor = {}
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # Fin de bande tronquée (arrêt brutal pendant l'enregistrement)
+                self._tape.setdefault(rec["h"], []).append(rec["r"])
+
+    def _lookup(self, prompt):
+        h = prompt_hash(prompt)
+        with self._lock:
+            self.calls += 1
+            responses = self._tape.get(h)
+            if not responses:
+                self.misses += 1
+                return f"[Replay: prompt inconnu {h}]"
+            i = self._cursor.get(h, 0)
+            self._cursor[h] = i + 1
+            return responses[min(i, len(responses) - 1)]
+
+    def for_purpose(self, purpose):
+        routed = copy(self)
+        routed.purpose = purpose
+        return routed
+
+    def invoke(self, prompt, prefix=None):
+        t0 = time.perf_counter()
+        if self.latency: time.sleep(self.latency)
+        prompt_stats.record(prefix, prompt)
+        text = self._lookup(_join(prompt, prefix))
+        route_stats.record(self.purpose, self.MODEL, time.perf_counter() - t0, _join(prompt, prefix), text)
+        return text
+
+    async def ainvoke(self, prompt, prefix=None):
+        t0 = time.perf_counter()
+        if self.latency: await asyncio.sleep(self.latency)
+        prompt_stats.record(prefix, prompt)
+        text = self._lookup(_join(prompt, prefix))
+        route_stats.record(self.purpose, self.MODEL, time.perf_counter() - t0, _join(prompt, prefix), text)
+        return text
+
+    def generate_content(self, model, contents):
+        return type('Response', (), {'text': self.invoke(contents)})
+
+    def generate_content_stream(self, model, contents, prefix=None):
+        t0 = time.perf_counter()
+        prompt_stats.record(prefix, contents)
+        text = self._lookup(_join(contents, prefix))
+        for part in _split_chunks(text):
+            if self.latency: time.sleep(self.latency / STREAM_CHUNKS)
+            yield type('Chunk', (), {'text': part})
+        route_stats.record(self.purpose, self.MODEL, time.perf_counter() - t0, _join(contents, prefix), text)
+
+    async def agenerate_content_stream(self, model, contents, prefix=None):
+        t0 = time.perf_counter()
+        prompt_stats.record(prefix, contents)
+        text = self._lookup(_join(contents, prefix))
+        for part in _split_chunks(text):
+            if self.latency: await asyncio.sleep(self.latency / STREAM_CHUNKS)
+            yield type('Chunk', (), {'text': part})
+        route_stats.record(self.purpose, self.MODEL, time.perf_counter() - t0, _join(contents, prefix), text)
+
+DEFAULT_TAPE = os.path.join("data", "llm_tape.jsonl.gz")
+
+_gemini_lock = threading.Lock()
+_gemini = {}     # (route, endpoint) -> GeminiWrapper
+_recorders = {}  # bande -> RecordingLLM
+_recorders_lock = threading.Lock()
+
+def gemini_for(purpose=ROUTE_DECISION, base_url=None):
+    """
+    GeminiWrapper partagé d'une route (modèle de LLM_ROUTES) : un seul par route et
+    par endpoint pour tout le processus, sur un client du pool (connexions réutilisées).
+    """
+    base_url = base_url or os.getenv("LLM_BASE_URL") or LLM_BASE_URL
+    with _gemini_lock:
+        wrapper = _gemini.get((purpose, base_url))
+        if wrapper is None:
+            wrapper = _gemini[(purpose, base_url)] = GeminiWrapper(route_model(purpose), base_url=base_url, purpose=purpose)
+        return wrapper
+
+def get_llm(backend=None, tape=None, latency=None, purpose=ROUTE_DECISION):
+    """
+    Backend LLM (env LLM_BACKEND si non précisé) :
+    - "live"   : Gemini en ligne (défaut)
+    - "record" : Gemini en ligne + enregistrement sur bande (LLM_TAPE)
+    - "replay" : rejeu hors-ligne de la bande, latence LLM_REPLAY_LATENCY (s)
+    - "fake"   : réponses synthétiques locales (FakeLLM)
+    `purpose` : route (ROUTE_DECISION, ROUTE_NARRATION...) qui choisit le modèle.
+    """
+    backend = backend or os.getenv("LLM_BACKEND", "live")
+    tape = tape or os.getenv("LLM_TAPE", DEFAULT_TAPE)
+    if latency is None:
+        latency = float(os.getenv("LLM_REPLAY_LATENCY", "0"))
 
-def get_llm():
-    # Model: Gemini 3 Flash Preview (Requis par User)
-    MODEL_NAME = "models/gemini-3-flash-preview"
-    
-    return GeminiWrapper(MODEL_NAME)
+    if backend == "replay":
+        return ReplayLLM(tape, latency, purpose=purpose)
+    if backend == "fake":
+        return FakeLLM(latency, purpose=purpose)
+    if backend == "record":
+        # Une seule bande ouverte par fichier, partagée par toutes les routes
+        with _recorders_lock:
+            if tape not in _recorders:
+                _recorders[tape] = RecordingLLM(gemini_for(ROUTE_DECISION), tape)
+            recorder = _recorders[tape]
+        return recorder if purpose == ROUTE_DECISION else recorder.for_purpose(purpose)
+    return gemini_for(purpose)
@@ -0,0 +1,196 @@
+"""
+Métriques du pipeline de simulation (histogrammes, compteurs), sans dépendance.
+Exposition au format texte Prometheus (serve() : http://127.0.0.1:<port>/metrics)
+et lecture directe pour l'overlay de l'UI (summary()).
+
+Étapes mesurées (sim_stage_seconds{stage=...}) :
+prompt_build, llm_wait, json_extract, decision_apply, log, save_world, journal_write, turn.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bornes des histogrammes de durée (secondes) : 0.1 ms -> 30 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels_text(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    """Compteur monotone, avec étiquettes optionnelles."""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(k, "") for k in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(k, "") for k in self.labels), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels_text(self.labels, key)} {value}" for key, value in items]
+
+
+class _Series:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n):
+        self.counts = [0] * (n + 1)  # Dernier seau : +Inf
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """Histogramme à seaux fixes (cumulés au rendu, comme Prometheus)."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(k, "") for k in self.labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets))
+            series.counts[i] += 1
+            series.sum += value
+            series.count += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def quantile(self, q, **labels):
+        """Quantile estimé (borne supérieure du seau atteint)."""
+        series = self._series.get(tuple(labels.get(k, "") for k in self.labels))
+        if series is None or not series.count:
+            return 0.0
+        target = q * series.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), series.counts):
+            seen += n
+            if seen >= target:
+                return bound if bound != float("inf") else self.buckets[-1]
+        return self.buckets[-1]
+
+    def series(self):
+        """{étiquettes: (nombre, somme)}."""
+        with self._lock:
+            return {key: (s.count, s.sum) for key, s in self._series.items()}
+
+    def render(self):
+        lines = []
+        with self._lock:
+            items = sorted((key, list(s.counts), s.sum, s.count) for key, s in self._series.items())
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels_text(self.labels, key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_labels_text(self.labels, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name, help_text, labels=()):
+        return self._metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._metrics.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        """Texte d'exposition Prometheus (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registre unique et métriques du pipeline
+registry = MetricsRegistry()
+STAGE_SECONDS = registry.histogram("sim_stage_seconds", "Durée des étapes du pipeline de tour", ("stage",))
+TURNS = registry.counter("sim_turns_total", "Tours d'agents terminés")
+DECISIONS = registry.counter("sim_decisions_total", "Décisions appliquées")
+LLM_CALLS = registry.counter("llm_calls_total", "Appels LLM")
+LLM_TOKENS = registry.counter("llm_tokens_total", "Tokens de prompt envoyés", ("part",))
+LLM_ERRORS = registry.counter("llm_errors_total", "Erreurs LLM (appel ou réponse inexploitable)", ("kind",))
+LLM_RETRIES = registry.counter("llm_retries_total", "Nouvelles tentatives d'appel LLM")
+LLM_ROUTE_SECONDS = registry.histogram("llm_route_seconds", "Latence des appels LLM par route et modèle", ("route", "model"))
+SAVE_LAG = registry.histogram("save_lag_seconds", "Délai entre la demande de sauvegarde et son écriture")
+SAVE_BYTES = registry.counter("save_bytes_total", "Octets écrits par la sauvegarde (journal + snapshots)")
+
+STAGES = ("prompt_build", "llm_wait", "json_extract", "decision_apply", "log", "save_world", "journal_write", "turn")
+
+
+def stage(name):
+    """with stage("prompt_build"): ... -> sim_stage_seconds{stage="prompt_build"}"""
+    return STAGE_SECONDS.time(stage=name)
+
+
+def summary():
+    """{étape: (appels, total s, p50 s, p95 s)} pour l'overlay de l'UI."""
+    out = {}
+    for (name,), (count, total) in STAGE_SECONDS.series().items():
+        out[name] = (count, total, STAGE_SECONDS.quantile(0.5, stage=name), STAGE_SECONDS.quantile(0.95, stage=name))
+    return out
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Pas de log par requête de scrape
+
+
+def serve(port, host="127.0.0.1"):
+    """Endpoint Prometheus en tâche de fond (localhost uniquement par défaut)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    print(f"📈 Métriques Prometheus : http://{host}:{server.server_port}/metrics")
+    return server
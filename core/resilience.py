@@ -0,0 +1,349 @@
+import asyncio
+import concurrent.futures
+import random
+import threading
+import time
+from collections import deque
+
+import httpx # Transport de google-genai
+
+from core import metrics
+from core.config import (
+    LLM_MAX_CONCURRENCY, LLM_DEADLINE, LLM_HEDGE_ENABLED, LLM_HEDGE_QUANTILE, LLM_HEDGE_MIN_DELAY, LLM_HEDGE_MAX_DELAY,
+    LLM_HEDGE_WARMUP, LLM_HEDGE_BUDGET, LLM_RETRIES, LLM_RETRY_BASE, LLM_RETRY_MAX, LLM_RETRY_BUDGET,
+    LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN,
+)
+
+
+class LLMError(Exception):
+    """Appel LLM abandonné (erreur, délai dépassé ou circuit ouvert) : aucune réponse exploitable."""
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+class CircuitOpen(LLMError):
+    pass
+
+
+# Erreurs de transport rejouables (délai, connexion coupée, réponse tronquée)
+_TRANSIENT = (LLMTimeout, TimeoutError, asyncio.TimeoutError, ConnectionError, OSError,
+              httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+def is_retryable(exc):
+    """Liste blanche : délai, réseau, HTTP 408 / 429 / 5xx. Tout le reste (4xx, bugs, circuit ouvert) échoue tout de suite."""
+    if isinstance(exc, _TRANSIENT):
+        return True
+    code = getattr(exc, 'code', None)
+    return isinstance(code, int) and (code in (408, 429) or code >= 500)
+
+
+def backoff_delay(attempt, base=LLM_RETRY_BASE, cap=LLM_RETRY_MAX, rng=random):
+    """Backoff exponentiel à gigue complète : uniforme dans [0, min(cap, base * 2^attempt)]."""
+    return rng.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class LatencyTracker:
+    """Latences des derniers appels réussis (fenêtre glissante) -> quantiles."""
+    def __init__(self, window=256):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def quantile(self, q):
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RetryBudget:
+    """
+    Seau de jetons : chaque appel dépose `ratio` jeton, chaque relance (ou requête
+    couverte) en consomme un. Les relances restent sous ~ratio x le trafic,
+    même quand le fournisseur tombe (pas de tempête de relances).
+    """
+    def __init__(self, ratio, burst=10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+
+class CircuitBreaker:
+    """
+    Coupe-circuit : après `failures` échecs consécutifs, les appels échouent
+    immédiatement pendant `cooldown` s, puis un seul appel d'essai (semi-ouvert)
+    décide de la fermeture ou d'une nouvelle période d'ouverture.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failures=LLM_BREAKER_FAILURES, cooldown=LLM_BREAKER_COOLDOWN, clock=time.monotonic):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probe = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probe = False
+            if self.state == self.HALF_OPEN and not self._probe:
+                self._probe = True
+                return True
+            return False
+
+    def retry_in(self):
+        """Secondes avant l'appel d'essai (0 si le circuit laisse passer)."""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.cooldown - (self.clock() - self.opened_at))
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.max_failures:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self._probe = False
+
+
+# Threads des appels synchrones couverts (un appel perdant n'est pas annulable : il finit en fond)
+_hedge_pool = concurrent.futures.ThreadPoolExecutor(max_workers=2 * LLM_MAX_CONCURRENCY, thread_name_prefix="llm-hedge")
+
+
+class CallPolicy:
+    """
+    Contrôle de la latence de queue d'un backend LLM :
+    - délai max par appel, relances et backoff compris (deadline) ;
+    - requête couverte (hedge) : doublon envoyé si la première n'a pas répondu
+      après le p95 observé, la première réponse gagne (budget de doublons borné) ;
+    - relances à gigue complète, sous budget ;
+    - coupe-circuit.
+    Lève LLMError quand aucune réponse n'a pu être obtenue.
+    """
+    def __init__(self, deadline=LLM_DEADLINE, hedge=LLM_HEDGE_ENABLED, retries=LLM_RETRIES,
+                 breaker=None, rng=None):
+        self.deadline = deadline
+        self.hedge = hedge
+        self.retries = retries
+        self.latency = LatencyTracker()
+        self.retry_budget = RetryBudget(LLM_RETRY_BUDGET)
+        self.hedge_budget = RetryBudget(LLM_HEDGE_BUDGET)
+        self.breaker = breaker or CircuitBreaker()
+        self.rng = rng or random.Random()
+
+        # Compteurs
+        self.calls = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def hedge_delay(self):
+        """Attente avant le doublon : p95 des derniers appels (None tant que l'historique est trop court)."""
+        if not self.hedge or len(self.latency) < LLM_HEDGE_WARMUP:
+            return None
+        return min(LLM_HEDGE_MAX_DELAY, max(LLM_HEDGE_MIN_DELAY, self.latency.quantile(LLM_HEDGE_QUANTILE)))
+
+    def _admit(self):
+        self.calls += 1
+        self.retry_budget.deposit()
+        self.hedge_budget.deposit()
+        if not self.breaker.allow():
+            self.rejected += 1
+            metrics.LLM_ERRORS.inc(kind="circuit_open")
+            raise CircuitOpen("Circuit LLM ouvert")
+
+    def _failed(self, exc, attempt, left):
+        """Échec d'une tentative : attente avant la relance, ou None si on abandonne (left : budget restant, s)."""
+        self.breaker.failure()
+        if isinstance(exc, LLMTimeout):
+            self.timeouts += 1
+            metrics.LLM_ERRORS.inc(kind="timeout")
+        else:
+            metrics.LLM_ERRORS.inc(kind="api")
+        if attempt >= self.retries or not is_retryable(exc) or not self.breaker.allow():
+            return None
+        pause = backoff_delay(attempt, rng=self.rng)
+        if pause >= left: # Plus le temps d'une tentative avant la fin du délai
+            return None
+        if not self.retry_budget.withdraw():
+            return None
+        self.retried += 1
+        metrics.LLM_RETRIES.inc()
+        return pause
+
+    def _succeeded(self, elapsed, hedge_won):
+        self.breaker.success()
+        self.latency.observe(elapsed)
+        if hedge_won:
+            self.hedge_wins += 1
+
+    def _want_hedge(self):
+        if not self.hedge_budget.withdraw():
+            return False
+        self.hedged += 1
+        return True
+
+    # --- Synchrone (threads) ---
+    def _attempt(self, fn, budget):
+        """Une tentative : appel principal, doublon après hedge_delay, premier résultat valide (au plus budget s)."""
+        t0 = time.perf_counter()
+        delay = self.hedge_delay()
+        pending = {_hedge_pool.submit(fn)}
+        first = next(iter(pending))
+        hedge_sent = False
+        error = None
+        while pending:
+            remaining = budget - (time.perf_counter() - t0)
+            if remaining <= 0:
+                break
+            wait = remaining if hedge_sent or delay is None else min(remaining, max(0.0, delay - (time.perf_counter() - t0)))
+            done, pending = concurrent.futures.wait(pending, timeout=wait, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self._succeeded(time.perf_counter() - t0, future is not first)
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                break
+            if not hedge_sent and delay is not None and time.perf_counter() - t0 >= delay:
+                if self._want_hedge():
+                    pending.add(_hedge_pool.submit(fn))
+                    hedge_sent = True
+                else:
+                    delay = None # Budget de doublons épuisé : on attend la première
+        if error is not None and not pending:
+            raise error
+        raise LLMTimeout(f"Pas de réponse LLM en {self.deadline:.0f}s")
+
+    def call(self, fn):
+        """fn() -> réponse ; relances et doublons selon la politique, le tout en moins de deadline s."""
+        self._admit()
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(fn, self.deadline - (time.perf_counter() - start))
+            except Exception as e:
+                pause = self._failed(e, attempt, self.deadline - (time.perf_counter() - start))
+                if pause is None:
+                    raise e if isinstance(e, LLMError) else LLMError(str(e)) from e
+                time.sleep(pause)
+                attempt += 1
+
+    # --- Asyncio ---
+    async def _aattempt(self, factory, budget):
+        t0 = time.perf_counter()
+        delay = self.hedge_delay()
+        first = asyncio.ensure_future(factory())
+        pending = {first}
+        hedge_sent = False
+        error = None
+        try:
+            while pending:
+                remaining = budget - (time.perf_counter() - t0)
+                if remaining <= 0:
+                    break
+                wait = remaining if hedge_sent or delay is None else min(remaining, max(0.0, delay - (time.perf_counter() - t0)))
+                done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._succeeded(time.perf_counter() - t0, task is not first)
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    break
+                if not hedge_sent and delay is not None and time.perf_counter() - t0 >= delay:
+                    if self._want_hedge():
+                        pending.add(asyncio.ensure_future(factory()))
+                        hedge_sent = True
+                    else:
+                        delay = None
+        finally:
+            # Perdants et tentatives hors délai : annulés (la connexion est libérée)
+            for task in pending:
+                task.cancel()
+        if error is not None and not pending:
+            raise error
+        raise LLMTimeout(f"Pas de réponse LLM en {self.deadline:.0f}s")
+
+    async def acall(self, factory):
+        """factory() -> coroutine (une nouvelle par tentative / doublon)."""
+        self._admit()
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                return await self._aattempt(factory, self.deadline - (time.perf_counter() - start))
+            except Exception as e:
+                pause = self._failed(e, attempt, self.deadline - (time.perf_counter() - start))
+                if pause is None:
+                    raise e if isinstance(e, LLMError) else LLMError(str(e)) from e
+                await asyncio.sleep(pause)
+                attempt += 1
+
+    # --- Flux (pas de doublon : les morceaux sont déjà consommés) ---
+    def admit_stream(self):
+        self._admit()
+
+    def stream_done(self, elapsed, error=None):
+        if error is None:
+            self._succeeded(elapsed, False)
+        else:
+            self.breaker.failure()
+            metrics.LLM_ERRORS.inc(kind="timeout" if isinstance(error, LLMTimeout) else "api")
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retried,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "p50_s": round(self.latency.quantile(0.5), 3),
+            "p95_s": round(self.latency.quantile(0.95), 3),
+            "hedge_delay_s": self.hedge_delay(),
+        }
@@ -0,0 +1,79 @@
+import heapq
+from typing import Dict, List, Optional
+
+MINUTES_PER_DAY = 1440
+
+
+def absolute_time(state) -> int:
+    """Minute absolue de simulation (jour * 1440 + minute du jour)."""
+    return (state.get('day') or 0) * MINUTES_PER_DAY + state.get('world_time', 0)
+
+
+class EventScheduler:
+    """
+    File de priorité (tas binaire) des réveils d'agents, indexée en minutes absolues.
+    Remplace le polling de busy_until : pop_due() ne sort que les agents dus, en O(k log N).
+    Les entrées périmées (agent reprogrammé) sont ignorées paresseusement.
+    """
+    def __init__(self):
+        self._heap = []  # (wake, seq, name)
+        # name -> minute de réveil courante (None = agent sorti, tour en cours)
+        self._wake: Dict[str, Optional[int]] = {}
+        self._seq = 0
+        self._source = None
+
+    def __len__(self):
+        return len(self._wake)
+
+    def schedule(self, name: str, wake: int):
+        """(Re)programme le réveil d'un agent."""
+        wake = int(wake)
+        self._wake[name] = wake
+        self._seq += 1
+        heapq.heappush(self._heap, (wake, self._seq, name))
+
+    def cancel(self, name: str):
+        self._wake.pop(name, None)
+
+    def pop_due(self, now: int) -> List[str]:
+        """Retire et retourne les agents dont le réveil est <= now (ordre chronologique)."""
+        due = []
+        heap, wake = self._heap, self._wake
+        while heap and heap[0][0] <= now:
+            t, _, name = heapq.heappop(heap)
+            if wake.get(name) == t:
+                wake[name] = None
+                due.append(name)
+        return due
+
+    def next_wake(self) -> Optional[int]:
+        """Prochaine minute de réveil programmée (None si personne n'est programmé)."""
+        heap, wake = self._heap, self._wake
+        while heap:
+            t, _, name = heap[0]
+            if wake.get(name) == t:
+                return t
+            heapq.heappop(heap)
+        return None
+
+    def rebuild(self, characters_state):
+        """Reprogramme tous les agents depuis leur busy_until (absolu)."""
+        self._heap = []
+        self._wake = {}
+        self._seq = 0
+        if hasattr(characters_state, 'column'):
+            busy = characters_state.column('busy_until', 0)
+            for name, b in zip(characters_state.names, busy):
+                self.schedule(name, b)
+        else:
+            for name, v in characters_state.items():
+                self.schedule(name, v.get('busy_until', 0))
+        self._source = characters_state
+
+    def ensure(self, characters_state):
+        """
+        Resynchronise si le dict des personnages a été remplacé (chargement, reset)
+        ou si des agents ont été ajoutés/retirés.
+        """
+        if characters_state is not self._source or len(characters_state) != len(self._wake):
+            self.rebuild(characters_state)
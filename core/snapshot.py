@@ -0,0 +1,86 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+import numpy as np
+
+# Vue immuable de l'état publiée par le moteur pour l'UI
+# (tuples / tableaux NumPy en lecture seule / mappings proxy : jamais modifiés après publication)
+WorldSnapshot = namedtuple("WorldSnapshot", [
+    "version",      # Incrémenté à chaque publication
+    "epoch",        # Incrémenté quand la population est remplacée (chargement, reset)
+    "names",        # tuple des noms, dans l'ordre des lignes
+    "index",        # name -> ligne
+    "roles",        # tuple des rôles (même ordre que names)
+    "pos",          # np.ndarray (N, 2) int32, lecture seule
+    "world_time",
+    "day",
+    "weather",
+    "logs",         # tuple des derniers EventRecord (plus récents d'abord, cf. event_log.render_markdown)
+    "changed",      # np.ndarray des lignes modifiées depuis la version précédente
+])
+
+SNAPSHOT_LOGS = 50
+
+
+def _frozen(array):
+    array.flags.writeable = False
+    return array
+
+
+class SnapshotPublisher:
+    """
+    Double buffer moteur -> UI : le thread moteur construit un WorldSnapshot après
+    chaque tick / tour puis le publie par une seule affectation de référence
+    (atomique sous le GIL). L'UI lit latest() sans verrou et ne voit jamais d'état
+    partiellement modifié. Coût d'une publication : copie des positions (NumPy) ;
+    noms et rôles ne sont reconstruits que si la population change.
+    """
+    def __init__(self):
+        self._latest = None
+        self._version = 0
+        self._epoch = 0
+        self._source = None
+        self._count = -1
+        self._names = ()
+        self._index = MappingProxyType({})
+        self._roles = ()
+
+    def latest(self):
+        """Dernier snapshot publié (None avant la première publication)."""
+        return self._latest
+
+    def _refresh_population(self, chars):
+        if chars is not self._source:
+            self._epoch += 1
+        self._source = chars
+        self._count = len(chars)
+        self._names = tuple(chars.names)
+        self._index = MappingProxyType({name: i for i, name in enumerate(self._names)})
+        self._roles = tuple(chars[name].get('role', 'Villager') for name in self._names)
+
+    def publish(self, state, changed=()):
+        """
+        Construit et publie le snapshot courant (thread moteur uniquement).
+        changed : noms des agents modifiés depuis la publication précédente
+        (toute la population si elle a été remplacée).
+        """
+        chars = state.characters
+        if chars is not self._source or len(chars) != self._count:
+            self._refresh_population(chars)
+            rows = np.arange(len(self._names))
+        else:
+            index = self._index
+            rows = np.fromiter((index[n] for n in changed if n in index), dtype=np.intp)
+
+        if hasattr(chars, 'positions'):
+            pos = chars.positions().copy()
+        else:
+            pos = np.array([chars[name]['pos'] for name in self._names], dtype=np.int32).reshape(-1, 2)
+
+        self._version += 1
+        self._latest = WorldSnapshot(
+            self._version, self._epoch, self._names, self._index, self._roles, _frozen(pos),
+            state.world_time, state.day or 0, state.weather, state.events.latest(SNAPSHOT_LOGS) if state.events is not None else (),
+            _frozen(rows),
+        )
+        return self._latest
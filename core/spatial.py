@@ -0,0 +1,115 @@
+from typing import Dict, List, Tuple
+
+# Rayon de perception des agents (en cases, distance de Chebyshev)
+PERCEPTION_RADIUS = 2
+
+
+class SpatialGrid:
+    """
+    Index spatial par cellules (hash de grille) sur les positions des agents.
+    Une requête de rayon r ne visite que les cellules voisines : coût ~constant
+    par agent tant que la densité locale reste raisonnable.
+    """
+    def __init__(self, cell_size: int = PERCEPTION_RADIUS + 1):
+        self.cell_size = max(1, int(cell_size))
+        # (cx, cy) -> {name: None} (dict = ensemble ordonné, itération déterministe)
+        self._cells: Dict[Tuple[int, int], Dict[str, None]] = {}
+        self._positions: Dict[str, Tuple[int, int]] = {}
+        # Ordre d'insertion, pour restituer les voisins dans l'ordre du dict source
+        self._order: Dict[str, int] = {}
+        self._source = None
+
+    def _cell(self, x, y):
+        return (x // self.cell_size, y // self.cell_size)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def clear(self):
+        self._cells.clear()
+        self._positions.clear()
+        self._order.clear()
+        self._source = None
+
+    def insert(self, name: str, pos):
+        """Ajoute (ou déplace) un agent."""
+        x, y = int(pos[0]), int(pos[1])
+        if name in self._positions:
+            self.move(name, (x, y))
+            return
+        self._positions[name] = (x, y)
+        self._order[name] = len(self._order)
+        self._cells.setdefault(self._cell(x, y), {})[name] = None
+
+    def move(self, name: str, pos):
+        """Met à jour la position d'un agent déjà indexé."""
+        if name not in self._positions:
+            self.insert(name, pos)
+            return
+        x, y = int(pos[0]), int(pos[1])
+        old = self._positions[name]
+        if old == (x, y):
+            return
+        self._positions[name] = (x, y)
+        old_cell, new_cell = self._cell(*old), self._cell(x, y)
+        if old_cell != new_cell:
+            bucket = self._cells[old_cell]
+            del bucket[name]
+            if not bucket:
+                del self._cells[old_cell]
+            self._cells.setdefault(new_cell, {})[name] = None
+
+    def remove(self, name: str):
+        old = self._positions.pop(name, None)
+        if old is None:
+            return
+        self._order.pop(name, None)
+        cell = self._cell(*old)
+        bucket = self._cells.get(cell, {})
+        bucket.pop(name, None)
+        if not bucket:
+            self._cells.pop(cell, None)
+
+    def rebuild(self, characters_state):
+        """Reconstruit l'index complet depuis un dict {name: {'pos': [x, y], ...}}."""
+        self.clear()
+        for name, v in characters_state.items():
+            self.insert(name, v['pos'])
+        self._source = characters_state
+
+    def ensure(self, characters_state):
+        """
+        Resynchronise l'index si le dict des personnages a été remplacé
+        (chargement, reset) ou si des agents ont été ajoutés/retirés.
+        """
+        if characters_state is not self._source or len(characters_state) != len(self._positions):
+            self.rebuild(characters_state)
+
+    def query_radius(self, pos, radius: int = PERCEPTION_RADIUS, exclude: str = None) -> List[str]:
+        """
+        Retourne les agents dont la position est à distance de Chebyshev <= radius.
+        L'ordre suit l'ordre d'insertion (identique à un parcours linéaire du dict).
+        """
+        x, y = int(pos[0]), int(pos[1])
+        cs = self.cell_size
+        cx0, cx1 = (x - radius) // cs, (x + radius) // cs
+        cy0, cy1 = (y - radius) // cs, (y + radius) // cs
+
+        found = []
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = self._cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for other in bucket:
+                    if other == exclude:
+                        continue
+                    ox, oy = self._positions[other]
+                    if abs(ox - x) <= radius and abs(oy - y) <= radius:
+                        found.append(other)
+
+        found.sort(key=self._order.__getitem__)
+        return found
@@ -0,0 +1,60 @@
+import json
+import os
+import random
+from typing import Any, Dict, Optional
+
+from core import storage
+from core.agent_store import AgentStore
+from core.event_log import EventLog
+
+# Seed du monde (env WORLD_SEED pour un monde généré par tools/world_generator.py)
+SEED_FILE = os.getenv("WORLD_SEED", os.path.join("resources", "world_gen", "world_seed.json"))
+
+
+# Shared State (replacing st.session_state)
+class GameState(dict):
+    """ Simple dict wrapper to allow attribute access if needed by legacy code """
+    def __getattr__(self, item: str) -> Any:
+        return self.get(item)
+    def __setattr__(self, key: str, value: Any) -> None:
+        self[key] = value
+
+
+def load_seed(path: str = SEED_FILE) -> Dict[str, Any]:
+    """Charge le seed du monde (carte, personnages, scénario)."""
+    with open(path, "r", encoding='utf-8') as f:
+        return json.load(f)
+
+
+def init_state(seed: Dict[str, Any], resume: bool = True, sim_seed: Optional[int] = None) -> GameState:
+    """
+    État de partie prêt pour le moteur (sans LLM : state.llm est à fournir).
+    resume=True reprend la sauvegarde existante, sinon nouvelle partie depuis le seed.
+    sim_seed fixe le RNG global (parties reproductibles, ex. LLM_BACKEND=replay).
+    """
+    if sim_seed is not None:
+        random.seed(sim_seed)
+
+    state = GameState()
+    loaded_state = storage.load_world() if resume else None
+    if loaded_state:
+        state.update(loaded_state) # Load existing Save
+    else:
+        # Init New
+        state.characters = seed['characters']
+        state.world_time = 1200
+        state.day = 0
+        state.weather = "Chaud"
+
+    if state.day is None: state.day = 0 # Sauvegardes antérieures au calendrier multi-jours
+    # Journal des événements (la sauvegarde n'en garde que les derniers, plus récents d'abord)
+    state.events = EventLog.restore(state.pop('logs', None))
+
+    # Stockage colonnaire des agents (vue dict-like pour le reste du code)
+    state.characters = AgentStore.from_dict(state.characters)
+    state.grid_size = seed['grid_size']
+    state.map_layout = seed['map_layout']
+    state.map_legend = seed['map_legend']
+    state.map_colors = seed.get('map_colors', {})
+    state.initial_seed = seed # For Reset functionality
+    return state
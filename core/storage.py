@@ -1,34 +1,53 @@
 import json
 import os
+import time
+import atexit
 import zipfile
+import threading
 from datetime import datetime
+from core import metrics
 
 SAVE_DIR = "data"
 SAVE_FILE_ZIP = os.path.join(SAVE_DIR, "current_world.zip")
 SAVE_FILE_JSON = os.path.join(SAVE_DIR, "current_world.json") # Legacy
+SAVE_FILE_JOURNAL = os.path.join(SAVE_DIR, "journal.jsonl")
 
-def save_world(characters_data, world_time, logs, weather):
+MAX_LOGS = 500
+SNAPSHOT_EVERY = 50      # Compaction du journal tous les N tours
+JOURNAL_FSYNC_EVERY = 5  # fsync groupé tous les N tours
+SAVE_INTERVAL = 2.0      # Au plus une écriture disque par intervalle (s)
+
+def save_world(characters_data, world_time, logs, weather, day=0, journal_seq=0):
     """
     Sauvegarde l'état dans une archive ZIP (state.json + metadata.json).
+    Écriture atomique : fichier temporaire puis renommage.
     """
+    t0 = time.perf_counter()
     if not os.path.exists(SAVE_DIR):
         os.makedirs(SAVE_DIR)
         
+    if hasattr(characters_data, 'to_dict'):
+        characters_data = characters_data.to_dict() # AgentStore -> dict JSON
+        
     state_to_save = {
         "characters": characters_data, 
         "world_time": world_time,
+        "day": day,
         "logs": logs,
-        "weather": weather
+        "weather": weather,
+        "journal_seq": journal_seq
     }
     
     metadata = {
         "version": "1.0",
         "saved_at": datetime.now().isoformat(),
-        "timestamp": world_time
+        "timestamp": world_time,
+        "day": day
     }
     
+    tmp_path = SAVE_FILE_ZIP + ".tmp"
     try:
-        with zipfile.ZipFile(SAVE_FILE_ZIP, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zf:
             # 1. État du monde
             zf.writestr("state.json", json.dumps(state_to_save, indent=4, ensure_ascii=False))
             # 2. Métadonnées
@@ -37,32 +56,313 @@ def save_world(characters_data, world_time, logs, weather):
             zf.writestr("version.txt", "1.0.0")
             # 4. Screenshot Placeholder
             zf.writestr("screenshot.txt", "[Capture d'écran non disponible]")
+        os.replace(tmp_path, SAVE_FILE_ZIP)
             
         print(f"Sauvegarde ZIP réussie : {SAVE_FILE_ZIP}")
         
     except Exception as e:
         print(f"Erreur de sauvegarde ZIP : {e}")
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - t0, stage="save_world")
+
+def _plain(value):
+    """Copie JSON pure (détachée de l'état vivant)."""
+    return json.loads(json.dumps(value, ensure_ascii=False))
+
+def _apply_journal_entry(data, entry):
+    """Rejoue une entrée du journal sur un état chargé."""
+    chars = data.setdefault("characters", {})
+    for name, delta in entry.get("chars", {}).items():
+        rec = chars.setdefault(name, {})
+        for field in delta.get("-", []):
+            rec.pop(field, None)
+        rec.update(delta.get("set", {}))
+    data["world_time"] = entry.get("t", data.get("world_time"))
+    data["day"] = entry.get("day", data.get("day", 0))
+    data["weather"] = entry.get("w", data.get("weather"))
+    data["logs"] = (entry.get("logs", []) + data.get("logs", []))[:MAX_LOGS]
+
+def _read_journal(path):
+    """Entrées valides du journal (s'arrête à la première ligne tronquée)."""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break # Écriture interrompue (crash) : fin du journal exploitable
+    return entries
+
+class WorldJournal:
+    """
+    Journal append-only des deltas par tour (champs modifiés + nouveaux logs),
+    avec fsync groupé et compaction périodique en snapshot ZIP.
+    Tient une copie matérialisée de l'état sauvegardé (shadow) : les deltas
+    sont calculés champ par champ et la compaction n'a pas besoin de l'état vivant.
+    """
+    def __init__(self, path=SAVE_FILE_JOURNAL, snapshot_every=SNAPSHOT_EVERY, fsync_every=JOURNAL_FSYNC_EVERY):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.fsync_every = fsync_every
+        self.seq = None
+        self.shadow = {}
+        self.logs = []
+        self.world_time = 0
+        self.day = 0
+        self.weather = None
+        self._source = None
+        self._file = None
+        self._turns_since_snapshot = 0
+        self._unsynced = 0
+        self.bytes_written = 0
+
+    def _resume_seq(self):
+        entries = _read_journal(self.path)
+        return entries[-1].get("seq", 0) if entries else 0
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def _sync(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def record_turn(self, records, new_logs, world_time, weather, day=0, baseline=None, logs=None):
+        """
+        Enregistre un tour (ou plusieurs tours fusionnés).
+        `records` = {name: copie JSON de l'agent} pour les agents modifiés.
+        `baseline` (état complet, au chargement / reset) : snapshot immédiat.
+        """
+        if self.seq is None:
+            self.seq = self._resume_seq()
+        self.world_time, self.day, self.weather = world_time, day, weather
+
+        if baseline is not None:
+            # Nouvelle base : tout l'état part dans un snapshot
+            self.shadow = baseline
+            self.logs = list((logs or [])[:MAX_LOGS])
+            self.compact()
+            return
+
+        t0 = time.perf_counter()
+        delta = {}
+        for name, current in records.items():
+            previous = self.shadow.get(name, {})
+            changes = {k: val for k, val in current.items() if previous.get(k, None) != val or k not in previous}
+            removed = [k for k in previous if k not in current]
+            if changes or removed:
+                delta[name] = {"set": changes}
+                if removed: delta[name]["-"] = removed
+            self.shadow[name] = current
+
+        self.seq += 1
+        entry = {"seq": self.seq, "t": world_time, "day": day, "w": weather, "chars": delta, "logs": new_logs}
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        f = self._open()
+        f.write(line)
+        f.flush()
+        self.bytes_written += len(line.encode("utf-8"))
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self._sync()
+
+        self.logs = (list(new_logs) + self.logs)[:MAX_LOGS]
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - t0, stage="journal_write")
+        self._turns_since_snapshot += 1
+        if self._turns_since_snapshot >= self.snapshot_every:
+            self.compact()
+
+    def compact(self):
+        """Snapshot ZIP de l'état matérialisé puis remise à zéro du journal."""
+        if self.seq is None:
+            self.seq = self._resume_seq()
+        self._sync()
+        save_world(self.shadow, self.world_time, self.logs, self.weather, day=self.day, journal_seq=self.seq)
+        if os.path.exists(SAVE_FILE_ZIP):
+            self.bytes_written += os.path.getsize(SAVE_FILE_ZIP)
+        # Le snapshot (atomique) couvre tout le journal : on peut le vider
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        open(self.path, "w", encoding="utf-8").close()
+        self._turns_since_snapshot = 0
+
+    def close(self):
+        self._sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class SaveWriter:
+    """
+    Thread d'écriture dédié : sort le JSON, la compression et les fsync du thread moteur.
+    Le moteur ne fait que copier les agents modifiés (submit) ; les demandes
+    rapprochées sont fusionnées et écrites au plus une fois par `interval`.
+    """
+    def __init__(self, journal, interval=SAVE_INTERVAL):
+        self.journal = journal
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._pending = None
+        self._writing = False
+        self._closed = False
+        self._thread = None
+        self._source = None
+        self._last_write = 0.0
+
+        # Métriques
+        self.requests = 0
+        self.writes = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def submit(self, characters_data, changed, new_logs, events, world_time, weather, day=0):
+        """
+        Appelé par le moteur en fin de tour. Copie immuable des seuls agents modifiés
+        (état complet uniquement si state.characters a été remplacé).
+        `new_logs` : événements du tour (JSON) ; `events` : EventLog, exporté seulement
+        quand une nouvelle base est écrite.
+        """
+        baseline = None
+        if characters_data is not self._source:
+            self._source = characters_data
+            baseline = {name: _plain(dict(v)) for name, v in characters_data.items()}
+            records = {}
+        else:
+            records = {name: _plain(dict(characters_data[name])) for name in changed if name in characters_data}
+        new_logs = list(new_logs)
+
+        with self._cond:
+            if self._closed:
+                return
+            self.requests += 1
+            p = self._pending
+            if p is None or baseline is not None:
+                p = self._pending = {"records": {}, "new_logs": [], "baseline": None, "logs": None, "since": time.monotonic()}
+            if baseline is not None:
+                p["baseline"], p["logs"] = baseline, events.export(MAX_LOGS)
+            elif p["baseline"] is not None:
+                # Base pas encore écrite : on la met à jour directement
+                p["baseline"].update(records)
+                p["logs"] = (new_logs + p["logs"])[:MAX_LOGS]
+            else:
+                p["records"].update(records)
+                p["new_logs"] = new_logs + p["new_logs"]
+            p["t"], p["w"], p["day"] = world_time, weather, day
+            self._cond.notify_all()
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="save-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None and self._closed:
+                    return
+                # Coalescence : au plus une écriture par intervalle
+                delay = self._last_write + self.interval - time.monotonic()
+                if delay > 0 and not self._closed:
+                    self._cond.wait(delay)
+                    continue
+                p, self._pending = self._pending, None
+                self._writing = True
+            written = self.journal.bytes_written
+            try:
+                if p["baseline"] is not None:
+                    self.journal.record_turn({}, [], p["t"], p["w"], p["day"], baseline=p["baseline"], logs=p["logs"])
+                else:
+                    self.journal.record_turn(p["records"], p["new_logs"], p["t"], p["w"], p["day"])
+            except Exception as e:
+                print(f"Erreur écriture sauvegarde : {e}")
+            with self._cond:
+                self._writing = False
+                self._last_write = time.monotonic()
+                self.writes += 1
+                self.last_lag = self._last_write - p["since"]
+                self.max_lag = max(self.max_lag, self.last_lag)
+                self._cond.notify_all()
+            metrics.SAVE_LAG.observe(self.last_lag)
+            metrics.SAVE_BYTES.inc(self.journal.bytes_written - written)
+
+    def flush(self, timeout=None):
+        """Attend que toutes les demandes soumises soient écrites."""
+        with self._cond:
+            self._last_write = 0.0 # Lève la coalescence pour la demande en attente
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._pending is None and not self._writing, timeout)
+
+    def close(self):
+        """Flush final puis arrêt du thread (appelé à la fermeture)."""
+        self.flush(timeout=30)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+        self.journal.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "requests": self.requests,
+                "writes": self.writes,
+                "coalesced": self.requests - self.writes,
+                "pending": self._pending is not None,
+                "save_lag_s": round(self.last_lag, 4),
+                "max_save_lag_s": round(self.max_lag, 4),
+                "bytes_written": self.journal.bytes_written,
+            }
+
+# Instances uniques (journal de la partie en cours + thread d'écriture)
+journal = WorldJournal()
+writer = SaveWriter(journal)
+atexit.register(writer.close)
 
 def load_world():
     """
     Charge le monde. Priorise le ZIP. Fallback sur le JSON.
+    Rejoue ensuite la fin du journal (tours postérieurs au dernier snapshot).
     """
+    data = None
+    
     # 1. Try ZIP
     if os.path.exists(SAVE_FILE_ZIP):
         try:
             with zipfile.ZipFile(SAVE_FILE_ZIP, 'r') as zf:
                 with zf.open("state.json") as f:
-                    return json.load(f)
+                    data = json.load(f)
         except Exception as e:
             print(f"Erreur lecture ZIP: {e}")
     
     # 2. Try Legacy JSON
-    if os.path.exists(SAVE_FILE_JSON):
+    if data is None and os.path.exists(SAVE_FILE_JSON):
         print("Chargement sauvegarde Legacy (JSON)...")
         try:
             with open(SAVE_FILE_JSON, "r", encoding="utf-8") as f:
-                return json.load(f)
+                data = json.load(f)
         except Exception as e:
             print(f"Erreur lecture JSON: {e}")
 
-    return None
+    if data is None:
+        return None
+
+    # 3. Journal tail
+    snapshot_seq = data.pop("journal_seq", 0)
+    replayed = 0
+    for entry in _read_journal(journal.path):
+        if entry.get("seq", 0) > snapshot_seq:
+            _apply_journal_entry(data, entry)
+            replayed += 1
+    if replayed:
+        print(f"Journal : {replayed} tour(s) rejoué(s) après le snapshot")
+
+    return data
@@ -1,8 +1,29 @@
 from game.entities import rpg as rpg_system
 from game.systems import relations
+from core.spatial import PERCEPTION_RADIUS
+from core import metrics
+from core.resilience import LLMError
 import json
+import re
+import time
 
-def get_agent_prompt_data(name, v, characters_state, world_time, seed, terrain_name, context):
+def find_visible_neighbors(name, v, characters_state, spatial_index=None):
+    """
+    Agents visibles depuis la position de `name` (Rayon 2).
+    Utilise l'index spatial s'il est fourni, sinon parcours linéaire.
+    """
+    if spatial_index is not None:
+        return spatial_index.query_radius(v['pos'], PERCEPTION_RADIUS, exclude=name)
+
+    visible_neighbors = []
+    for other, data in characters_state.items():
+        if other == name:
+            continue
+        if abs(data['pos'][0] - v['pos'][0]) <= PERCEPTION_RADIUS and abs(data['pos'][1] - v['pos'][1]) <= PERCEPTION_RADIUS:
+            visible_neighbors.append(other)
+    return visible_neighbors
+
+def get_agent_prompt_data(name, v, characters_state, world_time, seed, terrain_name, context, spatial_index=None):
     # Infos perso
     bio = v.get('description', '')
     role = v['role']
@@ -12,13 +33,7 @@ def get_agent_prompt_data(name, v, characters_state, world_time, seed, terrain_n
     relations.init_relations_if_needed(characters_state)
     
     # Voisins (Detailed)
-    visible_neighbors = []
-    for other, data in characters_state.items():
-        if data['pos'] == v['pos'] and other != name:
-            visible_neighbors.append(other)
-        # Detection Distance (Rayon 2)
-        elif abs(data['pos'][0] - v['pos'][0]) <= 2 and abs(data['pos'][1] - v['pos'][1]) <= 2:
-            visible_neighbors.append(other)
+    visible_neighbors = find_visible_neighbors(name, v, characters_state, spatial_index)
             
     social_context = relations.get_social_context(name, characters_state, visible_neighbors)
 
@@ -38,32 +53,44 @@ def get_agent_prompt_data(name, v, characters_state, world_time, seed, terrain_n
     RELATIONS (Voisins): {social_context}.
     """
 
+# Calibrage de estimate_agent_tokens (caractères)
+AGENT_BLOCK_CHARS = 170   # Gabarit fixe du bloc PERSONNAGE (terrain compris)
+STAT_CHARS = 14           # "PHYSIQUE:12 | "
+NEIGHBOR_CHARS = 18       # "Nom (Statut: score), " hors longueur du nom
+
+def estimate_agent_tokens(name, v, characters_state, spatial_index=None):
+    """
+    Tokens (~4 caractères) du bloc de get_agent_prompt_data, sans le construire
+    (pas de contexte social à formatter).
+    """
+    size = AGENT_BLOCK_CHARS + 2 * len(name)
+    size += len(str(v.get('role', ''))) + len(str(v.get('description', ''))) + len(str(v.get('inventory', [])))
+    size += STAT_CHARS * len(v.get('stats') or {})
+    for other in find_visible_neighbors(name, v, characters_state, spatial_index):
+        size += NEIGHBOR_CHARS + len(other)
+    return (size + 3) // 4
+
 def agent_turn(llm, name, characters_state, world_time, weather, seed, terrain_name, context=""):
     # Wrapper simple pour compatibilité
     return batch_agent_turn(llm, [name], characters_state, world_time, weather, seed, {name: terrain_name}, context)[name]
 
-def batch_agent_turn(llm, agent_names, characters_state, world_time, weather, seed, terrains_dict, context=""):
+# Préfixe statique (scénario, règles, actions, format) : identique pour tous les batches.
+# Mémo de la chaîne seulement (pas de reconstruction par batch) : ne retire aucun token envoyé.
+_PREFIX_CACHE = {}
+
+def build_static_prefix(seed):
     """
-    Traite une liste d'agents en une seule requête LLM.
-    Retourne un dict {name: decision_dict}
+    Partie stable du prompt, construite une seule fois par seed.
+    Sert de préfixe partagé, en tête de chaque prompt : cache de contexte côté
+    fournisseur seulement s'il atteint PROMPT_CACHE_MIN_TOKENS (pas le seed de base).
     """
-    
-    agents_block = ""
-    for name in agent_names:
-        v = characters_state[name]
-        agents_block += get_agent_prompt_data(name, v, characters_state, world_time, seed, terrains_dict.get(name, "Inconnu"), context)
-    
-    prompt = f"""
+    key = (seed['scenario_name'], seed['description'])
+    prefix = _PREFIX_CACHE.get(key)
+    if prefix is None:
+        prefix = f"""
     CONTEXTE: {seed['scenario_name']} (RPG SIMULATION)
-    HEURE ACTUELLE: {world_time}
     DESCRIPTION LIEU GLOBALE: {seed['description']}
     
-    CHAPITRE EN COURS (Mémoire Immédiate): 
-    {context[-2000:]} 
-    
-    VOICI LES PERSONNAGES (Groupe):
-    {agents_block}
-    
     OBJECTIF COMMUN: Progresser, réussir ses objets, interagir.
     
     TEMPS & DURÉE:
@@ -97,72 +124,315 @@ def batch_agent_turn(llm, agent_names, characters_state, world_time, weather, se
         ...
     }}
     """
+        _PREFIX_CACHE[key] = prefix
+    return prefix
+
+def build_batch_prompt_parts(agent_names, characters_state, world_time, weather, seed, terrains_dict, context="", spatial_index=None):
+    """
+    Construit le prompt d'un batch d'agents en deux parties :
+    (préfixe statique partagé, suffixe propre au batch).
+    """
+    agents_block = ""
+    for name in agent_names:
+        v = characters_state[name]
+        agents_block += get_agent_prompt_data(name, v, characters_state, world_time, seed, terrains_dict.get(name, "Inconnu"), context, spatial_index)
     
-    try:
-        res = llm.invoke(prompt)
-        
-        # 1. Extraction JSON Robust (Brace Counting)
-        start = res.find('{')
-        data = None
-        
-        if start != -1:
-            brace_count = 0
-            json_end = -1
-            for i, char in enumerate(res[start:], start=start):
-                if char == '{': brace_count += 1
-                elif char == '}': brace_count -= 1
-                if brace_count == 0:
-                    json_end = i
-                    break
-            
-            if json_end != -1:
-                json_str = res[start:json_end+1]
-                try:
-                    data = json.loads(json_str, strict=False)
-                except json.JSONDecodeError:
-                    # Fallback Regex Clean
-                    import re
-                    clean_str = re.sub(r'[\x00-\x1f]', '', json_str)
-                    data = json.loads(clean_str, strict=False)
+    suffix = f"""
+    HEURE ACTUELLE: {world_time}
+    
+    CHAPITRE EN COURS (Mémoire Immédiate): 
+    {context[-2000:]} 
+    
+    VOICI LES PERSONNAGES (Groupe):
+    {agents_block}
+    """
+    
+    return build_static_prefix(seed), suffix
+
+def build_batch_prompt(agent_names, characters_state, world_time, weather, seed, terrains_dict, context="", spatial_index=None):
+    """
+    Construit le prompt complet d'un batch d'agents (préfixe + suffixe).
+    """
+    prefix, suffix = build_batch_prompt_parts(agent_names, characters_state, world_time, weather, seed, terrains_dict, context, spatial_index)
+    return prefix + suffix
+
+def normalize_decision(name, d, characters_state):
+    """
+    Complète une décision IA avec les valeurs par défaut et valide la destination.
+    """
+    # Defaults
+    defaults = {
+        "action": "RIEN",
+        "pensee": "Attend...",
+        "dest": characters_state[name]['pos'],
+        "reaction": None,
+        "duration": 15
+    }
+    
+    if not d or not isinstance(d, dict):
+        return defaults
+
+    # Validate Dest (Force INT)
+    dst = d.get('dest')
+    valid_dest = False
+    if isinstance(dst, list) and len(dst) == 2:
+        try:
+            d['dest'] = [int(dst[0]), int(dst[1])]
+            valid_dest = True
+        except (ValueError, TypeError):
+            pass
+    
+    if not valid_dest:
+        d['dest'] = characters_state[name]['pos']
         
-        if data is None:
-             raise ValueError("JSON introuvable ou invalide dans la réponse IA")
+    return {**defaults, **d}
 
-        # 2. Processing
-        final_results = {}
-        for name in agent_names:
-            d = data.get(name)
-            
-            # Defaults
-            defaults = {
-                "action": "RIEN",
-                "pensee": "Attend...",
-                "dest": characters_state[name]['pos'],
-                "reaction": None,
-                "duration": 15
-            }
-            
-            if not d:
-                final_results[name] = defaults
-            else:
-                # Validate Dest (Force INT)
-                dst = d.get('dest')
-                valid_dest = False
-                if isinstance(dst, list) and len(dst) == 2:
+def _loads_lenient(json_str):
+    try:
+        return json.loads(json_str, strict=False)
+    except json.JSONDecodeError:
+        # Fallback Regex Clean
+        clean_str = re.sub(r'[\x00-\x1f]', '', json_str)
+        return json.loads(clean_str, strict=False)
+
+class DecisionStreamParser:
+    """
+    Parseur JSON incrémental pour les réponses en streaming.
+    On lui donne les morceaux de texte au fil de l'eau (feed) ; il renvoie chaque
+    membre de l'objet racine {"NomAgent": {...}, ...} dès que son objet se ferme.
+    Chaque caractère n'est examiné qu'une fois (pas de re-scan du texte accumulé).
+    """
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._expect_key = True
+        self._key = None
+        self._value_start = -1
+        self.done = False
+
+    def feed(self, text):
+        """Ajoute du texte ; retourne la liste des (clé, objet) complétés."""
+        if self.done or not text:
+            return []
+        self._buf += text
+        buf = self._buf
+        emitted = []
+        i = self._pos
+        n = len(buf)
+        while i < n:
+            c = buf[i]
+            if self._depth == 0:
+                # Texte avant l'objet racine (préambule, ```json...) ignoré
+                if c == '{': self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = _loads_lenient(buf[self._string_start:i + 1])
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == '{' or c == '[':
+                self._depth += 1
+                if self._depth == 2 and c == '{' and not self._expect_key:
+                    self._value_start = i
+            elif c == '}' or c == ']':
+                self._depth -= 1
+                if self._depth == 1 and self._value_start != -1:
                     try:
-                        d['dest'] = [int(dst[0]), int(dst[1])]
-                        valid_dest = True
-                    except (ValueError, TypeError):
-                        pass
-                
-                if not valid_dest:
-                    d['dest'] = characters_state[name]['pos']
-                    
-                final_results[name] = {**defaults, **d}
+                        emitted.append((self._key, _loads_lenient(buf[self._value_start:i + 1])))
+                    except json.JSONDecodeError:
+                        pass # Objet invalide : l'agent prendra les valeurs par défaut
+                    self._value_start = -1
+                elif self._depth == 0:
+                    self.done = True
+                    i += 1
+                    break
+            elif self._depth == 1:
+                if c == ':': self._expect_key = False
+                elif c == ',': self._expect_key = True
+            i += 1
+
+        # On oublie le texte déjà consommé (hors objet en cours)
+        keep = i
+        if self._value_start != -1: keep = self._value_start
+        elif self._in_string: keep = self._string_start
+        self._buf = buf[keep:]
+        self._pos = i - keep
+        if self._value_start != -1: self._value_start -= keep
+        if self._in_string: self._string_start -= keep
+        return emitted
+
+def parse_batch_response(res, agent_names, characters_state):
+    """
+    Extrait le JSON de la réponse IA et retourne un dict {name: decision_dict}.
+    Lève ValueError si aucun JSON exploitable n'est trouvé.
+    """
+    # 1. Extraction JSON Robust (Brace Counting)
+    start = res.find('{')
+    data = None
+    
+    if start != -1:
+        brace_count = 0
+        json_end = -1
+        for i, char in enumerate(res[start:], start=start):
+            if char == '{': brace_count += 1
+            elif char == '}': brace_count -= 1
+            if brace_count == 0:
+                json_end = i
+                break
         
-        return final_results
+        if json_end != -1:
+            json_str = res[start:json_end+1]
+            data = _loads_lenient(json_str)
+    
+    if data is None:
+         raise ValueError("JSON introuvable ou invalide dans la réponse IA")
 
+    # 2. Processing
+    final_results = {}
+    for name in agent_names:
+        final_results[name] = normalize_decision(name, data.get(name), characters_state)
+    
+    return final_results
+
+def fallback_decisions(agent_names, characters_state, error):
+    """Décisions par défaut (RIEN) quand le batch IA échoue."""
+    print(f"Erreur Batch IA: {error}")
+    metrics.LLM_ERRORS.inc(kind="batch")
+    return {name: {"action": "RIEN", "pensee": f"Erreur {error}", "dest": characters_state[name]['pos'], "reaction": None, "duration": 5} for name in agent_names}
+
+def batch_agent_turn(llm, agent_names, characters_state, world_time, weather, seed, terrains_dict, context="", spatial_index=None):
+    """
+    Traite une liste d'agents en une seule requête LLM.
+    Retourne un dict {name: decision_dict}
+    """
+    with metrics.stage("prompt_build"):
+        prefix, suffix = build_batch_prompt_parts(agent_names, characters_state, world_time, weather, seed, terrains_dict, context, spatial_index)
+    
+    try:
+        with metrics.stage("llm_wait"):
+            res = llm.invoke(suffix, prefix=prefix)
+        with metrics.stage("json_extract"):
+            return parse_batch_response(res, agent_names, characters_state)
+    except LLMError:
+        raise # Pas de réponse : le moteur reprogramme ces agents (pas de décisions RIEN)
     except Exception as e:
-        print(f"Erreur Batch IA: {e}")
         # Fallback
-        return {name: {"action": "RIEN", "pensee": f"Erreur {e}", "dest": characters_state[name]['pos'], "reaction": None, "duration": 5} for name in agent_names}
+        return fallback_decisions(agent_names, characters_state, e)
+
+async def abatch_agent_turn(llm, agent_names, characters_state, world_time, weather, seed, terrains_dict, context="", spatial_index=None):
+    """
+    Variante asyncio de batch_agent_turn (llm.ainvoke).
+    """
+    with metrics.stage("prompt_build"):
+        prefix, suffix = build_batch_prompt_parts(agent_names, characters_state, world_time, weather, seed, terrains_dict, context, spatial_index)
+    
+    try:
+        with metrics.stage("llm_wait"):
+            res = await llm.ainvoke(suffix, prefix=prefix)
+        with metrics.stage("json_extract"):
+            return parse_batch_response(res, agent_names, characters_state)
+    except LLMError:
+        raise
+    except Exception as e:
+        return fallback_decisions(agent_names, characters_state, e)
+
+def _finish_stream(agent_names, seen, characters_state, parser):
+    """Agents absents du flux : valeurs par défaut (ou fallback si aucun JSON)."""
+    missing = [n for n in agent_names if n not in seen]
+    if not missing:
+        return []
+    if not seen and not parser.done:
+        return list(fallback_decisions(missing, characters_state, "JSON introuvable dans le flux IA").items())
+    return [(n, normalize_decision(n, None, characters_state)) for n in missing]
+
+class _StreamTiming:
+    """Découpe la durée d'un flux en attente LLM / extraction JSON (hors temps du consommateur)."""
+    def __init__(self):
+        self.wait = 0.0
+        self.parse = 0.0
+        self.mark = time.perf_counter()
+
+    def feed(self, parser, text):
+        now = time.perf_counter()
+        self.wait += now - self.mark
+        items = parser.feed(text)
+        self.parse += time.perf_counter() - now
+        return items
+
+    def resume(self):
+        self.mark = time.perf_counter()
+
+    def observe(self):
+        metrics.STAGE_SECONDS.observe(self.wait, stage="llm_wait")
+        metrics.STAGE_SECONDS.observe(self.parse, stage="json_extract")
+
+def stream_batch_agent_turn(llm, agent_names, characters_state, world_time, weather, seed, terrains_dict, context="", spatial_index=None):
+    """
+    Variante streaming de batch_agent_turn (llm.generate_content_stream).
+    Générateur de (name, decision) : chaque décision sort dès que son objet JSON se ferme.
+    """
+    with metrics.stage("prompt_build"):
+        prefix, suffix = build_batch_prompt_parts(agent_names, characters_state, world_time, weather, seed, terrains_dict, context, spatial_index)
+    parser = DecisionStreamParser()
+    wanted, seen = set(agent_names), set()
+    timing = _StreamTiming()
+    
+    try:
+        for chunk in llm.generate_content_stream(None, suffix, prefix=prefix):
+            for name, d in timing.feed(parser, chunk.text or ""):
+                if name in wanted and name not in seen:
+                    seen.add(name)
+                    yield name, normalize_decision(name, d, characters_state)
+            timing.resume()
+    except LLMError as e:
+        # Flux coupé : les agents sans décision sont reprogrammés par le moteur
+        print(f"Erreur Stream IA: {e}")
+        timing.observe()
+        return
+    except Exception as e:
+        print(f"Erreur Stream IA: {e}")
+        metrics.LLM_ERRORS.inc(kind="stream")
+    timing.observe()
+    
+    for item in _finish_stream(agent_names, seen, characters_state, parser):
+        yield item
+
+async def astream_batch_agent_turn(llm, agent_names, characters_state, world_time, weather, seed, terrains_dict, context="", spatial_index=None):
+    """
+    Variante asyncio de stream_batch_agent_turn (llm.agenerate_content_stream).
+    """
+    with metrics.stage("prompt_build"):
+        prefix, suffix = build_batch_prompt_parts(agent_names, characters_state, world_time, weather, seed, terrains_dict, context, spatial_index)
+    parser = DecisionStreamParser()
+    wanted, seen = set(agent_names), set()
+    timing = _StreamTiming()
+    
+    try:
+        async for chunk in llm.agenerate_content_stream(None, suffix, prefix=prefix):
+            for name, d in timing.feed(parser, chunk.text or ""):
+                if name in wanted and name not in seen:
+                    seen.add(name)
+                    yield name, normalize_decision(name, d, characters_state)
+            timing.resume()
+    except LLMError as e:
+        # Flux coupé : les agents sans décision sont reprogrammés par le moteur
+        print(f"Erreur Stream IA: {e}")
+        timing.observe()
+        return
+    except Exception as e:
+        print(f"Erreur Stream IA: {e}")
+        metrics.LLM_ERRORS.inc(kind="stream")
+    timing.observe()
+    
+    for item in _finish_stream(agent_names, seen, characters_state, parser):
+        yield item
@@ -1,10 +1,61 @@
 import random
+import zlib
+from collections import namedtuple
+
+import numpy as np
 
 # --- CONSTANTS ---
 SKILLS = ["MAGIE", "SOCIAL", "PHYSIQUE", "SAVOIR"]
+SKILL_INDEX = {s: i for i, s in enumerate(SKILLS)}
 
 BASE_XP_LEVEL = 100  # XP required for level 2
 
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def _mix64(x):
+    """Finaliseur splitmix64 (vectorisé, uint64)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class DiceRoller:
+    """
+    Dés reproductibles, un flux par agent : le n-ième jet d'un agent est une
+    fonction pure de (graine, nom, n). Le compteur de jets est stocké dans la
+    colonne 'rolls' de l'agent (sauvegardé avec lui). Les résultats ne dépendent
+    donc ni de l'ordre des batches, ni du cache de décisions, ni de la météo.
+    Splitmix64 plutôt que np.random.Philox : vectorisé sur un lot d'agents aux
+    compteurs différents (un Generator Philox par jet coûte ~30 µs).
+    """
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed & _MASK64
+        self._keys = {}  # nom -> clé du flux
+
+    def _key(self, name):
+        key = self._keys.get(name)
+        if key is None:
+            key = self._keys[name] = (self.seed ^ (zlib.crc32(name.encode("utf-8")) * _GOLDEN)) & _MASK64
+        return key
+
+    def d20(self, store, rows):
+        """Un d20 par ligne (lignes distinctes) ; avance le compteur de chaque agent."""
+        names = store.names
+        keys = np.fromiter((self._key(names[row]) for row in rows), dtype=np.uint64, count=len(rows))
+        counters = store.column('rolls', default=0)[rows].astype(np.uint64)
+        with np.errstate(over='ignore'):
+            x = _mix64(keys + counters * np.uint64(_GOLDEN))
+        store.add_clipped('rolls', rows, 1)
+        return (x % np.uint64(20)).astype(np.int32) + 1
+
+
+# Résultats d'un lot de jets (tableaux alignés sur les agents)
+SkillChecks = namedtuple("SkillChecks", ["roll", "bonus", "total", "difficulty", "success"])
+
 def roll_d20():
     return random.randint(1, 20)
 
@@ -59,6 +110,42 @@ def gain_xp(character_state, amount):
     
     return logs
 
+def check_skills(store, names, skills, difficulties=15, dice=None):
+    """
+    Jets de compétence groupés (équivalent vectorisé de check_skill).
+    names / skills : listes alignées ; difficulties : scalaire ou tableau.
+    dice : DiceRoller (jets reproductibles), sinon module random.
+    """
+    rows = store.rows(names)
+    skill_idx = np.fromiter((SKILL_INDEX[s] for s in skills), dtype=np.intp, count=len(rows))
+    bonus = store.stat_values(rows, skill_idx)
+    if dice is not None:
+        roll = dice.d20(store, rows)
+    else:
+        roll = np.fromiter((roll_d20() for _ in range(len(rows))), dtype=np.int32, count=len(rows))
+    difficulty = np.broadcast_to(np.asarray(difficulties, dtype=np.int32), roll.shape)
+    total = roll + bonus
+    return SkillChecks(roll, bonus, total, difficulty, total >= difficulty)
+
+def gain_xp_batch(store, names, amount):
+    """
+    Version groupée de gain_xp : XP et level up en une passe sur les colonnes.
+    Retourne les logs de chaque agent (même format que gain_xp).
+    """
+    rows = store.rows(names)
+    if len(rows) == 0:
+        return []
+    xp = store.column('xp', default=0)[rows] + amount
+    level = store.column('level', default=1)[rows]
+    needed = level * BASE_XP_LEVEL
+    up = xp >= needed
+    store.set_values('xp', rows, np.where(up, xp - needed, xp))
+    store.set_values('level', rows, level + up)
+    return [
+        [f"Gagne {amount} XP", f"🎉 LEVEL UP! Niveau {int(lvl) + 1} atteint!"] if leveled else [f"Gagne {amount} XP"]
+        for lvl, leveled in zip(level, up)
+    ]
+
 def init_stats(role):
     """
     Returns initial stats dict based on Role.
@@ -0,0 +1,175 @@
+import arcade
+import numpy as np
+from PIL import Image
+
+CHUNK_TILES = 64             # Tiles per chunk side (1 texel per tile)
+MAX_CACHED_CHUNKS = 96       # Baked chunks kept on the GPU (visible ones + recent)
+CHUNK_BUILDS_PER_FRAME = 4   # Lazy baking budget, avoids frame hitches while panning
+DEFAULT_TILE_COLOR = (100, 149, 237)  # Unknown tile char (Cornflower Blue)
+
+
+def hex_to_rgb(value):
+    value = value.lstrip('#')
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def view_rect(camera):
+    """ World-space (left, right, bottom, top) currently seen by a Camera2D """
+    x, y = camera.position
+    return x + camera.left, x + camera.right, y + camera.bottom, y + camera.top
+
+
+class ChunkedMapRenderer:
+    """
+    Static map rendered as baked chunk textures (one texel per tile, drawn with
+    nearest filtering). Chunks are baked lazily when they come into view and
+    evicted from the atlas when the cache is full: startup time and GPU memory
+    follow the visible area, not the map size.
+    """
+    def __init__(self, map_layout, map_colors, tile_size, offset, chunk_tiles=CHUNK_TILES):
+        self.layout = map_layout
+        self.tile_size = tile_size
+        self.offset = offset
+        self.chunk_tiles = chunk_tiles
+        self.rows = len(map_layout)
+        self.cols = max((len(row) for row in map_layout), default=0)
+
+        # Palette: tile char (byte) -> RGB, from the seed's map_colors
+        self.palette = np.empty((256, 3), dtype=np.uint8)
+        self.palette[:] = DEFAULT_TILE_COLOR
+        for char, color in (map_colors or {}).items():
+            code = char.encode('latin-1', 'replace')[0]
+            self.palette[code] = hex_to_rgb(color)
+
+        self.sprites = arcade.SpriteList()
+        self.chunks = {}  # (cx, cy) -> sprite (insertion order = LRU order)
+
+    def _bake(self, cx, cy):
+        """ Chunk (cx, cy) -> sprite with a texture of its tiles """
+        n = self.chunk_tiles
+        x0, y0 = cx * n, cy * n
+        x1, y1 = min(self.cols, x0 + n), min(self.rows, y0 + n)
+        w, h = x1 - x0, y1 - y0
+        codes = np.full((h, w), ord(' '), dtype=np.uint8)
+        for i, row in enumerate(self.layout[y0:y1]):
+            part = row[x0:x1].encode('latin-1', 'replace')
+            codes[i, :len(part)] = np.frombuffer(part, dtype=np.uint8)
+        image = Image.fromarray(self.palette[codes], "RGB").convert("RGBA")
+
+        texture = arcade.Texture(image, hash=f"map_chunk_{id(self)}_{cx}_{cy}")
+        sprite = arcade.Sprite(texture, scale=self.tile_size)
+        ox, oy = self.offset
+        t = self.tile_size
+        # Row 0 of the layout is the top of the map
+        sprite.center_x = ox + (x0 + w / 2) * t
+        sprite.center_y = oy + (self.rows - y0 - h / 2) * t
+        return sprite
+
+    def _evict(self, keep):
+        while len(self.chunks) > MAX_CACHED_CHUNKS:
+            key = next((k for k in self.chunks if k not in keep), None)
+            if key is None:
+                return
+            sprite = self.chunks.pop(key)
+            self.sprites.remove(sprite)
+            atlas = self.sprites.atlas
+            if atlas is not None and atlas.has_texture(sprite.texture):
+                atlas.remove(sprite.texture)
+
+    def visible_chunks(self, camera):
+        """ Chunk coords intersecting the camera view """
+        left, right, bottom, top = view_rect(camera)
+        ox, oy = self.offset
+        span = self.chunk_tiles * self.tile_size
+        # Screen y grows upwards, layout rows grow downwards
+        x_first = max(0, int((left - ox) // span))
+        x_last = min((self.cols - 1) // self.chunk_tiles, int((right - ox) // span))
+        row_top = self.rows - (top - oy) / self.tile_size
+        row_bottom = self.rows - (bottom - oy) / self.tile_size
+        y_first = max(0, int(row_top // self.chunk_tiles))
+        y_last = min((self.rows - 1) // self.chunk_tiles, int(row_bottom // self.chunk_tiles))
+        return [(cx, cy) for cy in range(y_first, y_last + 1) for cx in range(x_first, x_last + 1)]
+
+    def update(self, camera):
+        """ Bake missing visible chunks (bounded per frame) and evict old ones """
+        visible = self.visible_chunks(camera)
+        built = 0
+        for key in visible:
+            sprite = self.chunks.get(key)
+            if sprite is not None:
+                # Refresh LRU order
+                self.chunks[key] = self.chunks.pop(key)
+                continue
+            if built >= CHUNK_BUILDS_PER_FRAME:
+                continue
+            sprite = self._bake(*key)
+            self.chunks[key] = sprite
+            self.sprites.append(sprite)
+            built += 1
+        self._evict(set(visible))
+
+    def draw(self):
+        self.sprites.draw(pixelated=True)
+
+
+HEATMAP_CELL_TILES = 8     # Tiles aggregated per heatmap cell
+HEATMAP_REFRESH = 0.25     # Min seconds between two heatmap rebuilds
+
+
+class DensityHeatmap:
+    """
+    Aggregate LOD for agents: positions binned into cells (np.bincount), drawn as a
+    single translucent texture (cold -> hot ramp) stretched over the map.
+    Used instead of individual sprites when the camera is zoomed out.
+    """
+    def __init__(self, grid_size, tile_size, offset, cell_tiles=HEATMAP_CELL_TILES):
+        self.grid_size = grid_size
+        self.tile_size = tile_size
+        self.offset = offset
+        self.cell_tiles = cell_tiles
+        self.cells = max(1, -(-grid_size // cell_tiles))
+        self.sprites = arcade.SpriteList()
+        self._version = None
+        self._built_at = 0.0
+
+    def _image(self, pos):
+        n, c = self.cells, self.cell_tiles
+        cx = np.clip(pos[:, 0] // c, 0, n - 1)
+        cy = np.clip(pos[:, 1] // c, 0, n - 1)
+        counts = np.bincount(cy * n + cx, minlength=n * n).reshape(n, n)
+        peak = counts.max()
+        heat = np.sqrt(counts / peak) if peak else counts.astype(float)
+
+        rgba = np.zeros((n, n, 4), dtype=np.uint8)
+        rgba[..., 0] = np.clip(510 * heat, 0, 255)
+        rgba[..., 1] = np.clip(255 * (1 - np.abs(2 * heat - 1)), 0, 255)
+        rgba[..., 2] = np.clip(255 * (1 - 2 * heat), 0, 255)
+        rgba[..., 3] = np.where(counts > 0, 90 + 140 * heat, 0)
+        # Row 0 of the image is grid row 0 (top of the map)
+        return Image.fromarray(rgba, "RGBA")
+
+    def update(self, snap, now):
+        """ Rebuild from a snapshot (only if it changed, at most every HEATMAP_REFRESH s) """
+        if snap.version == self._version or (self._version is not None and now - self._built_at < HEATMAP_REFRESH):
+            return
+        self._version = snap.version
+        self._built_at = now
+
+        texture = arcade.Texture(self._image(snap.pos), hash=f"heatmap_{id(self)}_{snap.version}")
+        span = self.cells * self.cell_tiles * self.tile_size
+        sprite = arcade.Sprite(texture, scale=self.cell_tiles * self.tile_size)
+        ox, oy = self.offset
+        sprite.center_x = ox + span / 2
+        sprite.center_y = oy + self.grid_size * self.tile_size - span / 2
+
+        # Swap, and drop the previous texture from the atlas
+        old = list(self.sprites)
+        self.sprites.clear()
+        self.sprites.append(sprite)
+        atlas = self.sprites.atlas
+        for previous in old:
+            if atlas is not None and atlas.has_texture(previous.texture):
+                atlas.remove(previous.texture)
+
+    def draw(self):
+        self.sprites.draw(pixelated=True)
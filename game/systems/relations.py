@@ -1,4 +1,5 @@
 # SYSTEME DE RELATIONS (Sims-like)
+import numpy as np
 
 # Seuils
 TH_LOVER = 80
@@ -8,6 +9,13 @@ TH_NEUTRAL_LOW = -10
 TH_RIVAL = -40
 TH_ENEMY = -70
 
+REL_MIN = -100
+REL_MAX = 100
+
+# Statuts par ordre croissant de score et bornes entières correspondantes (cf. get_rel_status)
+STATUSES = ("Ennemi", "Rival", "Froid", "Neutre", "Sympathique", "Ami", "Amour")
+STATUS_BOUNDS = np.array([TH_ENEMY + 1, TH_RIVAL + 1, TH_NEUTRAL_LOW + 1, TH_NEUTRAL_HIGH, TH_FRIEND, TH_LOVER])
+
 def get_rel_status(score):
     if score >= TH_LOVER: return "Amour"
     if score >= TH_FRIEND: return "Ami"
@@ -17,10 +25,229 @@ def get_rel_status(score):
     if score > TH_ENEMY: return "Rival"
     return "Ennemi"
 
+def status_codes(scores):
+    """Indice dans STATUSES de chaque score (vectorisé, scores entiers)."""
+    return np.searchsorted(STATUS_BOUNDS, scores, side='right')
+
+
+class RelationGraph:
+    """
+    Matrice creuse agent x agent des affinités (format COO : source, cible, score),
+    avec un index par ligne {cible: slot} pour les accès ponctuels en O(1).
+    Les colonnes NumPy permettent les traitements globaux vectorisés
+    (oubli progressif, couples au-delà d'un seuil, répartition par statut).
+    Les noeuds sont des noms : une cible peut ne pas (ou plus) exister.
+    """
+    def __init__(self, capacity=256):
+        self._ids = {}     # nom -> noeud
+        self._names = []   # noeud -> nom
+        self._rows = []    # noeud source -> {noeud cible: slot} (None : pas d'entrée 'rel')
+        self._src = np.zeros(capacity, dtype=np.int32)
+        self._dst = np.zeros(capacity, dtype=np.int32)
+        self._val = np.zeros(capacity, dtype=np.int16)
+        self._live = np.zeros(capacity, dtype=bool)
+        self._free = []
+        self._n = 0        # Slots utilisés (plus haut niveau atteint)
+
+    @classmethod
+    def from_characters(cls, characters_state):
+        """Graphe construit depuis des dicts {name: {'rel': {...}}}."""
+        graph = cls()
+        for name, v in characters_state.items():
+            if 'rel' in v:
+                graph.set_row(name, v['rel'])
+        return graph
+
+    def __len__(self):
+        return int(self._live[:self._n].sum())
+
+    # --- Noeuds / slots ---
+    def _node(self, name):
+        node = self._ids.get(name)
+        if node is None:
+            node = self._ids[name] = len(self._names)
+            self._names.append(name)
+            self._rows.append(None)
+        return node
+
+    def _row(self, node):
+        row = self._rows[node]
+        if row is None:
+            row = self._rows[node] = {}
+        return row
+
+    def _take(self):
+        if self._free:
+            return self._free.pop()
+        if self._n == len(self._val):
+            cap = len(self._val) * 2
+            for attr in ("_src", "_dst", "_val", "_live"):
+                old = getattr(self, attr)
+                new = np.zeros(cap, dtype=old.dtype)
+                new[:self._n] = old[:self._n]
+                setattr(self, attr, new)
+        self._n += 1
+        return self._n - 1
+
+    def _slot(self, src, dst):
+        row = self._row(src)
+        slot = row.get(dst)
+        if slot is None:
+            slot = row[dst] = self._take()
+            self._src[slot], self._dst[slot], self._val[slot] = src, dst, 0
+            self._live[slot] = True
+        return slot
+
+    # --- Lignes (vue dict de v['rel']) ---
+    def has_row(self, name):
+        node = self._ids.get(name)
+        return node is not None and self._rows[node] is not None
+
+    def init_row(self, name):
+        self._row(self._node(name))
+
+    def row(self, name):
+        """{cible: score} de `name` (copie), None s'il n'a pas d'entrée 'rel'."""
+        node = self._ids.get(name)
+        if node is None or self._rows[node] is None:
+            return None
+        names, val = self._names, self._val
+        return {names[dst]: int(val[slot]) for dst, slot in self._rows[node].items()}
+
+    def set_row(self, name, rel):
+        self.drop_row(name)
+        src = self._node(name)
+        self._row(src)
+        for target, score in rel.items():
+            slot = self._slot(src, self._node(target))
+            self._val[slot] = max(REL_MIN, min(REL_MAX, int(round(score))))
+
+    def drop_row(self, name):
+        node = self._ids.get(name)
+        if node is None or self._rows[node] is None:
+            return
+        slots = list(self._rows[node].values())
+        self._live[slots] = False
+        self._val[slots] = 0
+        self._free.extend(slots)
+        self._rows[node] = None
+
+    # --- Accès ponctuels ---
+    def get(self, source, target, default=0):
+        src, dst = self._ids.get(source), self._ids.get(target)
+        if src is None or dst is None or self._rows[src] is None:
+            return default
+        slot = self._rows[src].get(dst)
+        return default if slot is None else int(self._val[slot])
+
+    def scores(self, source, targets):
+        """Scores de `source` envers chaque cible (0 si inconnue)."""
+        src = self._ids.get(source)
+        row = self._rows[src] if src is not None else None
+        if not row:
+            return [0] * len(targets)
+        ids, val = self._ids, self._val
+        out = []
+        for target in targets:
+            slot = row.get(ids.get(target))
+            out.append(0 if slot is None else int(val[slot]))
+        return out
+
+    def add(self, source, target, delta):
+        slot = self._slot(self._node(source), self._node(target))
+        new_val = max(REL_MIN, min(REL_MAX, int(self._val[slot]) + delta))
+        self._val[slot] = new_val
+        return new_val
+
+    def add_many(self, updates):
+        """
+        Mise à jour groupée [(source, cible, delta)] -> nouveaux scores (même ordre).
+        Les deltas d'un même couple sont cumulés puis bornés.
+        """
+        if not updates:
+            return np.zeros(0, dtype=np.int32)
+        node = self._node
+        slots = np.fromiter((self._slot(node(s), node(t)) for s, t, _ in updates), dtype=np.intp, count=len(updates))
+        deltas = np.fromiter((d for _, _, d in updates), dtype=np.int32, count=len(updates))
+        uniq, inverse = np.unique(slots, return_inverse=True)
+        totals = np.bincount(inverse, weights=deltas).astype(np.int32)
+        new_vals = np.clip(self._val[uniq].astype(np.int32) + totals, REL_MIN, REL_MAX)
+        self._val[uniq] = new_vals
+        return new_vals[inverse]
+
+    # --- Traitements globaux (vectorisés) ---
+    def decay(self, factor):
+        """
+        Oubli progressif : chaque score est multiplié par `factor` (tronqué vers 0).
+        Retourne les noms des sources dont au moins un score a changé.
+        """
+        n = self._n
+        val = self._val[:n]
+        idx = np.flatnonzero(self._live[:n] & (val != 0))
+        new_vals = np.trunc(val[idx] * factor).astype(np.int16)
+        changed = idx[new_vals != val[idx]]
+        val[idx] = new_vals
+        names = self._names
+        return [names[src] for src in np.unique(self._src[changed])]
+
+    def top(self, name, k=5, worst=False):
+        """Les k meilleures (ou pires) relations de `name` : [(cible, score)]."""
+        node = self._ids.get(name)
+        row = self._rows[node] if node is not None else None
+        if not row:
+            return []
+        slots = np.fromiter(row.values(), dtype=np.intp, count=len(row))
+        keys = self._val[slots].astype(np.int32)
+        if not worst:
+            keys = -keys
+        if len(slots) > k:
+            part = np.argpartition(keys, k)[:k]
+            slots, keys = slots[part], keys[part]
+        order = np.argsort(keys, kind='stable')
+        names = self._names
+        return [(names[self._dst[s]], int(self._val[s])) for s in slots[order]]
+
+    def pairs(self, lo=None, hi=None):
+        """Couples (source, cible, score) avec lo <= score <= hi."""
+        n = self._n
+        val = self._val[:n]
+        mask = self._live[:n].copy()
+        if lo is not None: mask &= val >= lo
+        if hi is not None: mask &= val <= hi
+        idx = np.flatnonzero(mask)
+        names = self._names
+        return [(names[self._src[i]], names[self._dst[i]], int(val[i])) for i in idx]
+
+    def status_counts(self, name=None):
+        """Nombre de relations par statut (toutes, ou celles de `name`)."""
+        if name is None:
+            n = self._n
+            scores = self._val[:n][self._live[:n]]
+        else:
+            node = self._ids.get(name)
+            row = self._rows[node] if node is not None else None
+            slots = np.fromiter(row.values(), dtype=np.intp) if row else np.zeros(0, dtype=np.intp)
+            scores = self._val[slots]
+        counts = np.bincount(status_codes(scores), minlength=len(STATUSES))
+        return dict(zip(STATUSES, counts.tolist()))
+
+
+def _graph(characters_or_agent):
+    # AgentStore / AgentView exposent leur RelationGraph
+    return getattr(characters_or_agent, 'relations', None)
+
+def _graph_of(characters_state):
+    graph = _graph(characters_state)
+    return graph if graph is not None else RelationGraph.from_characters(characters_state)
+
 def init_relations_if_needed(characters_state):
     """
     Ensure everyone has a 'rel' dict.
     """
+    ensure = getattr(characters_state, 'ensure_relations', None)
+    if ensure is not None:
+        ensure() # AgentStore : O(1) tant qu'aucun agent n'a été ajouté
+        return
     for name, v in characters_state.items():
         if 'rel' not in v:
             v['rel'] = {}
@@ -29,35 +256,86 @@ def update_affinity(source_data, target_name, delta):
     """
     Update relationship score.
     """
+    graph = _graph(source_data)
+    if graph is not None:
+        new_val = graph.add(source_data.name, target_name, delta)
+        return new_val, get_rel_status(new_val)
+
     if 'rel' not in source_data: source_data['rel'] = {}
-    
+
     current = source_data['rel'].get(target_name, 0)
-    new_val = max(-100, min(100, current + delta))
+    new_val = max(REL_MIN, min(REL_MAX, current + delta))
     source_data['rel'][target_name] = new_val
-    
+
     return new_val, get_rel_status(new_val)
 
+def update_affinities(characters_state, updates):
+    """
+    Version groupée de update_affinity : [(source, cible, delta)] -> [(score, statut)].
+    """
+    graph = _graph(characters_state)
+    if graph is None:
+        return [update_affinity(characters_state[source], target, delta) for source, target, delta in updates]
+    return [(int(val), get_rel_status(int(val))) for val in graph.add_many(updates)]
+
 def get_affinity(source_data, target_name):
+    graph = _graph(source_data)
+    if graph is not None:
+        return graph.get(source_data.name, target_name)
     return source_data.get('rel', {}).get(target_name, 0)
 
+def decay_relations(characters_state, factor):
+    """Oubli progressif de toutes les relations. Retourne les agents modifiés."""
+    graph = _graph(characters_state)
+    if graph is None:
+        changed = []
+        for name, v in characters_state.items():
+            rels = v.get('rel') or {}
+            new_rels = {target: int(score * factor) for target, score in rels.items()}
+            if new_rels != rels:
+                v['rel'] = new_rels
+                changed.append(name)
+        return changed
+    return graph.decay(factor)
+
+def top_relations(characters_state, name, k=5, worst=False):
+    """Meilleurs amis (ou pires ennemis) de `name` : [(nom, score)]."""
+    return _graph_of(characters_state).top(name, k, worst)
+
+def find_pairs(characters_state, lo=None, hi=None):
+    """Couples (source, cible, score) dont le score est dans [lo, hi]."""
+    return _graph_of(characters_state).pairs(lo, hi)
+
+def lovers(characters_state):
+    return find_pairs(characters_state, lo=TH_LOVER)
+
+def enemies(characters_state):
+    return find_pairs(characters_state, hi=TH_ENEMY)
+
+def status_counts(characters_state, name=None):
+    """Répartition des relations par statut (monde entier ou un agent)."""
+    return _graph_of(characters_state).status_counts(name)
+
 def get_social_context(name, characters_state, visible_neighbors):
     """
     Returns a string describing relations with VISIBLE neighbors.
     Ex: "Draco (Rival: -45), Luna (Ami: 60)"
     """
-    v = characters_state[name]
-    rels = v.get('rel', {})
-    
+    neighbors = [neighbor for neighbor in visible_neighbors if neighbor != name]
+    graph = _graph(characters_state)
+    if graph is not None:
+        scores = graph.scores(name, neighbors)
+    else:
+        rels = characters_state[name].get('rel', {})
+        scores = [rels.get(neighbor, 0) for neighbor in neighbors]
+
     context_parts = []
-    
-    for neighbor in visible_neighbors:
-        if neighbor == name: continue
-        
-        score = rels.get(neighbor, 0)
+
+    for neighbor, score in zip(neighbors, scores):
         status = get_rel_status(score)
         context_parts.append(f"{neighbor} ({status}: {score})")
-        
+
     if not context_parts:
         return "Aucune relation notable ici."
-        
+
     return ", ".join(context_parts)
@@ -1,19 +1,20 @@
 from core.llm import get_llm
+from core.config import ROUTE_NARRATION, ROUTE_SUMMARY, ROUTE_FACTS, ROUTE_SCAN
 import os
 import json
 
 STORY_DIR = "resources/story"
 os.makedirs(STORY_DIR, exist_ok=True)
 
-def get_gemini_client():
-    # Deprecated: Redirect to core.llm
-    return get_llm()
+def get_gemini_client(purpose=ROUTE_NARRATION):
+    # Deprecated: Redirect to core.llm (client partagé de la route, modèle selon LLM_ROUTES)
+    return get_llm(purpose=purpose)
 
 def prepare_prompt_ai(events):
     """
     Utilise Gemini 3 pour synthétiser les logs (anciennement local).
     """
-    client = get_gemini_client()
+    client = get_gemini_client(ROUTE_SUMMARY)
     if not client: return events
 
     try:
@@ -36,7 +37,7 @@ def narrate_turn_local(events):
     """
     Récit simple via API (remplace l'ancien fallback local).
     """
-    client = get_gemini_client()
+    client = get_gemini_client(ROUTE_NARRATION)
     if not client: return "(Pas d'IA disponible)"
 
     try:
@@ -57,7 +58,7 @@ def extract_facts_ai(logs_text):
     """
     Analyse les logs pour extraire les faits marquants via Gemini 3 (anciennement local).
     """
-    client = get_gemini_client()
+    client = get_gemini_client(ROUTE_FACTS)
     if not client: return []
 
     try:
@@ -91,7 +92,7 @@ def narrate_continuous(current_chapter_text, turn_logs, world_seed, world_time_m
     Génère la suite de l'histoire en se basant sur TOUT le chapitre en cours.
     Assure une continuité parfaite.
     """
-    client = get_gemini_client()
+    client = get_gemini_client(ROUTE_NARRATION)
     if not client:
         return narrate_turn_local(turn_logs) # Fallback simple
 
@@ -163,7 +164,7 @@ def analyze_chapter(full_chapter_text, villagers_data):
     """
     Analyse un chapitre TERMINÉ pour en extraire des souvenirs.
     """
-    client = get_gemini_client()
+    client = get_gemini_client(ROUTE_FACTS)
     if not client: return []
     
     prompt = f"""
@@ -188,7 +189,7 @@ def scan_for_objects(text):
     """
     Scanne le texte pour trouver des objets mentionnés qui devraient apparaître sur la carte.
     """
-    client = get_gemini_client()
+    client = get_gemini_client(ROUTE_SCAN)
     if not client: return []
     
     prompt = f"""
@@ -11,9 +11,11 @@ WEATHER_STATES = [
 ]
 
 
-def update_weather(current_weather=None):
-    if random.random() < 0.2: # 20% de chance de changer
-        new_weather = random.choice(WEATHER_STATES)
+def update_weather(current_weather=None, rng=None):
+    """ rng : random.Random dédié (parties reproductibles), sinon module random """
+    rng = rng or random
+    if rng.random() < 0.2: # 20% de chance de changer
+        new_weather = rng.choice(WEATHER_STATES)
         if new_weather != current_weather:
              bus.publish("WEATHER_CHANGE", {"type": new_weather})
         return new_weather
@@ -1,25 +1,24 @@
 import arcade
 import arcade.gui
 import random
-import copy
+import time
 from collections import namedtuple
 
+import numpy as np
+
+from core import metrics
+from core.config import METRICS_OVERLAY
+from game.map_renderer import ChunkedMapRenderer, DensityHeatmap, view_rect
+
 # Constants
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 TITLE = "MyVillage - Simulation Vie Artificielle"
 TILE_SIZE = 24  # Base tile size in pixels
-GRID_SIZE = 32  # Number of tiles per axis
-MAP_PIXEL_SIZE = GRID_SIZE * TILE_SIZE
-
-# Colors
-COLOR_OCEAN = (30, 60, 100)
-# Colors (Modern Palette)
-COLOR_OCEAN = (100, 149, 237)   # Cornflower Blue
-COLOR_GRASS = (144, 238, 144)   # Light Green
-COLOR_FOREST = (34, 139, 34)    # Forest Green
-COLOR_MOUNTAIN = (169, 169, 169) # Dark Gray
-COLOR_VILLAGE = (222, 184, 135) # Burlywood
+TWEEN_SECONDS = 0.4  # Duration of a sprite move between two grid cells
+LOD_ZOOM = 0.35  # Below this camera zoom, agents are drawn as a density heatmap
+MAX_VISIBLE_SPRITES = 4000  # More agents than this in view: heatmap as well
+METRICS_REFRESH = 0.5  # Seconds between two refreshes of the stage latency overlay
 
 class AgentSprite(arcade.Sprite):
     """ Visual representation of an agent """
@@ -30,19 +29,35 @@ class AgentSprite(arcade.Sprite):
         # Position in Grid Coords
         self.target_grid_x = x
         self.target_grid_y = y
-        # Convert to screen (will be updated by window)
+        # Screen position (set by the window, which owns the grid -> screen mapping)
         self.center_x = x * TILE_SIZE + TILE_SIZE/2
         self.center_y = y * TILE_SIZE + TILE_SIZE/2
+        # Tween state (screen coords)
+        self.start_pos = (self.center_x, self.center_y)
+        self.end_pos = self.start_pos
+        self.tween_t = 1.0
         
         # Color code by role? using `color` tint
         if "Maire" in role: self.color = arcade.color.RED
         elif "Forgeron" in role: self.color = arcade.color.ORANGE
         else: self.color = arcade.color.WHITE
 
-    def update_position(self, grid_x, grid_y):
+    def update_position(self, grid_x, grid_y, screen_x, screen_y):
+        """ Start a tween from the current screen position to the new cell """
         self.target_grid_x = grid_x
         self.target_grid_y = grid_y
-        # Interpolation Logic would go here in update()
+        self.start_pos = (self.center_x, self.center_y)
+        self.end_pos = (screen_x, screen_y)
+        self.tween_t = 0.0
+
+    def advance(self, delta_time):
+        """ Step the tween (smoothstep easing). Returns True once the sprite has arrived """
+        self.tween_t = min(1.0, self.tween_t + delta_time / TWEEN_SECONDS)
+        k = self.tween_t * self.tween_t * (3 - 2 * self.tween_t)
+        (x0, y0), (x1, y1) = self.start_pos, self.end_pos
+        self.center_x = x0 + (x1 - x0) * k
+        self.center_y = y0 + (y1 - y0) * k
+        return self.tween_t >= 1.0
 
 class VillageWindow(arcade.Window):
     def __init__(self, shared_state):
@@ -51,13 +66,25 @@ class VillageWindow(arcade.Window):
         
         self.shared_state = shared_state # Dict or Object shared with Engine Thread
         
+        # Number of tiles per axis (from the world seed)
+        self.grid_size = shared_state.get('grid_size') or len(shared_state.get('map_layout', []))
+        self.map_pixel_size = self.grid_size * TILE_SIZE
+        
         self.scene = None
         self.camera = None
         self.gui_camera = None
         self.tile_map = None
         
-        self.agent_sprites = arcade.SpriteList()
-        self.agents_map = {} # name -> sprite
+        self.agent_sprites = arcade.SpriteList() # Culled: only the agents in view
+        self.agents_map = {} # name -> sprite (created lazily, when first seen)
+        self._visible_key = None
+        self.lod_heatmap = False
+        # Last engine snapshot applied to the sprites
+        self._snapshot_version = 0
+        self._snapshot_epoch = 0
+        self._snapshot_pos = None
+        # Sprites currently tweening (the only ones touched per frame)
+        self.moving = set()
 
     def setup(self):
         """ Set up the game and initialize the variables. """
@@ -87,6 +114,14 @@ class VillageWindow(arcade.Window):
             "", 10, SCREEN_HEIGHT - 20, 
             arcade.color.YELLOW, font_size=12
         )
+        # Stage latency overlay (F3), under the perf graph
+        self.show_metrics = METRICS_OVERLAY
+        self._metrics_refreshed = 0.0
+        self.metrics_text = arcade.Text(
+            "", SCREEN_WIDTH - 210, SCREEN_HEIGHT - 90,
+            arcade.color.LIGHT_GREEN, font_size=10, width=200,
+            anchor_y="top", multiline=True, font_name="Courier New"
+        )
 
     def setup_ui(self):
         # Create a vertical BoxGroup to align buttons
@@ -111,81 +146,143 @@ class VillageWindow(arcade.Window):
         self.manager.add(anchor_layout)
 
         
-        # 1. Generate Map Texture/ShapeList
-        # Optimization: use_spatial_hash=True for static map tiles
-        self.tile_sprites = arcade.SpriteList(use_spatial_hash=True)
-        
+        # 1. Static Map: baked chunk textures, built lazily as they come into view
         map_layout = self.shared_state.get('map_layout', [])
-        map_legend = self.shared_state.get('map_legend', {})
+        map_colors = self.shared_state.get('map_colors', {})
         
-        offset_x = (SCREEN_WIDTH - MAP_PIXEL_SIZE) // 2
-        offset_y = (SCREEN_HEIGHT - MAP_PIXEL_SIZE) // 2
+        offset_x = (SCREEN_WIDTH - self.map_pixel_size) // 2
+        offset_y = (SCREEN_HEIGHT - self.map_pixel_size) // 2
         self.map_offset = (offset_x, offset_y)
         
-        center_x = SCREEN_WIDTH // 2
-        center_y = SCREEN_HEIGHT // 2
-        
-        # Build Map
-        for y, row in enumerate(map_layout):
-            for x, char in enumerate(row):
-                screen_x = offset_x + (x * TILE_SIZE) + TILE_SIZE/2
-                screen_y = offset_y + ((GRID_SIZE - 1 - y) * TILE_SIZE) + TILE_SIZE/2
-                
-                color = COLOR_OCEAN
-                if char == '.': color = COLOR_GRASS
-                elif char == 'T': color = COLOR_FOREST
-                elif char == 'M': color = COLOR_MOUNTAIN
-                elif char == 'H': color = COLOR_VILLAGE
-                
-                # Arcade 3.0: Use Sprites for tiles
-                tile = arcade.SpriteSolidColor(TILE_SIZE, TILE_SIZE, color)
-                tile.center_x = screen_x
-                tile.center_y = screen_y
-                self.tile_sprites.append(tile)
+        self.map_renderer = ChunkedMapRenderer(map_layout, map_colors, TILE_SIZE, self.map_offset)
+        self.heatmap = DensityHeatmap(self.grid_size, TILE_SIZE, self.map_offset)
 
     def reset_simulation(self, event):
         """ Callback to reset the game state """
         print("🗑️ RESET GAME REQUESTED")
-        # Clear State
-        self.shared_state['logs'] = []
-        self.shared_state['world_time'] = 1200
-        self.shared_state['weather'] = "Chaud"
-        
-        # Reset Characters from SEED
-        if 'initial_seed' in self.shared_state:
-            seed = self.shared_state['initial_seed']
-            self.shared_state['characters'] = copy.deepcopy(seed['characters'])
+        # The engine thread performs the reset between two turns (no mid-turn swap)
+        self.shared_state['reset_requested'] = True
+
+    def latest_snapshot(self):
+        """ Latest immutable snapshot published by the engine (None before the first one) """
+        publisher = self.shared_state.get('snapshots')
+        return publisher.latest() if publisher is not None else None
+
+    def grid_to_screen(self, gx, gy):
+        """ Convert Grid -> Screen (tile centre, y axis flipped) """
+        ox, oy = self.map_offset
+        return ox + (gx * TILE_SIZE) + TILE_SIZE/2, oy + ((self.grid_size - 1 - gy) * TILE_SIZE) + TILE_SIZE/2
+
+    def changed_rows(self, snap):
+        """ Rows to sync: the engine's dirty set, or a position diff if snapshots were skipped """
+        prev = self._snapshot_pos
+        if snap.version == self._snapshot_version + 1 or prev is None or prev.shape != snap.pos.shape:
+            return snap.changed
+        return np.flatnonzero((snap.pos != prev).any(axis=1))
+
+    def sync_snapshot(self, snap):
+        """ Apply a new engine snapshot: only changed agents are touched """
+        # New population (load / reset): rebuild sprites
+        if snap.epoch != self._snapshot_epoch:
+            self._snapshot_epoch = snap.epoch
             self.agent_sprites.clear()
             self.agents_map.clear()
-            print("✅ Game State Reset to Seed.")
-        else:
-             print("⚠️ Cannot reset: initial_seed not found in shared_state")
+            self.moving.clear()
+            self._snapshot_pos = None
+        
+        if self.agents_map:
+            for row in self.changed_rows(snap):
+                sprite = self.agents_map.get(snap.names[row])
+                if sprite is None:
+                    continue # Never seen yet: created when it comes into view
+                gx, gy = int(snap.pos[row, 0]), int(snap.pos[row, 1])
+                if (gx, gy) != (sprite.target_grid_x, sprite.target_grid_y):
+                    # Moved: tween from where it is now
+                    sprite.update_position(gx, gy, *self.grid_to_screen(gx, gy))
+                    self.moving.add(sprite)
+        
+        self._snapshot_version = snap.version
+        self._snapshot_pos = snap.pos
+
+    def sprite_for(self, snap, row):
+        """ Sprite of an agent, created (snapped to its cell) on first sight """
+        name = snap.names[row]
+        sprite = self.agents_map.get(name)
+        if sprite is None:
+            gx, gy = int(snap.pos[row, 0]), int(snap.pos[row, 1])
+            sprite = AgentSprite(name, snap.roles[row], gx, gy)
+            sprite.center_x, sprite.center_y = self.grid_to_screen(gx, gy)
+            sprite.start_pos = sprite.end_pos = (sprite.center_x, sprite.center_y)
+            self.agents_map[name] = sprite
+        return sprite
+
+    def view_grid_bounds(self):
+        """ Camera view in grid cells (x0, x1, y0, y1), with a 1 tile margin """
+        left, right, bottom, top = view_rect(self.camera)
+        ox, oy = self.map_offset
+        x0 = int((left - ox) // TILE_SIZE) - 1
+        x1 = int((right - ox) // TILE_SIZE) + 1
+        y0 = self.grid_size - 1 - int((top - oy) // TILE_SIZE) - 1
+        y1 = self.grid_size - 1 - int((bottom - oy) // TILE_SIZE) + 1
+        return x0, x1, y0, y1
+
+    def update_visible(self, snap):
+        """
+        Camera culling + LOD: rebuild the drawn sprite list only when the snapshot
+        or the view (in whole tiles) changes. Zoomed out: density heatmap instead.
+        """
+        bounds = self.view_grid_bounds()
+        zoomed_out = self.camera.zoom < LOD_ZOOM
+        key = (snap.version, bounds, zoomed_out)
+        if key == self._visible_key:
+            return
+        self._visible_key = key
+        
+        x0, x1, y0, y1 = bounds
+        pos = snap.pos
+        rows = np.flatnonzero((pos[:, 0] >= x0) & (pos[:, 0] <= x1) & (pos[:, 1] >= y0) & (pos[:, 1] <= y1))
+        self.lod_heatmap = zoomed_out or len(rows) > MAX_VISIBLE_SPRITES
+        if self.lod_heatmap:
+            self.agent_sprites.clear()
+            return
+        
+        visible = [self.sprite_for(snap, row) for row in rows]
+        # Sprites tweening across the view edge stay drawn until they arrive
+        seen = set(visible)
+        visible.extend(sprite for sprite in self.moving if sprite not in seen)
+        self.agent_sprites.clear()
+        self.agent_sprites.extend(visible)
 
     def on_update(self, delta_time):
         """ Movement and game logic """
-        # Sync with Shared State
-        characters_data = self.shared_state.get('characters', {})
-        
-        # Add new agents
-        for name, data in characters_data.items():
-            if name not in self.agents_map:
-                gx, gy = data['pos']
-                role = data.get('role', 'Villager')
-                sprite = AgentSprite(name, role, gx, gy)
-                self.agent_sprites.append(sprite)
-                self.agents_map[name] = sprite
-            else:
-                # Update existing
-                sprite = self.agents_map[name]
-                gx, gy = data['pos']
-                
-                # Convert Grid -> Screen
-                ox, oy = self.map_offset
-                screen_x = ox + (gx * TILE_SIZE) + TILE_SIZE/2
-                screen_y = oy + ((GRID_SIZE - 1 - gy) * TILE_SIZE) + TILE_SIZE/2
-                
-                # Simple LERRP or Snap
-                sprite.center_y = screen_y
+        # Sync with the engine's published snapshot (never the live state)
+        snap = self.latest_snapshot()
+        if snap is not None and snap.version != self._snapshot_version:
+            self.sync_snapshot(snap)
+        
+        # Tween only the sprites in motion: flat frame time when no one moves
+        if self.moving:
+            arrived = [sprite for sprite in self.moving if sprite.advance(delta_time)]
+            self.moving.difference_update(arrived)
+
+    def on_key_press(self, symbol, modifiers):
+        """ F3 toggles the stage latency overlay """
+        if symbol == arcade.key.F3:
+            self.show_metrics = not self.show_metrics
+            self._metrics_refreshed = 0.0
+
+    def refresh_metrics_text(self, now):
+        """ Stage p50/p95 from the metrics registry (rebuilt at most every METRICS_REFRESH s) """
+        if now - self._metrics_refreshed < METRICS_REFRESH:
+            return
+        self._metrics_refreshed = now
+        summary = metrics.summary()
+        lines = ["stage          p50    p95 ms"]
+        for name in metrics.STAGES:
+            if name in summary:
+                _, _, p50, p95 = summary[name]
+                lines.append(f"{name:<14}{p50 * 1e3:>6.1f}{p95 * 1e3:>7.1f}")
+        self.metrics_text.text = "\n".join(lines)
 
     def on_mouse_drag(self, x, y, dx, dy, buttons, modifiers):
         """ Handle camera panning """
@@ -210,27 +307,41 @@ class VillageWindow(arcade.Window):
         
         # World Projection
         self.camera.use()
-        self.tile_sprites.draw() # Map
-        self.agent_sprites.draw() # Agents
+        self.map_renderer.update(self.camera)
+        self.map_renderer.draw() # Map
+        snap = self.latest_snapshot()
+        if snap is not None:
+            self.update_visible(snap)
+            if self.lod_heatmap:
+                self.heatmap.update(snap, time.perf_counter())
+                self.heatmap.draw() # Agents (aggregate)
+            else:
+                self.agent_sprites.draw() # Agents (in view only)
         
         # GUI Projection
         self.gui_camera.use()
         self.manager.draw()
         
         # HUD Top-Right
-        time_min = self.shared_state.get('world_time', 0)
+        snap = self.latest_snapshot()
+        time_min = snap.world_time if snap else 0
         h = time_min // 60
         m = time_min % 60
-        weather = self.shared_state.get('weather', "?")
+        weather = snap.weather if snap else "?"
+        day = (snap.day if snap else 0) + 1
         
         # Update Text Content
-        self.hud_text.text = f"{h:02d}h{m:02d}\n{weather}"
+        self.hud_text.text = f"Jour {day} - {h:02d}h{m:02d}\n{weather}"
         self.hud_text.draw()
 
         # Agent Count Debug
-        # Agent Count Debug
-        self.debug_text.text = f"Agents: {len(self.agent_sprites)}"
+        total = len(snap.names) if snap else 0
+        shown = "heatmap" if self.lod_heatmap else f"{len(self.agent_sprites)} visibles"
+        self.debug_text.text = f"Agents: {total} ({shown})"
         self.debug_text.draw()
         
         # Performance Graph
         self.perf_list.draw()
+        if self.show_metrics:
+            self.refresh_metrics_text(time.perf_counter())
+            self.metrics_text.draw()
@@ -0,0 +1,154 @@
+"""
+Simulation sans fenêtre (soak tests, capacity planning).
+Fait tourner SimulationEngine pendant N jours simulés, à vitesse max (aucune
+attente horloge murale), puis affiche ticks/s, décisions/s et appels LLM.
+
+Usage : python headless.py --days 2 --backend fake [--latency 0.05] [--save] [--json]
+        python headless.py --days 1 --export-log journal.md [--log-agent Mira] [--log-from 0.5]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from core import engine as game_engine
+from core import llm
+from core import storage
+from core import metrics
+from core.bus import bus
+from core.config import EVENT_LOG_SPILL, EVENT_LOG_DIR
+from core.event_log import export_markdown
+from core.scheduler import MINUTES_PER_DAY, absolute_time
+from core.state import SEED_FILE, load_seed, init_state
+
+
+async def run(engine, state, minutes, max_turns=None, use_async=True, progress=True):
+    """Boucle moteur jusqu'à `minutes` minutes simulées plus loin. Retourne le nb de ticks."""
+    end = absolute_time(state) + minutes
+    ticks = 0
+    last_day = state.day
+    while absolute_time(state) < end:
+        # Circuit LLM ouvert : horloge simulée figée jusqu'à l'appel d'essai
+        pause = engine.llm_pause(state)
+        if pause:
+            await asyncio.sleep(pause)
+            continue
+        ready_agents = engine.jump_to_next_event(state)
+        ticks += 1
+        if ready_agents:
+            if use_async:
+                await engine.run_agents_turn_async(state, target_agents=ready_agents)
+            else:
+                engine.run_agents_turn(state, target_agents=ready_agents)
+        if progress and state.day != last_day:
+            last_day = state.day
+            print(f"Jour {state.day + 1} ({engine.decisions} décisions)")
+        if max_turns is not None and engine.turns >= max_turns:
+            break
+    return ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation headless (sans UI)")
+    parser.add_argument("--days", type=float, default=1.0, help="Jours simulés")
+    parser.add_argument("--seed-file", default=SEED_FILE)
+    parser.add_argument("--backend", choices=["live", "record", "replay", "fake"], default=None,
+                        help="Backend LLM (défaut : env LLM_BACKEND)")
+    parser.add_argument("--tape", default=None, help="Bande record/replay")
+    parser.add_argument("--latency", type=float, default=None, help="Latence synthétique fake/replay (s)")
+    parser.add_argument("--sim-seed", type=int, default=None, help="Graine du RNG global")
+    parser.add_argument("--resume", action="store_true", help="Reprendre la sauvegarde existante")
+    parser.add_argument("--save", action="store_true", help="Sauvegarde continue (désactivée par défaut)")
+    parser.add_argument("--threads", action="store_true", help="Chemin ThreadPool au lieu d'asyncio")
+    parser.add_argument("--max-turns", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="Rapport JSON sur stdout")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Endpoint Prometheus /metrics pendant le run")
+    parser.add_argument("--export-log", default=None, help="Journal de partie en markdown à la fin du run")
+    parser.add_argument("--log-agent", default=None, help="--export-log : événements d'un seul agent")
+    parser.add_argument("--log-from", type=float, default=None, help="--export-log : à partir du jour N (fractions acceptées)")
+    parser.add_argument("--log-to", type=float, default=None, help="--export-log : jusqu'au jour N (exclu)")
+    args = parser.parse_args()
+
+    # --json : stdout réservé au rapport, les messages du moteur / de la sauvegarde passent sur stderr
+    out = sys.stdout
+    if args.json:
+        sys.stdout = sys.stderr
+
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    seed = load_seed(args.seed_file)
+    state = init_state(seed, resume=args.resume, sim_seed=args.sim_seed)
+    state.llm = llm.get_llm(args.backend, args.tape, args.latency)
+
+    engine = game_engine.SimulationEngine(seed, sim_seed=args.sim_seed)
+    engine.autosave = args.save
+    if args.save and EVENT_LOG_SPILL:
+        state.events.attach(EVENT_LOG_DIR)
+
+    minutes = int(args.days * MINUTES_PER_DAY)
+    t0 = time.perf_counter()
+    ticks = asyncio.run(run(engine, state, minutes, args.max_turns, not args.threads, progress=not args.json))
+    elapsed = time.perf_counter() - t0
+
+    if args.save:
+        storage.writer.flush()
+    exported = None
+    if args.export_log:
+        t0, t1 = (int(d * MINUTES_PER_DAY) if d is not None else None for d in (args.log_from, args.log_to))
+        exported = export_markdown(state.events, args.export_log, args.log_agent, t0, t1)
+    policy = getattr(getattr(state.llm, "inner", state.llm), "policy", None)
+
+    report = {
+        "agents": len(state.characters),
+        "sim_minutes": minutes,
+        "wall_seconds": round(elapsed, 3),
+        "ticks": ticks,
+        "turns": engine.turns,
+        "decisions": engine.decisions,
+        "events_in_memory": len(state.events),
+        "ticks_per_s": round(ticks / elapsed, 2) if elapsed else 0.0,
+        "decisions_per_s": round(engine.decisions / elapsed, 2) if elapsed else 0.0,
+        "llm_calls": llm.prompt_stats.calls,
+        "prompt_tokens": llm.prompt_stats.summary(),
+        "batcher": engine.batcher.stats(),
+        "decision_cache": engine.decision_cache.stats() if engine.decision_cache is not None else None,
+        "bus": bus.stats(),
+        "llm_policy": policy.stats() if policy is not None else None,
+        "llm_routes": llm.route_stats.summary(),
+        "llm_clients": llm.client_pool.stats(),
+        "saves": storage.writer.stats() if args.save else None,
+        "exported_events": exported,
+        "stages": {name: {"count": count, "total_s": round(total, 4), "p50_ms": round(p50 * 1e3, 3), "p95_ms": round(p95 * 1e3, 3)}
+                   for name, (count, total, p50, p95) in metrics.summary().items()},
+    }
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False), file=out)
+    else:
+        print(f"{report['agents']} agents, {minutes} min simulées en {elapsed:.2f}s")
+        print(f"  ticks       : {ticks} ({report['ticks_per_s']}/s)")
+        print(f"  décisions   : {engine.decisions} ({report['decisions_per_s']}/s)")
+        print(f"  appels LLM  : {report['llm_calls']}")
+        p = report["prompt_tokens"]
+        if p["calls"]:
+            cache = (f"{p['cached_tokens']} tokens en cache" if p["prefix_cacheable"]
+                     else f"< {p['cache_min_tokens']} : pas de cache de contexte")
+            print(f"  préfixe     : ~{p['avg_prefix']:.0f} tokens ({cache})")
+        if exported is not None:
+            print(f"  journal     : {exported} événements -> {args.export_log}")
+        if report["saves"]:
+            s = report["saves"]
+            print(f"  sauvegardes : {s['writes']} écritures / {s['requests']} demandes, "
+                  f"lag max {s['max_save_lag_s']}s, {s['bytes_written']} octets")
+        for route, r in report["llm_routes"].items():
+            print(f"  route {route:<9}: {r['model']} n={r['calls']} avg={r['avg_s']}s p95={r['p95_s']}s "
+                  f"tokens={r['input_tokens']}/{r['output_tokens']} ~${r['cost_usd']}")
+        for name in metrics.STAGES:
+            if name in report["stages"]:
+                s = report["stages"][name]
+                print(f"  {name:<15}: n={s['count']} p50={s['p50_ms']}ms p95={s['p95_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,86 @@
+import os
 import threading
-import time
-import json
+import asyncio
 import arcade
-from typing import Dict, Any, Optional
 
 from core import engine as game_engine
 from core import llm
-from core import storage
+from core import metrics
+from core.config import EVENT_LOG_SPILL, EVENT_LOG_DIR, METRICS_PORT, METRICS_HOST
+from core.state import GameState, SEED_FILE, load_seed, init_state
 from game.ui_arcade import VillageWindow
 
-# Shared State (replacing st.session_state)
-class GameState(dict):
-    """ Simple dict wrapper to allow attribute access if needed by legacy code """
-    def __getattr__(self, item: str) -> Any:
-        return self.get(item)
-    def __setattr__(self, key: str, value: Any) -> None:
-        self[key] = value
 
-state = GameState()
-
-# LOAD DATA
-try:
-    with open("resources/world_gen/world_seed.json", "r", encoding='utf-8') as f:
-        SEED: Dict[str, Any] = json.load(f)
-except FileNotFoundError:
-    print("FATAL: resources/world_gen/world_seed.json not found!")
-    exit(1)
-
-# INITIALIZE STATE
-loaded_state: Optional[Dict[str, Any]] = storage.load_world()
-if loaded_state:
-    state.update(loaded_state) # Load existing Save
-else:
-    # Init New
-    state.characters = SEED['characters']
-    state.world_time = 1200
-    state.weather = "Chaud"
-    state.logs = []
-    
-state.map_layout = SEED['map_layout']
-state.map_legend = SEED['map_legend']
-state.initial_seed = SEED # For Reset functionality
-
-# Init Engine
-# Important: Engine needs llm in state?
-# In engine.py we saw: llm_instance = state.llm
-# So we need to init LLM here.
-state.llm = llm.get_llm()
-
-engine = game_engine.SimulationEngine(SEED)
-
-def engine_thread_loop() -> None:
-    """ Background thread running the simulation tick """
+async def engine_loop(engine: game_engine.SimulationEngine, state: GameState) -> None:
+    """ Simulation loop, driven by the engine thread's event loop """
     print("🚀 Engine Thread Started")
     while True:
-        # 1. Tick
-        ready_agents = engine.tick(state, minutes=5)
+        # 0. LLM circuit open: freeze the sim clock until the probe call is allowed
+        pause = engine.llm_pause(state)
+        if pause:
+            await asyncio.sleep(pause)
+            continue
+
+        # 1. Jump to the next wake-up (heap scheduler, no polling)
+        ready_agents = engine.jump_to_next_event(state)
         
         # 2. Decisions?
         # If agents are ready, we trigger them.
-        # Note: This might be blocking if LLM is slow.
-        # In main.py we separate UI spinner from Logic.
-        # Here we are in a background thread, so blocking is 'okay' for logic, 
-        # but the UI thread (Arcade) handles rendering so it won't freeze.
+        # All batches go out concurrently on the event loop (bounded by a semaphore).
+        # The UI thread (Arcade) handles rendering so it won't freeze.
         
         if ready_agents:
             print(f"🧠 Processing agents: {ready_agents}")
-            engine.run_agents_turn(state, target_agents=ready_agents)
+            await engine.run_agents_turn_async(state, target_agents=ready_agents)
             print(f"✅ Turn Complete.")
-        
-        # Sleep a bit to avoid CPU burn if nothing happens
-        time.sleep(0.5)
+        else:
+            # Nobody scheduled: sleep a bit to avoid CPU burn
+            await asyncio.sleep(0.5)
 
-# START THREAD
-t = threading.Thread(target=engine_thread_loop, daemon=True)
-t.start()
+def engine_thread_loop(engine: game_engine.SimulationEngine, state: GameState) -> None:
+    """ Background thread: one long-lived event loop for the whole session """
+    asyncio.run(engine_loop(engine, state))
 
-# START UI (Main Thread)
-if __name__ == "__main__":
+def main() -> None:
+    # LOAD DATA
+    try:
+        seed = load_seed()
+    except FileNotFoundError:
+        print(f"FATAL: {SEED_FILE} not found!")
+        exit(1)
+
+    # Prometheus endpoint (per-stage latencies, LLM calls/tokens/errors)
+    metrics_port = int(os.getenv("METRICS_PORT", METRICS_PORT or 0))
+    if metrics_port:
+        try:
+            metrics.serve(metrics_port, METRICS_HOST)
+        except OSError as e:
+            print(f"Métriques indisponibles (port {metrics_port}) : {e}")
+
+    # INITIALIZE STATE
+    # Optional RNG seed (deterministic runs, e.g. with LLM_BACKEND=replay)
+    sim_seed = int(os.getenv("SIM_SEED")) if os.getenv("SIM_SEED") else None
+    state = init_state(seed, sim_seed=sim_seed)
+    if EVENT_LOG_SPILL:
+        # Full event history on disk (rotating indexed segments)
+        state.events.attach(EVENT_LOG_DIR)
+
+    # Init Engine
+    # Engine reads the LLM from state.llm
+    state.llm = llm.get_llm()
+    engine = game_engine.SimulationEngine(seed, sim_seed=sim_seed)
+    # The UI only reads the engine's published snapshots
+    state.snapshots = engine.snapshots
+    engine.publish(state)
+
+    # START THREAD
+    t = threading.Thread(target=engine_thread_loop, args=(engine, state), daemon=True)
+    t.start()
+
+    # START UI (Main Thread)
     window = VillageWindow(state)
     window.setup()
     arcade.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import copy
+import os
+
+# Aucun appel réseau pendant les tests
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+import pytest
+
+from core.state import load_seed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SEED = load_seed(os.path.join(ROOT, "resources", "world_gen", "world_seed.json"))
+
+
+@pytest.fixture
+def seed():
+    """Seed du monde de base (copie : init_state garde une référence sur les personnages)."""
+    return copy.deepcopy(_SEED)
+
+
+@pytest.fixture
+def tmp_cwd(tmp_path, monkeypatch):
+    """Répertoire de travail temporaire (les sauvegardes écrivent sous data/)."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from core.agent_store import AgentStore
+
+
+def _characters():
+    return {
+        "Mira": {"role": "Sorcière", "pos": [1, 2], "energy": 90, "inventory": ["baguette"], "rel": {"Filius": 10}},
+        "Filius": {"role": "Professeur", "pos": [3, 4], "stats": {"MAGIE": 5, "SOCIAL": 1, "PHYSIQUE": 0, "SAVOIR": 9}},
+        "Rusard": {"pos": [0, 0], "mood": "grognon"},
+    }
+
+
+def test_round_trip_matches_dicts():
+    chars = _characters()
+    store = AgentStore.from_dict(chars)
+    assert store.to_dict() == chars
+    assert dict(store["Rusard"]) == chars["Rusard"]
+    assert store.get("Personne") is None
+    with pytest.raises(KeyError):
+        store["Personne"]
+
+
+def test_text_fields_live_in_sparse_object_columns():
+    store = AgentStore.from_dict(_characters())
+    assert "mood" not in store["Mira"] and store["Rusard"]["mood"] == "grognon"
+    with pytest.raises(KeyError):
+        store["Mira"]["mood"]
+    assert store["Filius"].get("inventory", []) == []
+
+    store["Mira"]["mood"] = "ravie"
+    del store["Rusard"]["mood"]
+    assert "mood" not in store["Rusard"]
+    with pytest.raises(KeyError):
+        del store["Rusard"]["mood"]
+    assert store["Mira"]["mood"] == "ravie"
+
+
+def test_views_are_created_on_demand():
+    store = AgentStore.from_dict(_characters())
+    a, b = store["Mira"], store["Mira"]
+    a["energy"] = 50
+    assert b["energy"] == 50 and a == b
+
+
+def test_delete_keeps_columns_aligned():
+    store = AgentStore.from_dict(_characters())
+    del store["Mira"]
+    store["Hagrid"] = {"role": "Garde-chasse", "energy": 100}
+    assert list(store) == ["Filius", "Rusard", "Hagrid"]
+    assert store["Rusard"]["mood"] == "grognon" and "mood" not in store["Hagrid"]
+    assert store["Filius"]["role"] == "Professeur"
+    assert list(store.column("energy", default=-1)) == [-1, -1, 100]
+    assert list(store.stat_values(np.array([0, 2]), np.array([3, 0]))) == [9, 0]
@@ -0,0 +1,51 @@
+import numpy as np
+
+from core.agent_store import AgentStore
+from game.entities.rpg import DiceRoller
+
+
+def _store(n=50):
+    return AgentStore.from_dict({f"agent{i}": {"energy": 100} for i in range(n)})
+
+
+def test_same_seed_same_rolls():
+    a, b = _store(), _store()
+    rows = np.arange(len(a))
+    first = [DiceRoller(42).d20(a, rows) for _ in range(3)]
+    again = [DiceRoller(42).d20(b, rows) for _ in range(3)]
+    assert all((x == y).all() for x, y in zip(first, again))
+    assert not (DiceRoller(43).d20(_store(), rows) == first[0]).all()
+
+
+def test_rolls_do_not_depend_on_batch_order():
+    dice = DiceRoller(7)
+    a, b = _store(), _store()
+    rows = np.arange(len(a))
+    in_order = dice.d20(a, rows)
+    reversed_rows = rows[::-1].copy()
+    shuffled = dice.d20(b, reversed_rows)
+    assert (shuffled == in_order[reversed_rows]).all()
+
+
+def test_counter_advances_per_agent_and_is_saved():
+    store = _store(3)
+    dice = DiceRoller(1)
+    dice.d20(store, np.array([0, 1]))
+    second = dice.d20(store, np.array([0]))
+    assert list(store.column('rolls')) == [2, 1, 0]
+
+    # Le n-ième jet ne dépend que de (graine, nom, n) : compteur repris de la colonne 'rolls'
+    resumed = AgentStore.from_dict({"agent0": {"energy": 100, "rolls": 1}})
+    assert (DiceRoller(1).d20(resumed, np.array([0])) == second).all()
+    reloaded = AgentStore.from_dict(store.to_dict())
+    assert (DiceRoller(1).d20(reloaded, np.array([1])) == DiceRoller(1).d20(store, np.array([1]))).all()
+
+
+def test_d20_range_and_spread():
+    store = _store(1000)
+    dice = DiceRoller(3)
+    rows = np.arange(len(store))
+    rolls = np.concatenate([dice.d20(store, rows) for _ in range(20)])
+    assert rolls.min() == 1 and rolls.max() == 20
+    counts = np.bincount(rolls, minlength=21)[1:]
+    assert abs(counts / len(rolls) - 0.05).max() < 0.01
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+import headless
+from core import engine as game_engine
+from core.config import LLM_FAILED_RETRY_MINUTES
+from core.llm import FakeLLM
+from core.resilience import CallPolicy, CircuitBreaker, CircuitOpen
+from core.scheduler import MINUTES_PER_DAY, absolute_time
+from core.state import init_state
+from game.systems import weather
+
+
+class DownLLM:
+    """Fournisseur en panne : chaque appel échoue et ouvre le circuit (essai possible après `cooldown` s)."""
+    def __init__(self, cooldown=0.01):
+        self.policy = CallPolicy(hedge=False, breaker=CircuitBreaker(failures=1, cooldown=cooldown))
+        self.calls = 0
+
+    def invoke(self, prompt, prefix=None):
+        self.calls += 1
+        self.policy.admit_stream()
+        self.policy.stream_done(0.0, CircuitOpen("panne"))
+        raise CircuitOpen("panne")
+
+    async def ainvoke(self, prompt, prefix=None):
+        return self.invoke(prompt, prefix)
+
+
+@pytest.fixture
+def sim(seed, tmp_cwd):
+    state = init_state(seed, resume=False, sim_seed=0)
+    state.llm = FakeLLM()
+    engine = game_engine.SimulationEngine(seed, sim_seed=0)
+    engine.autosave = False
+    return engine, state
+
+
+@pytest.fixture
+def weather_rolls(monkeypatch):
+    rolls = []
+    update = weather.update_weather
+
+    def counted(current, rng=None):
+        rolls.append(current)
+        return update(current, rng)
+    monkeypatch.setattr(weather, "update_weather", counted)
+    return rolls
+
+
+def test_one_day_with_fake_llm(sim, weather_rolls):
+    engine, state = sim
+    start = absolute_time(state)
+    ticks = asyncio.run(headless.run(engine, state, MINUTES_PER_DAY, progress=False))
+
+    assert absolute_time(state) >= start + MINUTES_PER_DAY
+    assert state.day == 1
+    assert 0 < ticks < MINUTES_PER_DAY
+    assert engine.decisions > len(state.characters)
+    assert len(state.events) == engine.decisions
+    # Météo : un tirage par tranche de 10 minutes franchie, même en sautant d'un réveil à l'autre
+    assert len(weather_rolls) == MINUTES_PER_DAY // game_engine.WEATHER_PERIOD
+
+
+def test_threaded_path_matches_async_clock(sim, weather_rolls):
+    engine, state = sim
+    asyncio.run(headless.run(engine, state, MINUTES_PER_DAY // 4, use_async=False, progress=False))
+    assert engine.decisions > 0
+    assert len(weather_rolls) == MINUTES_PER_DAY // 4 // game_engine.WEATHER_PERIOD
+
+
+def test_outage_backs_off_instead_of_racing_the_clock(sim):
+    engine, state = sim
+    state.llm = DownLLM()
+    ticks = asyncio.run(headless.run(engine, state, MINUTES_PER_DAY, progress=False))
+
+    assert engine.decisions == 0
+    # Agents sans décision reprogrammés plus loin (report croissant), pas à la même minute
+    assert ticks <= MINUTES_PER_DAY // LLM_FAILED_RETRY_MINUTES
+    assert engine.failed_retry_delay() > LLM_FAILED_RETRY_MINUTES
+    assert state.llm.calls <= ticks * len(state.characters)
+
+
+def test_open_circuit_freezes_the_clock(sim):
+    engine, state = sim
+    state.llm = DownLLM(cooldown=60)
+    state.llm.policy.breaker.failure()
+    assert engine.llm_pause(state) > 0
+
+    start = absolute_time(state)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(headless.run(engine, state, MINUTES_PER_DAY, progress=False), 0.2))
+    assert absolute_time(state) == start
+    assert state.llm.calls == 0
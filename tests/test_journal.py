@@ -0,0 +1,75 @@
+import os
+
+from core import storage
+from core.storage import WorldJournal
+
+
+def _characters():
+    return {
+        "Mira": {"pos": [1, 2], "energy": 100, "role": "Sorcière"},
+        "Filius": {"pos": [5, 5], "energy": 80, "role": "Professeur", "mood": "calme"},
+    }
+
+
+def test_deltas_round_trip_through_load_world(tmp_cwd):
+    journal = WorldJournal(storage.SAVE_FILE_JOURNAL, snapshot_every=10, fsync_every=1)
+    chars = _characters()
+    journal.record_turn({}, [], 1200, "Chaud", baseline={k: dict(v) for k, v in chars.items()}, logs=["début"])
+
+    chars["Mira"]["pos"] = [2, 2]
+    chars["Mira"]["energy"] = 98
+    journal.record_turn({"Mira": dict(chars["Mira"])}, ["tour 1"], 1205, "Pluie")
+    del chars["Filius"]["mood"]
+    journal.record_turn({"Filius": dict(chars["Filius"])}, ["tour 2"], 1210, "Pluie", day=1)
+    journal.close()
+
+    data = storage.load_world()
+    assert data["characters"] == chars
+    assert (data["world_time"], data["day"], data["weather"]) == (1210, 1, "Pluie")
+    assert data["logs"] == ["tour 2", "tour 1", "début"]
+
+
+def test_journal_only_stores_changed_fields(tmp_cwd):
+    journal = WorldJournal(storage.SAVE_FILE_JOURNAL, snapshot_every=10)
+    chars = _characters()
+    journal.record_turn({}, [], 1200, "Chaud", baseline={k: dict(v) for k, v in chars.items()})
+    size = journal.bytes_written
+    journal.record_turn({"Mira": dict(chars["Mira"], energy=90)}, [], 1205, "Chaud")
+    journal.close()
+
+    entries = storage._read_journal(storage.SAVE_FILE_JOURNAL)
+    assert entries[-1]["chars"] == {"Mira": {"set": {"energy": 90}}}
+    assert journal.bytes_written > size
+
+
+def test_compaction_snapshots_and_truncates_journal(tmp_cwd):
+    journal = WorldJournal(storage.SAVE_FILE_JOURNAL, snapshot_every=3)
+    chars = _characters()
+    journal.record_turn({}, [], 1200, "Chaud", baseline={k: dict(v) for k, v in chars.items()})
+    for i in range(3):
+        chars["Mira"]["energy"] -= 1
+        journal.record_turn({"Mira": dict(chars["Mira"])}, [f"tour {i}"], 1201 + i, "Chaud")
+    # Compaction au 3e tour : journal vidé, tout est dans le snapshot
+    assert os.path.getsize(storage.SAVE_FILE_JOURNAL) == 0
+
+    chars["Filius"]["energy"] = 10
+    journal.record_turn({"Filius": dict(chars["Filius"])}, ["après"], 1210, "Neige")
+    journal.close()
+
+    data = storage.load_world()
+    assert data["characters"] == chars
+    assert data["weather"] == "Neige"
+    assert data["logs"][:2] == ["après", "tour 2"]
+
+
+def test_truncated_last_line_is_ignored(tmp_cwd):
+    journal = WorldJournal(storage.SAVE_FILE_JOURNAL, snapshot_every=10)
+    chars = _characters()
+    journal.record_turn({}, [], 1200, "Chaud", baseline={k: dict(v) for k, v in chars.items()})
+    journal.record_turn({"Mira": dict(chars["Mira"], energy=1)}, [], 1205, "Chaud")
+    journal.close()
+    with open(storage.SAVE_FILE_JOURNAL, "a", encoding="utf-8") as f:
+        f.write('{"seq": 99, "chars": {"Mira": {"set": {"ener')  # Crash pendant l'écriture
+
+    data = storage.load_world()
+    assert data["characters"]["Mira"]["energy"] == 1
@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core import llm
+from core.config import PROMPT_CACHE_MIN_TOKENS
+from game.entities import characters
+
+
+class StubModels:
+    """generate_content : le préfixe en cache est compté dans cached_content_token_count."""
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, model, contents, config=None):
+        name = getattr(config, "cached_content", None)
+        self.client.requests.append((contents, name))
+        cached = llm.estimate_tokens(self.client.cached[name]) if name else 0
+        usage = SimpleNamespace(prompt_token_count=cached + llm.estimate_tokens(contents), cached_content_token_count=cached)
+        return SimpleNamespace(text="{}", usage_metadata=usage)
+
+
+class StubCaches:
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, model, config):
+        name = f"cachedContents/{len(self.client.cached)}"
+        self.client.cached[name] = config.contents[0]
+        return SimpleNamespace(name=name)
+
+
+class StubAio:
+    def __init__(self, client):
+        self.models = SimpleNamespace(generate_content=self._generate)
+        self.caches = SimpleNamespace(create=self._create)
+        self.client = client
+
+    async def _generate(self, **kwargs):
+        return self.client.models.generate_content(**kwargs)
+
+    async def _create(self, **kwargs):
+        return self.client.caches.create(**kwargs)
+
+
+class StubClient:
+    def __init__(self):
+        self.cached = {}
+        self.requests = []
+        self.models = StubModels(self)
+        self.caches = StubCaches(self)
+        self.aio = StubAio(self)
+
+
+@pytest.fixture
+def wrapper():
+    llm.prompt_stats.reset()
+    w = llm.GeminiWrapper("models/test", base_url="http://127.0.0.1:9")
+    w.client = StubClient()
+    return w
+
+
+def test_large_prefix_is_cached_once_and_only_suffix_is_sent(wrapper):
+    prefix = "règle " * (PROMPT_CACHE_MIN_TOKENS * 2)
+    wrapper.invoke("batch 1", prefix=prefix)
+    asyncio.run(wrapper.ainvoke("batch 2", prefix=prefix))
+
+    assert len(wrapper.client.cached) == 1
+    assert [contents for contents, _ in wrapper.client.requests] == ["batch 1", "batch 2"]
+    stats = llm.prompt_stats.summary()
+    assert stats["prefix_cacheable"] and stats["explicit_cache_calls"] == 2
+    assert stats["cached_tokens"] == 2 * llm.estimate_tokens(prefix)
+
+
+def test_seed_prefix_is_below_provider_minimum(wrapper, seed):
+    prefix = characters.build_static_prefix(seed)
+    wrapper.invoke("batch", prefix=prefix)
+
+    # Pas de cache créé : prompt complet, préfixe en tête
+    assert wrapper.client.cached == {}
+    assert wrapper.client.requests == [(prefix + "batch", None)]
+    stats = llm.prompt_stats.summary()
+    assert not stats["prefix_cacheable"] and stats["cached_tokens"] == 0
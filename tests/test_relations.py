@@ -0,0 +1,68 @@
+import pytest
+
+from core.agent_store import AgentStore
+from game.systems import relations
+from game.systems.relations import RelationGraph, REL_MAX, REL_MIN
+
+
+def test_rows_round_trip_and_clamp():
+    graph = RelationGraph(capacity=2)
+    graph.set_row("a", {"b": 20, "c": -150})
+    graph.set_row("b", {"a": 250})
+    assert graph.row("a") == {"b": 20, "c": REL_MIN}
+    assert graph.row("b") == {"a": REL_MAX}
+    assert graph.row("c") is None
+    assert graph.get("a", "c") == REL_MIN
+    assert graph.get("c", "a", default=7) == 7
+    assert len(graph) == 3
+
+
+def test_add_many_accumulates_same_pair_then_clamps():
+    graph = RelationGraph()
+    graph.set_row("a", {"b": 90})
+    new = graph.add_many([("a", "b", 5), ("a", "c", -3), ("a", "b", 10)])
+    assert list(new) == [REL_MAX, -3, REL_MAX]
+    assert graph.scores("a", ["b", "c", "z"]) == [REL_MAX, -3, 0]
+
+
+def test_drop_row_frees_slots_for_reuse():
+    graph = RelationGraph(capacity=4)
+    graph.set_row("a", {"b": 10, "c": 20})
+    graph.drop_row("a")
+    assert len(graph) == 0
+    graph.set_row("d", {"a": 5, "b": 6})
+    assert graph.row("d") == {"a": 5, "b": 6}
+    assert graph._n == 2
+
+
+def test_decay_truncates_towards_zero_and_reports_sources():
+    graph = RelationGraph()
+    graph.set_row("a", {"b": 10, "c": -10})
+    graph.set_row("b", {"a": 1})
+    changed = graph.decay(0.95)
+    assert graph.row("a") == {"b": 9, "c": -9}
+    assert graph.get("b", "a") == 0
+    assert sorted(changed) == ["a", "b"]
+
+
+def test_top_pairs_and_status_counts():
+    graph = RelationGraph()
+    graph.set_row("a", {"b": 90, "c": -80, "d": 55, "e": 0})
+    assert graph.top("a", k=2) == [("b", 90), ("d", 55)]
+    assert graph.top("a", k=1, worst=True) == [("c", -80)]
+    assert graph.pairs(lo=50) == [("a", "b", 90), ("a", "d", 55)]
+    counts = graph.status_counts("a")
+    assert (counts["Amour"], counts["Ami"], counts["Ennemi"], counts["Neutre"]) == (1, 1, 1, 1)
+
+
+@pytest.mark.parametrize("score", [-100, -70, -69, -40, -39, -10, -9, 9, 10, 49, 50, 79, 80, 100])
+def test_vectorised_status_matches_scalar(score):
+    assert relations.STATUSES[relations.status_codes([score])[0]] == relations.get_rel_status(score)
+
+
+def test_agent_store_relations_view():
+    store = AgentStore.from_dict({"a": {"rel": {"b": 10}}, "b": {}})
+    relations.update_affinities(store, [("a", "b", 5), ("b", "a", -3)])
+    assert store["a"]["rel"] == {"b": 15}
+    assert relations.get_affinity(store["b"], "a") == -3
+    assert store.to_dict()["a"]["rel"] == {"b": 15}
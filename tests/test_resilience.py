@@ -0,0 +1,180 @@
+import asyncio
+import time
+
+import pytest
+
+from core.resilience import CallPolicy, CircuitBreaker, CircuitOpen, LLMError, LLMTimeout, is_retryable
+
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class NoJitter:
+    """rng de backoff : attente nulle entre les relances."""
+    def uniform(self, a, b):
+        return a
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def flaky(failures, code=503, result="ok"):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ApiError(code)
+        return result
+    return fn, calls
+
+
+def policy(**kwargs):
+    kwargs.setdefault("hedge", False)
+    return CallPolicy(rng=NoJitter(), **kwargs)
+
+
+def test_retryable_errors():
+    assert is_retryable(ApiError(503)) and is_retryable(ApiError(429)) and is_retryable(TimeoutError())
+    assert is_retryable(ConnectionResetError()) and is_retryable(LLMTimeout())
+    assert not is_retryable(ApiError(400))
+    assert not is_retryable(CircuitOpen())
+    assert not is_retryable(TypeError("bug")) and not is_retryable(ValueError("réponse illisible"))
+
+
+def test_breaker_opens_then_probes_once_after_cooldown():
+    clock = Clock()
+    breaker = CircuitBreaker(failures=2, cooldown=10, clock=clock)
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    assert breaker.retry_in() == 10
+
+    clock.now = 10
+    assert breaker.retry_in() == 0
+    assert breaker.allow()        # Appel d'essai
+    assert not breaker.allow()    # Un seul à la fois
+    breaker.failure()             # Essai raté : nouvelle période d'ouverture
+    assert breaker.state == CircuitBreaker.OPEN and breaker.trips == 2
+
+    clock.now = 25
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.retry_in() == 0
+
+
+def test_transient_errors_are_retried():
+    fn, calls = flaky(2)
+    p = policy(retries=2)
+    assert p.call(fn) == "ok"
+    assert len(calls) == 3 and p.retried == 2
+
+
+def test_client_errors_are_not_retried():
+    fn, calls = flaky(5, code=400)
+    p = policy(retries=2)
+    with pytest.raises(LLMError):
+        p.call(fn)
+    assert len(calls) == 1
+
+
+def test_unknown_errors_fail_fast():
+    calls = []
+
+    def fn():
+        calls.append(1)
+        raise KeyError("candidates")
+
+    p = policy(retries=2)
+    with pytest.raises(LLMError):
+        p.call(fn)
+    assert len(calls) == 1 and p.retried == 0
+
+
+def test_open_circuit_rejects_without_calling():
+    fn, calls = flaky(100)
+    p = policy(retries=0, breaker=CircuitBreaker(failures=2, cooldown=60))
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            p.call(fn)
+    with pytest.raises(CircuitOpen):
+        p.call(fn)
+    assert len(calls) == 2 and p.rejected == 1
+
+
+def test_deadline_raises_timeout():
+    p = policy(deadline=0.05, retries=0)
+    with pytest.raises(LLMTimeout):
+        p.call(lambda: time.sleep(0.5))
+    assert p.timeouts == 1
+
+
+def test_deadline_covers_retries():
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.3)
+        raise ApiError(503)
+
+    p = policy(deadline=0.5, retries=5)
+    t0 = time.perf_counter()
+    with pytest.raises(LLMError):
+        p.call(fn)
+    assert time.perf_counter() - t0 < 0.7
+    assert len(calls) == 2  # La 2e tentative n'a que le reste du délai
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    p = policy(deadline=0.1, retries=5)
+    t0 = time.perf_counter()
+    with pytest.raises(LLMTimeout):
+        asyncio.run(p.acall(slow))
+    assert time.perf_counter() - t0 < 0.3
+
+
+def test_hedge_wins_over_slow_first_attempt():
+    p = CallPolicy(deadline=2.0, hedge=True, retries=0, rng=NoJitter())
+    for _ in range(30):
+        p.latency.observe(0.01)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            time.sleep(1.0)  # Première requête coincée
+            return "lent"
+        return "rapide"
+
+    t0 = time.perf_counter()
+    assert p.call(fn) == "rapide"
+    assert time.perf_counter() - t0 < 0.9
+    assert p.hedged == 1 and p.hedge_wins == 1
+
+
+def test_async_call_retries_and_times_out():
+    fn, calls = flaky(1)
+
+    async def factory():
+        return fn()
+
+    p = policy(retries=1)
+    assert asyncio.run(p.acall(factory)) == "ok"
+    assert len(calls) == 2
+
+    async def stuck():
+        await asyncio.sleep(1)
+
+    p = policy(deadline=0.05, retries=0)
+    with pytest.raises(LLMTimeout):
+        asyncio.run(p.acall(stuck))
@@ -0,0 +1,49 @@
+from core.agent_store import AgentStore
+from core.scheduler import EventScheduler, MINUTES_PER_DAY, absolute_time
+
+
+def test_pop_due_returns_agents_in_wake_order():
+    sched = EventScheduler()
+    sched.schedule("b", 30)
+    sched.schedule("a", 10)
+    sched.schedule("c", 50)
+    assert sched.pop_due(40) == ["a", "b"]
+    assert sched.pop_due(40) == []
+    assert sched.next_wake() == 50
+
+
+def test_rescheduled_agent_skips_stale_entry():
+    sched = EventScheduler()
+    sched.schedule("a", 10)
+    sched.schedule("a", 100)
+    assert sched.pop_due(50) == []
+    assert sched.next_wake() == 100
+    assert sched.pop_due(100) == ["a"]
+
+
+def test_cancel_and_popped_agents_are_not_due():
+    sched = EventScheduler()
+    sched.schedule("a", 10)
+    sched.schedule("b", 10)
+    sched.cancel("b")
+    assert sched.pop_due(10) == ["a"]
+    # Sorti du tas (tour en cours) tant qu'il n'est pas reprogrammé
+    assert sched.next_wake() is None
+    assert len(sched) == 1
+
+
+def test_ensure_rebuilds_from_busy_until():
+    store = AgentStore.from_dict({"a": {"busy_until": 1300}, "b": {"busy_until": 1250}})
+    sched = EventScheduler()
+    sched.ensure(store)
+    assert sched.next_wake() == 1250
+    assert sched.pop_due(1300) == ["b", "a"]
+
+    store["c"] = {"busy_until": 1200}
+    sched.ensure(store)
+    assert sched.pop_due(1200) == ["c"]
+
+
+def test_absolute_time_spans_days():
+    assert absolute_time({"day": 2, "world_time": 30}) == 2 * MINUTES_PER_DAY + 30
+    assert absolute_time({"world_time": 30}) == 30
@@ -0,0 +1,43 @@
+import json
+
+from game.entities.characters import DecisionStreamParser
+
+RESPONSE = {
+    "Mira": {"action": "DISCUTER", "pensee": "Un { piège } ?", "target": "Filius", "dest": [3, 4]},
+    "Filius": {"action": "REPOS", "pensee": "Il a dit \"non\"", "dest": [1, 1], "reaction": None},
+}
+
+
+def _feed_all(parser, text, size):
+    out = []
+    for i in range(0, len(text), size):
+        out.extend(parser.feed(text[i:i + size]))
+    return out
+
+
+def test_emits_each_agent_as_soon_as_its_object_closes():
+    text = json.dumps(RESPONSE, ensure_ascii=False)
+    parser = DecisionStreamParser()
+    cut = text.rindex('"Filius"')  # Clé du second agent (pas la cible de Mira)
+    first = parser.feed(text[:cut])
+    assert first == [("Mira", RESPONSE["Mira"])]
+    assert parser.feed(text[cut:]) == [("Filius", RESPONSE["Filius"])]
+    assert parser.done
+
+
+def test_chunk_boundaries_do_not_matter():
+    text = "```json\n" + json.dumps(RESPONSE, ensure_ascii=False, indent=2) + "\n```"
+    for size in (1, 2, 7, 64, len(text)):
+        assert dict(_feed_all(DecisionStreamParser(), text, size)) == RESPONSE
+
+
+def test_invalid_member_is_skipped():
+    text = '{"Mira": {"action": "REPOS", "duration": }, "Filius": {"action": "BOIRE"}}'
+    assert _feed_all(DecisionStreamParser(), text, 5) == [("Filius", {"action": "BOIRE"})]
+
+
+def test_text_after_root_object_is_ignored():
+    parser = DecisionStreamParser()
+    assert parser.feed('{"Mira": {"action": "REPOS"}} {"Rusard": {}}') == [("Mira", {"action": "REPOS"})]
+    assert parser.done
+    assert parser.feed('{"Filius": {"action": "BOIRE"}}') == []
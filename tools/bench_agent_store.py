@@ -0,0 +1,86 @@
+"""
+Benchmark : dict de dicts vs AgentStore colonnaire (mémoire + scans du moteur).
+
+Usage : python tools/bench_agent_store.py [--sizes 1000 10000 50000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.agent_store import AgentStore
+from game.entities.rpg import init_stats
+
+REPEAT = 5
+
+
+def make_characters(n_agents, rng):
+    return {
+        f"Agent{i}": {
+            "role": "Étudiant", "age": 17, "description": "", "inventory": [],
+            "pos": [rng.randrange(256), rng.randrange(256)],
+            "energy": rng.randrange(101), "mana": 100,
+            "busy_until": rng.randrange(1440), "xp": 0, "level": 1,
+            "stats": init_stats("Étudiant"),
+        }
+        for i in range(n_agents)
+    }
+
+
+def measure(build):
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def best(fn, repeat=REPEAT):
+    """Meilleur temps sur `repeat` appels (écarte le premier appel à froid) et dernier résultat."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def bench(n_agents, seed):
+    dicts, mem_dict = measure(lambda: make_characters(n_agents, random.Random(seed)))
+    store, mem_store = measure(lambda: AgentStore.from_dict(make_characters(n_agents, random.Random(seed))))
+
+    now = 720
+    t_scan_dict, ready_dict = best(lambda: [n for n, v in dicts.items() if now >= v.get('busy_until', 0)])
+    t_scan_store, ready_store = best(lambda: store.names_where(store.column('busy_until', 0) <= now))
+    assert ready_dict == ready_store
+
+    def regen_dict():
+        for n in ready_dict:
+            v = dicts[n]
+            v['energy'] = max(0, v.get('energy', 100) - 2)
+
+    rows = store.rows(ready_store)
+    t_regen_dict, _ = best(regen_dict)
+    t_regen_store, _ = best(lambda: store.add_clipped('energy', rows, -2, default=100, lo=0))
+
+    return n_agents, mem_dict, mem_store, t_scan_dict, t_scan_store, t_regen_dict, t_regen_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'agents':>8} {'dict (o/agent)':>15} {'store (o/agent)':>16} {'scan dict (ms)':>15} {'scan store (ms)':>16} {'regen dict (ms)':>16} {'regen store (ms)':>17}")
+    for n in args.sizes:
+        n, md, ms, sd, ss, rd, rs = bench(n, args.seed)
+        print(f"{n:>8} {md / n:>15.0f} {ms / n:>16.0f} {sd * 1e3:>15.2f} {ss * 1e3:>16.2f} {rd * 1e3:>16.2f} {rs * 1e3:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark : dispatch des batches LLM via ThreadPoolExecutor(5) (chemin historique
+de run_agents_turn) vs asyncio + sémaphore (run_agents_turn_async).
+Backend LLM local (FakeLLM) avec latence artificielle, sans réseau.
+Les prompts sont construits hors chrono : on ne mesure que l'attente LLM + le parsing.
+
+Usage : python tools/bench_async_llm.py [--batches 50 100 200 500] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm import FakeLLM
+from game.entities import characters
+
+BATCH_SIZE = 15
+
+
+def make_batches(n_batches):
+    chars = {}
+    batches = []
+    for b in range(n_batches):
+        names = [f"Agent{b}_{i}" for i in range(BATCH_SIZE)]
+        for i, name in enumerate(names):
+            chars[name] = {"role": "Étudiant", "age": 17, "energy": 100, "pos": [i, b % 32]}
+        batches.append(names)
+    prompts = [
+        "".join(f"--- PERSONNAGE: {n} ---\nLIEU: Rue (Coord {chars[n]['pos']}).\n" for n in names)
+        for names in batches
+    ]
+    return chars, batches, prompts
+
+
+def run_threads(llm, chars, batches, prompts):
+    def task(i):
+        return characters.parse_batch_response(llm.invoke(prompts[i]), batches[i], chars)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(task, i) for i in range(len(batches))]
+        return [f.result() for f in concurrent.futures.as_completed(futures)]
+
+
+async def run_async(llm, chars, batches, prompts, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def task(i):
+        async with semaphore:
+            res = await llm.ainvoke(prompts[i])
+        return characters.parse_batch_response(res, batches[i], chars)
+
+    return await asyncio.gather(*(task(i) for i in range(len(batches))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batches", type=int, nargs="+", default=[50, 100, 200, 500])
+    parser.add_argument("--latency", type=float, default=0.2, help="Latence simulée par appel (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[32, 128, 512],
+                        help="Tailles de sémaphore asyncio à comparer")
+    args = parser.parse_args()
+
+    header = f"{'batches':>8} {'threads(5) (s)':>15}" + "".join(f" {f'async({c}) (s)':>15}" for c in args.concurrency)
+    print(header)
+    for n in args.batches:
+        chars, batches, prompts = make_batches(n)
+
+        llm = FakeLLM(latency=args.latency)
+        t0 = time.perf_counter()
+        run_threads(llm, chars, batches, prompts)
+        line = f"{n:>8} {time.perf_counter() - t0:>15.2f}"
+
+        for c in args.concurrency:
+            llm = FakeLLM(latency=args.latency)
+            t0 = time.perf_counter()
+            asyncio.run(run_async(llm, chars, batches, prompts, c))
+            line += f" {time.perf_counter() - t0:>15.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
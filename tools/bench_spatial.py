@@ -0,0 +1,79 @@
+"""
+Benchmark : perception des voisins (parcours linéaire vs index spatial).
+
+Usage : python tools/bench_spatial.py [--sizes 100 1000 10000] [--queries 500]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.spatial import SpatialGrid
+from game.entities.characters import find_visible_neighbors
+
+
+def make_world(n_agents, rng):
+    # Densité constante (~1 agent pour 64 cases, comme la carte de base)
+    side = max(32, int((n_agents * 64) ** 0.5))
+    return {
+        f"Agent{i}": {"pos": [rng.randrange(side), rng.randrange(side)]}
+        for i in range(n_agents)
+    }, side
+
+
+def bench(n_agents, n_queries, rng):
+    chars, side = make_world(n_agents, rng)
+    names = rng.sample(list(chars), min(n_queries, n_agents))
+
+    t0 = time.perf_counter()
+    linear = [find_visible_neighbors(n, chars[n], chars) for n in names]
+    t_linear = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    grid = SpatialGrid()
+    grid.rebuild(chars)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    indexed = [find_visible_neighbors(n, chars[n], chars, grid) for n in names]
+    t_grid = time.perf_counter() - t0
+
+    assert linear == indexed, "L'index spatial diverge du parcours linéaire"
+
+    # Mise à jour incrémentale (déplacements d'un tour)
+    t0 = time.perf_counter()
+    for n in names:
+        p = [rng.randrange(side), rng.randrange(side)]
+        chars[n]['pos'] = p
+        grid.move(n, p)
+    t_move = time.perf_counter() - t0
+
+    return {
+        "agents": n_agents,
+        "linear_us": t_linear / len(names) * 1e6,
+        "grid_us": t_grid / len(names) * 1e6,
+        "build_ms": t_build * 1e3,
+        "move_us": t_move / len(names) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'agents':>8} {'linéaire (us/req)':>18} {'grille (us/req)':>16} {'speedup':>8} {'build (ms)':>11} {'move (us)':>10}")
+    for n in args.sizes:
+        r = bench(n, args.queries, rng)
+        print(f"{r['agents']:>8} {r['linear_us']:>18.1f} {r['grid_us']:>16.1f} "
+              f"{r['linear_us'] / r['grid_us']:>7.0f}x {r['build_ms']:>11.2f} {r['move_us']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Suite de benchmarks des chemins chauds du moteur, de 10 à 10k agents.
+LLM hors-ligne (FakeLLM, latence nulle) : on ne mesure que le code de la simulation.
+
+Mesures (médiane de --repeat passes par taille de monde, plus bas = mieux) :
+- tick_us            : SimulationEngine.tick (1 minute)
+- jump_us            : SimulationEngine.jump_to_next_event
+- prompt_agent_us    : characters.get_agent_prompt_data (par agent)
+- batch_prompt_ms    : characters.batch_agent_turn (un batch, FakeLLM + parsing)
+- apply_decision_us  : application des décisions de run_agents_turn (par décision)
+- social_context_us  : relations.get_social_context (par agent)
+- rel_update_us      : relations.update_affinities (par mise à jour, lot de 200)
+- rel_top_us         : relations.top_relations (par agent, k=5)
+- rel_decay_ms       : relations.decay_relations (tout le graphe)
+- save_world_ms / load_world_ms : sauvegarde ZIP complète / chargement
+
+Usage :
+  python tools/bench_suite.py [--sizes 10 100 1000 10000] [--repeat 5] [--out results.json]
+  python tools/bench_suite.py --save-baseline            # écrit tools/bench_baseline.json
+  python tools/bench_suite.py --compare [--threshold 0.25]  # code retour 1 si régression
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core import storage
+from core.engine import SimulationEngine
+from core.agent_store import AgentStore
+from core.event_log import EventLog
+from core.llm import FakeLLM
+from core.scheduler import absolute_time
+from core.state import GameState, load_seed
+from game.entities import characters
+from game.entities import rpg as rpg_system
+from game.systems import relations
+from tools.world_generator import generate_world
+
+DEFAULT_BASELINE = os.path.join(ROOT, "tools", "bench_baseline.json")
+SAMPLE = 200          # Agents échantillonnés pour les mesures par agent
+REL_PER_AGENT = 8     # Relations connues par agent
+
+
+def make_world(base_seed, n_agents, rng):
+    """Monde de n agents (tools/world_generator.py, densité de la carte de base) + stats, relations, réveils."""
+    side = max(base_seed['grid_size'], int((n_agents * 64) ** 0.5))
+    seed = generate_world(base_seed, side, n_agents, rng)
+    chars = seed['characters']
+    names = list(chars)
+    for v in chars.values():
+        v['stats'] = rpg_system.init_stats(v['role'])
+        v['xp'] = 0; v['level'] = 1
+        v['busy_until'] = rng.randrange(1200, 1200 + 240)
+        v['rel'] = {other: rng.randint(-100, 100) for other in rng.sample(names, min(REL_PER_AGENT, n_agents))}
+    return seed
+
+
+def make_state(seed):
+    state = GameState()
+    state.characters = AgentStore.from_dict(seed['characters'])
+    state.world_time = 1200
+    state.day = 0
+    state.weather = "Chaud"
+    state.events = EventLog()
+    state.llm = FakeLLM()
+    return state
+
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def bench_size(base_seed, n_agents, rng):
+    seed = make_world(base_seed, n_agents, rng)
+    state = make_state(seed)
+    engine = SimulationEngine(seed, sim_seed=0)
+    engine.autosave = False
+    engine.decision_cache = None  # Chaque décision passe par le LLM
+    chars = state.characters
+    engine.scheduler.ensure(chars)
+    engine.spatial.ensure(chars)
+    sample = rng.sample(chars.names, min(SAMPLE, n_agents))
+    res = {}
+
+    # tick / jump : les agents réveillés sont reprogrammés plus loin (tas toujours plein)
+    def reschedule(ready):
+        now = absolute_time(state)
+        for name in ready:
+            engine.scheduler.schedule(name, now + rng.randrange(5, 240))
+    res["tick_us"] = timed(lambda: reschedule(engine.tick(state, 1)), 500) * 1e6
+    res["jump_us"] = timed(lambda: reschedule(engine.jump_to_next_event(state)), 500) * 1e6
+
+    # Assemblage des prompts
+    terrains = engine._batch_terrains(sample, chars)
+    res["prompt_agent_us"] = timed(lambda: [
+        characters.get_agent_prompt_data(n, chars[n], chars, "20h00", seed, terrains[n], "", engine.spatial)
+        for n in sample
+    ], 1) / len(sample) * 1e6
+    batch = sample[:15]
+    res["batch_prompt_ms"] = timed(lambda: characters.batch_agent_turn(
+        state.llm, batch, chars, "20h00", state.weather, seed, terrains, "", engine.spatial
+    ), 5) * 1e3
+
+    # Application des décisions (décisions FakeLLM pré-calculées, hors chrono)
+    decisions = {}
+    for i in range(0, len(sample), 15):
+        names = sample[i:i + 15]
+        decisions.update(characters.batch_agent_turn(state.llm, names, chars, "20h00", state.weather, seed, terrains, "", engine.spatial))
+    results = [(n, dict(decisions[n]), chars[n]) for n in sample]
+    t0 = time.perf_counter()
+    engine._apply_results(state, results, sample, "20h00")
+    res["apply_decision_us"] = (time.perf_counter() - t0) / len(sample) * 1e6
+
+    # Contexte social
+    neighbors = {n: characters.find_visible_neighbors(n, chars[n], chars, engine.spatial) for n in sample}
+    res["social_context_us"] = timed(lambda: [
+        relations.get_social_context(n, chars, neighbors[n]) for n in sample
+    ], 5) / len(sample) * 1e6
+
+    # Graphe des relations
+    updates = [(n, rng.choice(chars.names), rng.choice((2, 5, -2))) for n in sample]
+    res["rel_update_us"] = timed(lambda: relations.update_affinities(chars, updates), 5) / len(updates) * 1e6
+    res["rel_top_us"] = timed(lambda: [relations.top_relations(chars, n, 5) for n in sample], 5) / len(sample) * 1e6
+    res["rel_decay_ms"] = timed(lambda: relations.decay_relations(chars, 0.99), 5) * 1e3
+
+    # Sauvegarde / chargement (répertoire temporaire, sans journal)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            t0 = time.perf_counter()
+            storage.save_world(chars, state.world_time, state.events.export(storage.MAX_LOGS), state.weather, day=state.day)
+            res["save_world_ms"] = (time.perf_counter() - t0) * 1e3
+            t0 = time.perf_counter()
+            loaded = storage.load_world()
+            res["load_world_ms"] = (time.perf_counter() - t0) * 1e3
+            assert len(loaded['characters']) == n_agents
+        finally:
+            os.chdir(cwd)
+
+    return {k: round(v, 3) for k, v in res.items()}
+
+
+def bench_median(base_seed, n_agents, seed, repeat):
+    """Médiane de `repeat` passes sur le même monde (graine fixe par taille) : écarte le bruit d'une passe isolée."""
+    runs = []
+    for _ in range(repeat):
+        random.seed(seed)  # Jets de dés / météo du moteur
+        runs.append(bench_size(base_seed, n_agents, random.Random(seed + n_agents)))
+    return {metric: round(statistics.median(run[metric] for run in runs), 3) for metric in runs[0]}
+
+
+def compare(current, baseline, threshold):
+    """Liste des (mesure, taille, base, actuel) plus lents que la base de plus de `threshold`."""
+    regressions = []
+    for size, metrics in current["results"].items():
+        base = baseline["results"].get(size, {})
+        for metric, value in metrics.items():
+            ref = base.get(metric)
+            if ref and value > ref * (1 + threshold):
+                regressions.append((metric, size, ref, value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Passes par taille (médiane)")
+    parser.add_argument("--out", default=None, help="Fichier JSON des résultats")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, default=None)
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, default=None)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Tolérance de régression (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    if args.compare and not os.path.exists(args.compare):
+        sys.exit(f"Pas de base de référence : {args.compare} (la créer avec --save-baseline)")
+
+    base_seed = load_seed(os.path.join(ROOT, "resources", "world_gen", "world_seed.json"))
+    repeat = max(1, args.repeat)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+    for n in args.sizes:
+        t0 = time.perf_counter()
+        metrics = bench_median(base_seed, n, args.seed, repeat)
+        report["results"][str(n)] = metrics
+        print(f"{n:>6} agents ({time.perf_counter() - t0:.1f}s) : " +
+              "  ".join(f"{k}={v}" for k, v in metrics.items()), flush=True)
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"Résultats écrits : {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for metric, size, ref, value in regressions:
+            print(f"REGRESSION {metric} @ {size} agents : {ref} -> {value} (+{(value / ref - 1) * 100:.0f}%)")
+        if regressions:
+            sys.exit(1)
+        print(f"Aucune régression (seuil +{args.threshold * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
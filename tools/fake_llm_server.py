@@ -0,0 +1,166 @@
+"""
+Faux serveur Gemini (API REST generateContent / streamGenerateContent) pour tester
+la politique d'appel LLM (délais, requêtes couvertes, relances, coupe-circuit)
+sans réseau : réponses de FakeLLM, latence et pannes injectées.
+
+Usage :
+    python tools/fake_llm_server.py --port 8765 --latency 0.2 --spike-rate 0.05 --spike 8
+    LLM_BASE_URL=http://127.0.0.1:8765 python headless.py --backend live --days 0.5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.llm import FakeLLM, STREAM_CHUNKS, _split_chunks, estimate_tokens
+
+
+class FaultProfile:
+    """Latence de base + gigue, pics de latence et erreurs (503 / 429) aléatoires."""
+    def __init__(self, latency=0.1, jitter=0.05, spike_rate=0.0, spike=5.0, error_rate=0.0, throttle_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.spike_rate = spike_rate
+        self.spike = spike
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.spikes = 0
+        self.errors = 0
+
+    def draw(self):
+        """(latence s, code HTTP d'erreur ou None) pour une requête."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            if self.rng.random() < self.spike_rate:
+                self.spikes += 1
+                delay += self.spike
+            roll = self.rng.random()
+            if roll < self.error_rate:
+                self.errors += 1
+                return delay, 503
+            if roll < self.error_rate + self.throttle_rate:
+                self.errors += 1
+                return delay, 429
+            return delay, None
+
+
+def _prompt_text(body):
+    parts = [p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", [])]
+    return "".join(parts)
+
+
+def _response(text, prompt):
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {"promptTokenCount": estimate_tokens(prompt), "candidatesTokenCount": estimate_tokens(text),
+                          "totalTokenCount": estimate_tokens(prompt) + estimate_tokens(text)},
+    }
+
+
+def make_handler(llm, faults):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _json(self, code, payload):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            path = self.path.split("?")[0]
+            if path.endswith("/cachedContents"):
+                # Pas de cache de contexte : le client passe au prompt complet
+                self._json(400, {"error": {"code": 400, "message": "Cache non supporté", "status": "INVALID_ARGUMENT"}})
+                return
+            stream = path.endswith(":streamGenerateContent")
+            if not stream and not path.endswith(":generateContent"):
+                self._json(404, {"error": {"code": 404, "message": path, "status": "NOT_FOUND"}})
+                return
+
+            delay, error = faults.draw()
+            if error is not None:
+                time.sleep(min(delay, faults.latency))
+                status = "UNAVAILABLE" if error == 503 else "RESOURCE_EXHAUSTED"
+                self._json(error, {"error": {"code": error, "message": "Panne simulée", "status": status}})
+                return
+
+            prompt = _prompt_text(body)
+            text = llm._respond(prompt)
+            if not stream:
+                time.sleep(delay)
+                self._json(200, _response(text, prompt))
+                return
+
+            # SSE : la latence est répartie sur les morceaux
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for part in _split_chunks(text):
+                time.sleep(delay / STREAM_CHUNKS)
+                self.wfile.write(f"data: {json.dumps(_response(part, prompt), ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+                self.wfile.flush()
+            self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Requêtes perdantes annulées par le client (hedge, délai) : connexion coupée, normal
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def serve(port=8765, host="127.0.0.1", faults=None):
+    """Démarre le serveur en tâche de fond (tests) ; retourne le serveur (server_port, shutdown())."""
+    server = FakeGeminiServer((host, port), make_handler(FakeLLM(), faults or FaultProfile()))
+    threading.Thread(target=server.serve_forever, name="fake-llm-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Faux serveur Gemini avec latence et pannes injectées")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.1, help="Latence de base (s)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Gigue uniforme ajoutée (s)")
+    parser.add_argument("--spike-rate", type=float, default=0.0, help="Probabilité d'un pic de latence")
+    parser.add_argument("--spike", type=float, default=5.0, help="Durée d'un pic (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilité d'une 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probabilité d'une 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    faults = FaultProfile(args.latency, args.jitter, args.spike_rate, args.spike, args.error_rate, args.throttle_rate, args.seed)
+    server = serve(args.port, args.host, faults)
+    print(f"Faux Gemini sur http://{args.host}:{server.server_port} (Ctrl+C pour arrêter)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"  requêtes={faults.requests} pics={faults.spikes} erreurs={faults.errors}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Générateur de grands mondes à partir de world_seed.json (même schéma :
+map_layout, map_legend, map_colors, characters, loot_table).
+
+La carte est un pavage de "quartiers" : l'intérieur de la carte de base, retourné
+au hasard, séparé par des rues. Les proportions de lieux (rues, forêt, bâtiments)
+restent celles de la carte d'origine. Les personnages sont des variantes des
+personnages du seed, avec une répartition de rôles réaliste (beaucoup d'élèves,
+quelques professeurs et commerçants, créatures rares) et placés de préférence
+sur le type de lieu de leur modèle. Les personnages d'origine sont conservés.
+
+Usage : python tools/world_generator.py --grid 256 --agents 5000 --out resources/world_gen/world_5k.json
+        puis WORLD_SEED=resources/world_gen/world_5k.json python main.py
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core.state import SEED_FILE, load_seed
+
+WALL = '#'
+STREET = '.'
+
+# Poids relatifs des rôles (par personnage modèle). Défaut : 1 (commerçants, concierge...)
+ROLE_WEIGHTS = {
+    "Étudiant": 30,
+    "Étudiante": 30,
+    "Professeur": 6,
+}
+# Rôles rares (créatures, fantômes) : environ un pour N agents
+RARE_ROLES = {"Esprit Frappeur": 400, "Fantôme": 150, "Chien": 100}
+
+FIRST_NAMES = [
+    "Adèle", "Ambroise", "Anselme", "Apolline", "Bastien", "Bérénice", "Cassandre", "Céleste",
+    "Cyprien", "Daphné", "Edmond", "Eulalie", "Faustine", "Gaspard", "Hortense", "Ignace",
+    "Isaure", "Jasper", "Léontine", "Lucien", "Mathurin", "Mélisande", "Néréa", "Octave",
+    "Ondine", "Philémon", "Prudence", "Quentin", "Roxane", "Séraphin", "Sidonie", "Tancrède",
+    "Ulysse", "Valentine", "Victoire", "Wilhelmine", "Yvain", "Zéphyr",
+]
+LAST_NAMES = [
+    "Argentcœur", "Beaumont", "Corbeau", "Duchêne", "Ferrand", "Grisebrume", "Hautval",
+    "Lachaume", "Malebranche", "Noirval", "Orme", "Pierrefeu", "Quillon", "Rochebrune",
+    "Sombreval", "Tisserand", "Valombre", "Ventenuit",
+]
+
+
+def interior(layout):
+    """Intérieur de la carte de base (sans le mur d'enceinte), lignes de même longueur."""
+    rows = [row for row in layout if row.strip(WALL)]
+    width = min(len(row) for row in rows)
+    rows = [row[:width] for row in rows]
+    return [row[1:-1] for row in rows]
+
+
+def generate_map(base_layout, grid_size, rng):
+    """Carte grid_size x grid_size : quartiers (carte de base retournée) séparés par des rues."""
+    block = interior(base_layout)
+    bh, bw = len(block), len(block[0])
+    grid = [[STREET] * grid_size for _ in range(grid_size)]
+
+    # Quartiers au pas (taille + 1 case de rue), bordure en mur
+    for by in range(1, grid_size - 1, bh + 1):
+        for bx in range(1, grid_size - 1, bw + 1):
+            tile = block[::-1] if rng.random() < 0.5 else block
+            flip_x = rng.random() < 0.5
+            for dy, row in enumerate(tile):
+                y = by + dy
+                if y >= grid_size - 1:
+                    break
+                row = row[::-1] if flip_x else row
+                for dx, char in enumerate(row):
+                    x = bx + dx
+                    if x >= grid_size - 1:
+                        break
+                    grid[y][x] = STREET if char == ' ' else char
+
+    for i in range(grid_size):
+        grid[0][i] = grid[grid_size - 1][i] = WALL
+        grid[i][0] = grid[i][grid_size - 1] = WALL
+    return ["".join(row) for row in grid]
+
+
+def cells_by_terrain(layout):
+    cells = {}
+    for y, row in enumerate(layout):
+        for x, char in enumerate(row):
+            if char != WALL:
+                cells.setdefault(char, []).append((x, y))
+    return cells
+
+
+def role_weights(templates):
+    """Poids de tirage de chaque modèle (un rôle rare sort ~1 fois pour RARE_ROLES[role] agents)."""
+    common = sum(ROLE_WEIGHTS.get(v['role'], 1.0) for _, v in templates if v['role'] not in RARE_ROLES)
+    return [
+        common / RARE_ROLES[v['role']] if v['role'] in RARE_ROLES else ROLE_WEIGHTS.get(v['role'], 1.0)
+        for _, v in templates
+    ]
+
+
+def unique_name(rng, used):
+    while True:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        if name not in used:
+            return name
+        name = f"{name} {len(used)}"
+        if name not in used:
+            return name
+
+
+def generate_world(base_seed, grid_size, n_agents, rng):
+    layout = generate_map(base_seed['map_layout'], grid_size, rng)
+    cells = cells_by_terrain(layout)
+    walkable = [c for terrain_cells in cells.values() for c in terrain_cells]
+    base_layout = base_seed['map_layout']
+
+    templates = list(base_seed['characters'].items())
+    weights = role_weights(templates)
+    loot = base_seed.get('loot_table', [])
+
+    def place(template_pos):
+        # Même type de lieu que le modèle (70%), sinon n'importe quelle case praticable
+        tx, ty = template_pos
+        home = base_layout[ty][tx] if 0 <= ty < len(base_layout) and 0 <= tx < len(base_layout[ty]) else STREET
+        pool = cells.get(home) if rng.random() < 0.7 else None
+        x, y = rng.choice(pool or walkable)
+        return [x, y]
+
+    characters = {}
+    # Distribution d'origine conservée : le casting de base d'abord
+    for name, v in templates[:n_agents]:
+        c = copy.deepcopy(v)
+        c['pos'] = place(v['pos'])
+        characters[name] = c
+
+    while len(characters) < n_agents:
+        name_t, v = rng.choices(templates, weights)[0]
+        c = copy.deepcopy(v)
+        c['pos'] = place(v['pos'])
+        if v['role'].startswith("Étudiant"):
+            c['age'] = rng.randint(11, 17)
+            c['description'] = f"{c['age']} ans. " + v.get('description', '').split('. ', 1)[-1]
+        elif isinstance(v.get('age'), int) and v['age'] < 200:
+            c['age'] = max(18, v['age'] + rng.randint(-10, 10))
+        c['energy'] = rng.randint(60, 100)
+        c['mana'] = rng.randint(40, 100)
+        c['inventory'] = list(v.get('inventory', [])) + rng.sample(loot, k=min(len(loot), rng.randint(0, 2)))
+        characters[unique_name(rng, characters)] = c
+
+    world = dict(base_seed)
+    world['grid_size'] = grid_size
+    world['map_layout'] = layout
+    world['characters'] = characters
+    return world
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un monde de taille arbitraire depuis world_seed.json")
+    parser.add_argument("--base", default=SEED_FILE)
+    parser.add_argument("--grid", type=int, default=None, help="Taille de la grille (défaut : densité de la carte de base)")
+    parser.add_argument("--agents", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    base_seed = load_seed(args.base)
+    # Densité de la carte d'origine (~1 agent pour 64 cases) par défaut
+    grid = args.grid or max(base_seed['grid_size'], int((args.agents * 64) ** 0.5))
+    world = generate_world(base_seed, grid, args.agents, random.Random(args.seed))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(world, f, ensure_ascii=False, indent=2)
+    print(f"Monde {grid}x{grid}, {len(world['characters'])} agents : {args.out}")
+
+
+if __name__ == "__main__":
+    main()